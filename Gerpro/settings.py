@@ -41,6 +41,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Primero, para que el total incluya el resto de la cadena.
+    'PruebaTecnica.instrumentacion.InstrumentacionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -78,6 +80,25 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Conexiones persistentes por hilo: no se reabre el archivo ni se repiten los PRAGMA en cada petición.
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            # BEGIN IMMEDIATE: la transacción toma el lock de escritura al empezar y, si está ocupado, espera
+            # hasta ``timeout`` segundos en lugar de fallar con "database is locked" al pasar de lector a escritor.
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+            # WAL: los lectores no bloquean al escritor ni al revés. Con WAL, synchronous=NORMAL sigue siendo
+            # consistente ante caídas del proceso (solo puede perder la última transacción ante un corte de luz).
+            # mmap_size y cache_size (en KiB si es negativo) reducen lecturas al sistema operativo.
+            'init_command': (
+                'PRAGMA journal_mode=WAL;'
+                'PRAGMA synchronous=NORMAL;'
+                'PRAGMA mmap_size=268435456;'
+                'PRAGMA cache_size=-32768;'
+                'PRAGMA temp_store=MEMORY;'
+            ),
+        },
     }
 }
 
@@ -122,3 +143,67 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Gerpro
+
+# Cache en disco de los JSON remotos consumidos por cronograma_view.
+GERPRO_CACHE_DATASETS = {
+    'DIR': BASE_DIR / '.cache' / 'datasets',
+    'MAX_BYTES': 256 * 1024 * 1024,
+    # Segundos durante los que se reutiliza un dataset sin revalidarlo con el servidor.
+    'FRESCURA': 60,
+    # Datasets ya decodificados que se conservan en memoria por proceso.
+    'MAX_EN_MEMORIA': 8,
+}
+
+# Cliente HTTP compartido para descargar los datasets (cache y streaming).
+GERPRO_DESCARGAS = {
+    'TIMEOUT': 15,
+    # Conexiones abiertas que se conservan por servidor para reutilizarlas entre peticiones.
+    'CONEXIONES': 10,
+    # Reintentos ante errores de conexión y respuestas 429/5xx, con espera exponencial desde ESPERA_REINTENTO.
+    'REINTENTOS': 3,
+    'ESPERA_REINTENTO': 0.5,
+    # Tamaño máximo del cuerpo ya descomprimido.
+    'MAX_BYTES': 64 * 1024 * 1024,
+}
+
+# Cronogramas memorizados por hash del dataset y parámetros normalizados.
+GERPRO_CACHE_RESULTADOS = {
+    'MAX_ENTRADAS': 128,
+    # Segundos de vida de cada resultado; None para no expirar.
+    'TTL': 600,
+}
+
+# Cálculos de cronograma en segundo plano.
+GERPRO_TRABAJOS = {
+    # Hilos del pool local; cada uno ocupa una conexión a la base mientras trabaja.
+    'MAX_WORKERS': 2,
+    # Segundos sin avance tras los cuales un trabajo en proceso se da por abandonado (su worker se cayó) y
+    # procesar_trabajos lo vuelve a tomar. El avance se registra al empezar cada etapa, así que debe superar
+    # la etapa más larga.
+    'VENCIMIENTO': 900,
+}
+
+# Vista asíncrona (/async/): procesos para el cálculo; 0 usa el pool de hilos del event loop.
+GERPRO_CALCULO_ASYNC = {
+    'PROCESOS': 0,
+}
+
+# Tiempos por etapa (cabecera Server-Timing), consultas por petición y perfiles opcionales.
+GERPRO_INSTRUMENTACION = {
+    'ACTIVA': True,
+    # Perfila todas las peticiones (cProfile, o pyinstrument si está instalado).
+    'PERFILAR': False,
+    # Perfila solo las peticiones con la cabecera ``X-Gerpro-Perfil: <token>``; None lo desactiva.
+    'TOKEN_PERFIL': None,
+    'DIR_PERFILES': BASE_DIR / '.cache' / 'perfiles',
+}
+
+# Métricas en /metrics. Cada proceso vuelca sus valores en DIR (como mucho cada INTERVALO segundos) y el
+# endpoint suma los de todos; con DIR = None solo se publican los del proceso que atiende la petición.
+GERPRO_METRICAS = {
+    'DIR': BASE_DIR / '.cache' / 'metricas',
+    'INTERVALO': 1.0,
+}
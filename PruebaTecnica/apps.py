@@ -1,6 +1,12 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class PruebatecnicaConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'PruebaTecnica'
+
+    def ready(self):
+        from .instrumentacion import instalar_contador
+
+        connection_created.connect(instalar_contador, dispatch_uid="gerpro_contar_consultas")
@@ -0,0 +1,415 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Hashable, NamedTuple, Optional, Tuple
+
+import requests
+from django.conf import settings
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover - dependencia opcional
+    httpx = None
+
+from .calculos import MOTOR_DECIMAL, PARAMETROS_CREDITO, VERSION_MOTOR, normalizar_parametros
+from .coalescencia import Coalescedor
+from .descargas import ClienteDatasets, obtener_cliente
+from .instrumentacion import etapa
+from .metricas import CACHE_CONSULTAS
+from .validacion import validar_movimientos
+
+logger = logging.getLogger(__name__)
+
+ORIGEN_MEMORIA = "memoria"
+ORIGEN_DISCO = "disco"
+ORIGEN_REVALIDADO = "revalidado"
+ORIGEN_RED = "red"
+
+# Errores de red o de decodificación al obtener un dataset, con cualquiera de los clientes HTTP.
+ERRORES_DESCARGA = (requests.RequestException, ValueError) + ((httpx.HTTPError,) if httpx else ())
+
+
+class CacheLRU:
+    """Diccionario acotado con desalojo LRU y expiración opcional, seguro entre hilos."""
+
+    def __init__(self, max_entradas: int, ttl: Optional[float] = None):
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self._datos: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def get(self, clave: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None or (entrada[1] is not None and entrada[1] < time.monotonic()):
+                if entrada is not None:
+                    del self._datos[clave]
+                self.fallos += 1
+                return default
+            self._datos.move_to_end(clave)
+            self.aciertos += 1
+            return entrada[0]
+
+    def set(self, clave: Hashable, valor: Any) -> None:
+        expira = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._datos[clave] = (valor, expira)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_entradas:
+                self._datos.popitem(last=False)
+
+    def pop(self, clave: Hashable) -> None:
+        with self._lock:
+            self._datos.pop(clave, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._datos.clear()
+
+    def __len__(self) -> int:
+        return len(self._datos)
+
+
+class Dataset(NamedTuple):
+    """Movimientos de un dataset remoto junto con el hash de su contenido."""
+
+    movimientos: Any
+    hash: str
+    origen: str
+
+
+class CacheDatasets:
+    """Cache en disco de los JSON remotos, direccionada por contenido.
+
+    Cada cuerpo descargado se guarda como ``<sha256>.json`` y un índice asocia
+    la URL con su hash, ``ETag`` y ``Last-Modified``. Mientras la entrada está
+    fresca (``frescura`` segundos) no se consulta la red; después se revalida
+    con una petición condicional y un ``304`` reutiliza el archivo local. El
+    tamaño total en disco se acota desalojando las URL usadas hace más tiempo.
+    Las descargas pasan por el :class:`~PruebaTecnica.descargas.ClienteDatasets`
+    del proceso (conexiones reutilizadas, reintentos y tamaño máximo).
+    Los JSON ya decodificados (y validados con
+    :func:`~PruebaTecnica.validacion.validar_movimientos`) se conservan en
+    memoria por hash, por lo que el resultado es compartido y no debe modificarse.
+    Las consultas simultáneas de una misma URL comparten una sola descarga
+    (ver :class:`~PruebaTecnica.coalescencia.Coalescedor`).
+    """
+
+    NOMBRE_INDICE = "indice.json"
+
+    def __init__(
+            self,
+            directorio: Path,
+            max_bytes: int = 256 * 1024 * 1024,
+            frescura: float = 60,
+            max_en_memoria: int = 8,
+            timeout: float = 15,
+            cliente: Optional[ClienteDatasets] = None,
+    ):
+        self.directorio = Path(directorio)
+        self.max_bytes = max_bytes
+        self.frescura = frescura
+        self.timeout = timeout
+        self.cliente = cliente
+        self._decodificados = CacheLRU(max_en_memoria)
+        self._lock = threading.Lock()
+        self._indice: Optional[Dict[str, dict]] = None
+        self._clientes_async: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+        self._en_curso = Coalescedor("descarga")
+        self.aciertos = 0
+        self.fallos = 0
+        self.revalidaciones = 0
+
+    @classmethod
+    def desde_settings(cls) -> "CacheDatasets":
+        return cls(
+            directorio=settings.GERPRO_CACHE_DATASETS["DIR"],
+            max_bytes=settings.GERPRO_CACHE_DATASETS["MAX_BYTES"],
+            frescura=settings.GERPRO_CACHE_DATASETS["FRESCURA"],
+            max_en_memoria=settings.GERPRO_CACHE_DATASETS["MAX_EN_MEMORIA"],
+        )
+
+    def estadisticas(self) -> Dict[str, int]:
+        with self._lock:
+            indice = self._cargar_indice()
+            return {
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "revalidaciones": self.revalidaciones,
+                "entradas": len(indice),
+                "bytes": self._bytes_en_disco(indice),
+            }
+
+    def obtener(self, url: str) -> Dataset:
+        """Retorna los movimientos de ``url`` evitando red y parseo cuando es posible."""
+        return self._en_curso.ejecutar(url, self._obtener, url)
+
+    def _obtener(self, url: str) -> Dataset:
+        entrada, cabeceras = self._entrada_vigente(url)
+        respuesta = None
+        if cabeceras is not None:
+            respuesta = (self.cliente or obtener_cliente()).obtener(url, cabeceras)
+            if not (entrada and respuesta.status_code == 304):
+                respuesta.raise_for_status()
+        return self._resolver(url, entrada, respuesta)
+
+    async def obtener_async(self, url: str) -> Dataset:
+        """Igual que :meth:`obtener`, sin bloquear el event loop.
+
+        Con ``httpx`` instalado la petición es asíncrona y solo la lectura del
+        disco y el parseo pasan a un hilo; sin él, todo :meth:`obtener` corre
+        en un hilo.
+        """
+        if httpx is None:
+            return await asyncio.to_thread(self.obtener, url)
+        return await self._en_curso.ejecutar_async(url, self._obtener_async, url)
+
+    async def _obtener_async(self, url: str) -> Dataset:
+        entrada, cabeceras = self._entrada_vigente(url)
+        respuesta = None
+        if cabeceras is not None:
+            respuesta = await self._cliente_async().get(url, headers=cabeceras)
+            if not (entrada and respuesta.status_code == 304):
+                respuesta.raise_for_status()
+        return await asyncio.to_thread(self._resolver, url, entrada, respuesta)
+
+    def _cliente_async(self) -> "httpx.AsyncClient":
+        # Crear un cliente cuesta un contexto TLS; se reutiliza uno por event loop,
+        # que además conserva las conexiones abiertas con el servidor.
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            cliente = self._clientes_async.get(loop)
+            if cliente is None:
+                cliente = self._clientes_async[loop] = httpx.AsyncClient(timeout=self.timeout)
+            return cliente
+
+    def _entrada_vigente(self, url: str) -> Tuple[dict, Optional[Dict[str, str]]]:
+        """Entrada del índice para ``url`` y las cabeceras condicionales a enviar.
+
+        Las cabeceras son ``None`` si la entrada sigue fresca y no hace falta ir a la red.
+        """
+        with self._lock:
+            entrada = dict(self._cargar_indice().get(url) or {})
+        if entrada and not self._ruta(entrada["hash"]).exists():
+            entrada = {}
+        if entrada and time.time() - entrada["verificado_en"] < self.frescura:
+            return entrada, None
+        cabeceras = {}
+        if entrada.get("etag"):
+            cabeceras["If-None-Match"] = entrada["etag"]
+        if entrada.get("last_modified"):
+            cabeceras["If-Modified-Since"] = entrada["last_modified"]
+        return entrada, cabeceras
+
+    def _resolver(self, url: str, entrada: dict, respuesta: Any) -> Dataset:
+        """Completa la consulta con la respuesta HTTP (``None`` si no se fue a la red)."""
+        if respuesta is None:
+            origen = ORIGEN_DISCO
+            contenido = None
+        else:
+            if entrada and respuesta.status_code == 304:
+                origen = ORIGEN_REVALIDADO
+                contenido = None
+            else:
+                origen = ORIGEN_RED
+                contenido = respuesta.content
+                entrada = {
+                    "hash": hashlib.sha256(contenido).hexdigest(),
+                    "etag": respuesta.headers.get("ETag"),
+                    "last_modified": respuesta.headers.get("Last-Modified"),
+                    "tamano": len(contenido),
+                }
+            entrada["verificado_en"] = time.time()
+
+        movimientos = self._decodificados.get(entrada["hash"])
+        if movimientos is None:
+            if contenido is None:
+                contenido = self._ruta(entrada["hash"]).read_bytes()
+            with etapa("decodificacion"):
+                movimientos = json.loads(contenido)
+            # Un dataset inválido se rechaza aquí, antes de guardarlo en disco o en memoria.
+            with etapa("validacion"):
+                movimientos = validar_movimientos(movimientos)
+            self._decodificados.set(entrada["hash"], movimientos)
+        elif origen == ORIGEN_DISCO:
+            origen = ORIGEN_MEMORIA
+
+        with self._lock:
+            CACHE_CONSULTAS.incrementar(cache="datasets", resultado="fallo" if origen == ORIGEN_RED else "acierto")
+            if origen == ORIGEN_RED:
+                self.fallos += 1
+                self._escribir_cuerpo(entrada["hash"], contenido)
+            else:
+                self.aciertos += 1
+                self.revalidaciones += origen == ORIGEN_REVALIDADO
+            entrada["usado_en"] = time.time()
+            indice = self._cargar_indice()
+            indice[url] = entrada
+            self._desalojar(indice, conservar=url)
+            self._guardar_indice(indice)
+        logger.debug("Dataset %s servido desde %s (%s)", url, origen, entrada["hash"][:12])
+        return Dataset(movimientos, entrada["hash"], origen)
+
+    def limpiar(self) -> None:
+        with self._lock:
+            for ruta in self.directorio.glob("*.json"):
+                ruta.unlink(missing_ok=True)
+            self._indice = {}
+            self._decodificados.clear()
+
+    def _ruta(self, hash_contenido: str) -> Path:
+        return self.directorio / f"{hash_contenido}.json"
+
+    def _cargar_indice(self) -> Dict[str, dict]:
+        if self._indice is None:
+            try:
+                self._indice = json.loads((self.directorio / self.NOMBRE_INDICE).read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                self._indice = {}
+        return self._indice
+
+    def _guardar_indice(self, indice: Dict[str, dict]) -> None:
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        temporal = self.directorio / f".{self.NOMBRE_INDICE}.{os.getpid()}.tmp"
+        temporal.write_text(json.dumps(indice), encoding="utf-8")
+        os.replace(temporal, self.directorio / self.NOMBRE_INDICE)
+
+    def _escribir_cuerpo(self, hash_contenido: str, contenido: bytes) -> None:
+        ruta = self._ruta(hash_contenido)
+        if ruta.exists():
+            return
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        temporal = ruta.with_suffix(f".{os.getpid()}.tmp")
+        temporal.write_bytes(contenido)
+        os.replace(temporal, ruta)
+
+    @staticmethod
+    def _bytes_en_disco(indice: Dict[str, dict]) -> int:
+        # Varias URL pueden apuntar al mismo contenido: se cuenta una vez por hash.
+        return sum({entrada["hash"]: entrada["tamano"] for entrada in indice.values()}.values())
+
+    def _desalojar(self, indice: Dict[str, dict], conservar: str) -> None:
+        por_antiguedad = sorted((u for u in indice if u != conservar), key=lambda u: indice[u]["usado_en"])
+        while por_antiguedad and self._bytes_en_disco(indice) > self.max_bytes:
+            url = por_antiguedad.pop(0)
+            hash_contenido = indice.pop(url)["hash"]
+            if all(entrada["hash"] != hash_contenido for entrada in indice.values()):
+                self._ruta(hash_contenido).unlink(missing_ok=True)
+                logger.debug("Dataset %s desalojado de la cache", url)
+
+
+class CacheResultados:
+    """Memoriza cronogramas por (hash del dataset, parámetros normalizados, motor).
+
+    La clave incluye :data:`~PruebaTecnica.calculos.VERSION_MOTOR`, de modo que
+    cambiar el algoritmo invalida lo calculado antes. Además recuerda qué
+    resultado guardó este proceso para cada proyecto, como punto de partida de
+    un recálculo incremental. La cache vive en memoria del proceso; si un
+    guardado se puede omitir lo decide la huella persistida en el proyecto
+    (ver :meth:`huella`).
+    """
+
+    def __init__(self, max_entradas: int = 128, ttl: Optional[float] = 600):
+        self._resultados = CacheLRU(max_entradas, ttl)
+        self._persistidos = CacheLRU(max_entradas, ttl)
+
+    @classmethod
+    def desde_settings(cls) -> "CacheResultados":
+        return cls(
+            max_entradas=settings.GERPRO_CACHE_RESULTADOS["MAX_ENTRADAS"],
+            ttl=settings.GERPRO_CACHE_RESULTADOS["TTL"],
+        )
+
+    @staticmethod
+    def clave(hash_dataset: str, parametros: Dict[str, Any], motor: str = MOTOR_DECIMAL) -> tuple:
+        normalizados = normalizar_parametros(*(parametros[nombre] for nombre in PARAMETROS_CREDITO))
+        return hash_dataset, normalizados, motor, VERSION_MOTOR
+
+    def obtener(self, clave: tuple) -> Optional[dict]:
+        resultados = self._resultados.get(clave)
+        CACHE_CONSULTAS.incrementar(cache="resultados", resultado="fallo" if resultados is None else "acierto")
+        return resultados
+
+    def guardar(self, clave: tuple, resultados: dict) -> None:
+        self._resultados.set(clave, resultados)
+
+    @staticmethod
+    def huella(clave: tuple) -> str:
+        """Texto fijo que identifica ``clave`` entre procesos, para guardarlo en ``Proyecto.huella_cronograma``."""
+        return hashlib.sha256(json.dumps(clave).encode("utf-8")).hexdigest()
+
+    def marcar_persistido(self, proyecto: str, dataset_url: str, clave: tuple) -> None:
+        self._persistidos.set(proyecto, (dataset_url, clave))
+
+    def anterior_persistido(self, proyecto: str, clave: tuple) -> Optional[Tuple[str, dict]]:
+        """Huella y resultado persistido para ``proyecto`` con los mismos parámetros que ``clave``.
+
+        Sirve de punto de partida para :func:`~PruebaTecnica.calculos.recalcular_cronograma`
+        cuando solo cambió el dataset. La marca es de este proceso: la huella
+        permite comprobar al guardar que la base todavía tiene ese cronograma.
+        """
+        persistido = self._persistidos.get(proyecto)
+        if persistido is None:
+            return None
+        clave_persistida = persistido[1]
+        if clave_persistida[1:] != clave[1:] or clave[2] != MOTOR_DECIMAL:
+            return None
+        resultado = self._resultados.get(clave_persistida)
+        if resultado is None:
+            return None
+        return self.huella(clave_persistida), resultado
+
+    def invalidar(self, proyecto: Optional[str] = None) -> None:
+        """Descarta todo lo memorizado, o solo la marca de persistencia de ``proyecto``."""
+        if proyecto is None:
+            self._resultados.clear()
+            self._persistidos.clear()
+        else:
+            self._persistidos.pop(proyecto)
+
+    def estadisticas(self) -> Dict[str, int]:
+        return {
+            "aciertos": self._resultados.aciertos,
+            "fallos": self._resultados.fallos,
+            "entradas": len(self._resultados),
+        }
+
+
+_cache_datasets: Optional[CacheDatasets] = None
+_lock_instancias = threading.Lock()
+_cache_resultados: Optional[CacheResultados] = None
+
+
+def obtener_cache_datasets() -> CacheDatasets:
+    global _cache_datasets
+    with _lock_instancias:
+        if _cache_datasets is None:
+            _cache_datasets = CacheDatasets.desde_settings()
+        return _cache_datasets
+
+
+def obtener_dataset(url: str) -> Dataset:
+    return obtener_cache_datasets().obtener(url)
+
+
+async def obtener_dataset_async(url: str) -> Dataset:
+    return await obtener_cache_datasets().obtener_async(url)
+
+
+def obtener_cache_resultados() -> CacheResultados:
+    global _cache_resultados
+    with _lock_instancias:
+        if _cache_resultados is None:
+            _cache_resultados = CacheResultados.desde_settings()
+        return _cache_resultados
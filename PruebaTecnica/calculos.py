@@ -1,25 +1,169 @@
 from __future__ import annotations
 
-from decimal import Decimal, getcontext
-from typing import Dict, Iterable, List, Sequence, Tuple
+import itertools
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from decimal import ROUND_HALF_UP, Decimal, localcontext
+from typing import Dict, Iterable, List, Mapping, NamedTuple, Optional, Sequence, Tuple
 
-# TODO : implementar en el flujo de apalancamiento los valores negativos al tener descuento en flujo acumulado
-def calcular_cronograma(
-        movimientos: Sequence[Dict[str, float]],
+from .resultados import CAMPOS_TABLA, ResultadoCronograma
+
+try:
+    import numpy as np
+except ImportError:  # numpy es opcional: solo lo requiere el motor vectorizado.
+    np = None
+
+MOTOR_DECIMAL = "decimal"
+MOTOR_NUMPY = "numpy"
+MOTOR_CENTAVOS = "centavos"
+MOTORES = (MOTOR_DECIMAL, MOTOR_NUMPY, MOTOR_CENTAVOS)
+
+# Precisión de los cálculos con Decimal. Se aplica en un contexto local
+# (``localcontext``) para no alterar el contexto del hilo que llama.
+PRECISION_DECIMAL = 28
+
+# El motor "centavos" lleva los montos como enteros en millonésimas de peso.
+ESCALA_CENTAVOS = 6
+FACTOR_CENTAVOS = 10 ** ESCALA_CENTAVOS
+# Todos los motores redondean a la millonésima el máximo mensual, los intereses y las
+# cuotas de capital, así que coinciden exactamente (ver _cronograma_decimal).
+MILLONESIMA = Decimal(1).scaleb(-ESCALA_CENTAVOS)
+# Pesos por debajo de los cuales ``round(valor * FACTOR_CENTAVOS)`` de un float es exacto (2**50 millonésimas).
+LIMITE_FLOAT_EXACTO = 2 ** 50 / FACTOR_CENTAVOS
+
+# Forma parte de la clave de la cache de resultados: incrementarla cada vez que
+# cambie el algoritmo invalida los cronogramas calculados con la versión previa.
+VERSION_MOTOR = "2"
+
+PARAMETROS_CREDITO = (
+    "cupo_credito",
+    "porcentaje_maximo_mensual",
+    "periodo_inicial_credito",
+    "periodo_final_credito",
+    "tasa_interes_anual",
+)
+
+
+class SeriePeriodos(NamedTuple):
+    """Totales por periodo precalculados a partir de los movimientos.
+
+    No depende de los parámetros del crédito, por lo que puede reutilizarse
+    para evaluar muchos escenarios sobre el mismo dataset.
+    """
+
+    periodos: Tuple[int, ...]
+    ingresos: Tuple[float, ...]
+    costos: Tuple[float, ...]
+    # Periodo dentro del rango [primer, último] periodo con ingresos.
+    dentro_de_ingresos: Tuple[bool, ...]
+    # Periodo en el que se amortiza capital (últimos dos con ingresos).
+    paga_capital: Tuple[bool, ...]
+
+
+class EstadoCronograma(NamedTuple):
+    """Estado del crédito al cierre de un periodo; permite retomar el cálculo desde ahí."""
+
+    periodo: int
+    saldo_credito: Decimal
+    cupo_restante: Decimal
+    interes_por_pagar: Decimal
+    flujo_acumulado: Decimal
+    periodos_pago_restantes: int
+
+
+class AtribucionSubetapas(NamedTuple):
+    """Parte del FCO, del desembolso y del aporte de cada periodo que corresponde a cada subetapa.
+
+    Los valores se guardan en arreglos planos de ``float`` de tamaño
+    ``len(subetapas) * len(periodos)``: el de la subetapa ``s`` en el periodo
+    de posición ``j`` está en ``s * len(periodos) + j``. Por periodo, la suma
+    sobre las subetapas coincide con el cronograma consolidado.
+    """
+
+    subetapas: Tuple[str, ...]
+    periodos: Tuple[int, ...]
+    fco: array
+    desembolso: array
+    aporte_capital: array
+
+    def serie(self, subetapa: str, campo: str) -> List[float]:
+        """Valores de ``campo`` (``fco``, ``desembolso`` o ``aporte_capital``) de una subetapa por periodo."""
+        n = len(self.periodos)
+        inicio = self.subetapas.index(subetapa) * n
+        return getattr(self, campo)[inicio:inicio + n].tolist()
+
+    def totales(self) -> Dict[str, Dict[str, float]]:
+        """Suma de ``fco``, ``desembolso`` y ``aporte_capital`` de cada subetapa en todo el horizonte."""
+        n = len(self.periodos)
+        return {
+            subetapa: {
+                campo: sum(getattr(self, campo)[s * n:(s + 1) * n])
+                for campo in ("fco", "desembolso", "aporte_capital")
+            }
+            for s, subetapa in enumerate(self.subetapas)
+        }
+
+
+class _AcumuladorSubetapas:
+    """Registra el FCO de cada movimiento por índice de subetapa y de periodo mientras se agrega."""
+
+    def __init__(self):
+        self.indices_subetapa: Dict[str, int] = {}
+        self.indices_periodo: Dict[int, int] = {}
+        self._subetapa = array("l")
+        self._periodo = array("l")
+        self._fco = array("d")
+
+    def agregar(self, subetapa: str, periodo: int, concepto: str, valor: Decimal) -> None:
+        self._subetapa.append(self.indices_subetapa.setdefault(subetapa, len(self.indices_subetapa)))
+        self._periodo.append(self.indices_periodo.setdefault(periodo, len(self.indices_periodo)))
+        self._fco.append(float(valor) if concepto == "ingresos" else -float(valor))
+
+    def matriz_fco(self, periodos: Sequence[int]) -> array:
+        """FCO por (subetapa, periodo) con los periodos en el orden de ``periodos``."""
+        posicion = {periodo: j for j, periodo in enumerate(periodos)}
+        orden = [posicion[periodo] for periodo in self.indices_periodo]
+        n = len(periodos)
+        fco = array("d", bytes(8 * len(self.indices_subetapa) * n))
+        for s, p, valor in zip(self._subetapa, self._periodo, self._fco):
+            fco[s * n + orden[p]] += valor
+        return fco
+
+
+def normalizar_parametros(
         cupo_credito: float,
         porcentaje_maximo_mensual: float,
         periodo_inicial_credito: int,
         periodo_final_credito: int,
         tasa_interes_anual: float,
-) -> Dict[str, List[Dict[str, Decimal]]]:
-    """Calcula cronogramas de crédito y aportes utilizando Decimal para mayor precisión.
+) -> Tuple[str, str, int, int, str]:
+    """Forma canónica de los parámetros: porcentajes como fracción y sin ceros sobrantes.
 
-    Retorna un diccionario con dos claves:
-        - ``creditos``: detalle por periodo del crédito constructor.
-        - ``aportes``: aportes propios requeridos para evitar flujos negativos.
+    Dos juegos de parámetros con la misma forma canónica producen el mismo
+    cronograma (por ejemplo, un porcentaje de 8 y de 0.08).
     """
+    def canonico(valor: float, es_porcentaje: bool = False) -> str:
+        decimal = valor if isinstance(valor, Decimal) else Decimal(str(valor))
+        if es_porcentaje and decimal > 1:
+            decimal = decimal / Decimal("100")
+        return str(decimal.normalize())
+
+    return (
+        canonico(cupo_credito),
+        canonico(porcentaje_maximo_mensual, es_porcentaje=True),
+        int(periodo_inicial_credito),
+        int(periodo_final_credito),
+        canonico(tasa_interes_anual, es_porcentaje=True),
+    )
 
-    global flujo_neto2
+
+def _validar_parametros(
+        cupo_credito: float,
+        porcentaje_maximo_mensual: float,
+        periodo_inicial_credito: int,
+        periodo_final_credito: int,
+        tasa_interes_anual: float,
+) -> None:
     if periodo_inicial_credito > periodo_final_credito:
         raise ValueError("El periodo inicial del crédito no puede superar al periodo final.")
     if cupo_credito <= 0:
@@ -29,38 +173,237 @@ def calcular_cronograma(
     if tasa_interes_anual < 0:
         raise ValueError("La tasa de interés no puede ser negativa.")
 
-    getcontext().prec = 28  # Precisión alta para cálculos financieros.
 
-    def to_decimal(value: float) -> Decimal:
-        return value if isinstance(value, Decimal) else Decimal(str(value))
+def calcular_cronograma(
+        movimientos: Sequence[Dict[str, float]],
+        cupo_credito: float,
+        porcentaje_maximo_mensual: float,
+        periodo_inicial_credito: int,
+        periodo_final_credito: int,
+        tasa_interes_anual: float,
+        motor: str = MOTOR_DECIMAL,
+        estado_inicial: Optional[EstadoCronograma] = None,
+        por_subetapa: bool = False,
+) -> ResultadoCronograma:
+    """Calcula cronogramas de crédito y aportes utilizando Decimal para mayor precisión.
 
-    cupo_total = to_decimal(cupo_credito)
-    porcentaje_mensual = to_decimal(porcentaje_maximo_mensual)
-    if porcentaje_mensual > 1:
-        porcentaje_mensual = porcentaje_mensual / Decimal("100")
-    tasa_anual = to_decimal(tasa_interes_anual)
-    if tasa_anual > 1:
-        tasa_anual = tasa_anual / Decimal("100")
-    tasa_mensual = tasa_anual / Decimal("12")
+    Retorna un :class:`~PruebaTecnica.resultados.ResultadoCronograma` con dos claves:
+        - ``creditos``: detalle por periodo del crédito constructor.
+        - ``aportes``: aportes propios requeridos para evitar flujos negativos.
+
+    El motor ``"decimal"`` agrega además ``estados``: un :class:`EstadoCronograma`
+    por periodo. Si se indica ``estado_inicial`` el cálculo se retoma después de
+    su periodo y solo se retornan los periodos posteriores.
+
+    ``motor`` permite elegir la implementación: ``"decimal"`` (referencia exacta),
+    ``"numpy"``, que agrega los movimientos con operaciones vectoriales, o
+    ``"centavos"``, que resuelve la recurrencia con enteros (ver
+    :func:`_calcular_cronograma_centavos`). Los tres redondean a la millonésima
+    (:data:`MILLONESIMA`, mitades hacia arriba) el máximo mensual, el interés de
+    cada periodo y cada cuota de capital, y con montos de hasta seis decimales
+    dan exactamente los mismos valores, también en los que caen justo en medio
+    centavo.
+
+    Con ``por_subetapa`` (solo motor ``"decimal"``, sin ``estado_inicial``) el
+    resultado incluye ``subetapas``: una :class:`AtribucionSubetapas` armada en
+    la misma pasada sobre los movimientos (ver :func:`_atribuir_subetapas`).
+    """
 
+    _validar_parametros(
+        cupo_credito,
+        porcentaje_maximo_mensual,
+        periodo_inicial_credito,
+        periodo_final_credito,
+        tasa_interes_anual,
+    )
+    if motor not in MOTORES:
+        raise ValueError(f"Motor de cálculo desconocido: {motor}")
+    if por_subetapa and (motor != MOTOR_DECIMAL or estado_inicial is not None):
+        raise ValueError("La atribución por subetapa requiere el motor 'decimal' y el cronograma completo.")
+    if motor == MOTOR_NUMPY:
+        if estado_inicial is not None:
+            raise ValueError("Solo el motor 'decimal' admite retomar desde un estado.")
+        return _calcular_cronograma_numpy(
+            movimientos,
+            cupo_credito,
+            porcentaje_maximo_mensual,
+            periodo_inicial_credito,
+            periodo_final_credito,
+            tasa_interes_anual,
+        )
+
+    if motor == MOTOR_CENTAVOS:
+        if estado_inicial is not None:
+            raise ValueError("Solo el motor 'decimal' admite retomar desde un estado.")
+        # El contexto solo interviene al convertir los montos a enteros.
+        with localcontext(prec=PRECISION_DECIMAL):
+            return _calcular_cronograma_centavos(
+                movimientos,
+                cupo_credito,
+                porcentaje_maximo_mensual,
+                periodo_inicial_credito,
+                periodo_final_credito,
+                tasa_interes_anual,
+            )
+
+    acumulador = _AcumuladorSubetapas() if por_subetapa else None
+    with localcontext(prec=PRECISION_DECIMAL):
+        totales = _agregar_decimal(movimientos, acumulador)
+        resultados = _cronograma_decimal(
+            totales,
+            cupo_credito,
+            porcentaje_maximo_mensual,
+            periodo_inicial_credito,
+            periodo_final_credito,
+            tasa_interes_anual,
+            estado_inicial,
+        )
+    if acumulador is not None:
+        resultados = resultados.con(subetapas=_atribuir_subetapas(acumulador, resultados))
+    return resultados
+
+
+def calcular_cronograma_por_periodo(
+        totales_por_periodo: Dict[int, Dict[str, Decimal]],
+        cupo_credito: float,
+        porcentaje_maximo_mensual: float,
+        periodo_inicial_credito: int,
+        periodo_final_credito: int,
+        tasa_interes_anual: float,
+) -> ResultadoCronograma:
+    """Igual que :func:`calcular_cronograma` (motor ``"decimal"``) pero a partir de totales ya agregados.
+
+    ``totales_por_periodo`` asocia cada periodo a ``{"ingresos": Decimal, "costos": Decimal}``;
+    permite alimentar el motor sin materializar la lista de movimientos.
+    """
+    _validar_parametros(
+        cupo_credito,
+        porcentaje_maximo_mensual,
+        periodo_inicial_credito,
+        periodo_final_credito,
+        tasa_interes_anual,
+    )
+    with localcontext(prec=PRECISION_DECIMAL):
+        return _cronograma_decimal(
+            totales_por_periodo,
+            cupo_credito,
+            porcentaje_maximo_mensual,
+            periodo_inicial_credito,
+            periodo_final_credito,
+            tasa_interes_anual,
+        )
+
+
+def _to_decimal(value: float) -> Decimal:
+    return value if isinstance(value, Decimal) else Decimal(str(value))
+
+
+def _a_millonesimas(valor: Decimal) -> Decimal:
+    return valor.quantize(MILLONESIMA, rounding=ROUND_HALF_UP)
+
+
+def _agregar_decimal(
+        movimientos: Iterable[Dict[str, float]],
+        acumulador: Optional[_AcumuladorSubetapas] = None,
+) -> Dict[int, Dict[str, Decimal]]:
     movimientos_por_periodo: Dict[int, Dict[str, Decimal]] = {}
     for mov in movimientos:
         periodo = int(mov["periodo"])
         concepto = mov["concepto"]
-        valor = to_decimal(mov["valor"])
+        valor = _to_decimal(mov["valor"])
         periodo_data = movimientos_por_periodo.setdefault(
             periodo, {"ingresos": Decimal("0"), "costos": Decimal("0")}
         )
         if concepto not in ("ingresos", "costos"):
             raise ValueError(f"Concepto desconocido: {concepto}")
         periodo_data[concepto] += valor
+        if acumulador is not None:
+            acumulador.agregar(mov["subetapa"], periodo, concepto, valor)
+    return movimientos_por_periodo
+
+
+def _atribuir_subetapas(acumulador: _AcumuladorSubetapas, resultados: ResultadoCronograma) -> AtribucionSubetapas:
+    """Reparte el desembolso y el aporte de cada periodo entre las subetapas.
+
+    - El desembolso cubre el déficit operativo del periodo, así que se reparte
+      en proporción al déficit de cada subetapa (``max(0, -fco)``).
+    - El aporte cubre el déficit que queda después del crédito; a cada
+      subetapa le corresponde su déficit más la parte del servicio de la
+      deuda (interés pagado y pago de capital) proporcional a lo que se le
+      ha desembolsado hasta el periodo.
+
+    Recorre una vez la matriz subetapa × periodo: O(subetapas × periodos).
+    """
+    periodos = tuple(resultados.periodos)
+    subetapas = tuple(acumulador.indices_subetapa)
+    fco = acumulador.matriz_fco(periodos)
+    n, cantidad = len(periodos), len(subetapas)
+    desembolso = array("d", bytes(8 * cantidad * n))
+    aporte_capital = array("d", bytes(8 * cantidad * n))
+    desembolsado = [0.0] * cantidad
+
+    columnas = zip(
+        resultados.columna("desembolso"),
+        resultados.columna("interes_pagado"),
+        resultados.columna("pago_credito"),
+        resultados.columna("aporte_capital"),
+    )
+    for j, (desembolso_periodo, interes_pagado, pago_credito, aporte) in enumerate(columnas):
+        deficit = [max(0.0, -fco[s * n + j]) for s in range(cantidad)]
+        total_deficit = sum(deficit)
+        monto = float(desembolso_periodo)
+        if monto and total_deficit:
+            for s in range(cantidad):
+                desembolso[s * n + j] = monto * deficit[s] / total_deficit
+                desembolsado[s] += desembolso[s * n + j]
+
+        monto = float(aporte)
+        if not monto:
+            continue
+        servicio = float(interes_pagado) + float(pago_credito)
+        total_desembolsado = sum(desembolsado)
+        cargas = [
+            deficit[s] + (servicio * desembolsado[s] / total_desembolsado if total_desembolsado else 0.0)
+            for s in range(cantidad)
+        ]
+        total_cargas = sum(cargas)
+        if total_cargas:
+            for s in range(cantidad):
+                aporte_capital[s * n + j] = monto * cargas[s] / total_cargas
+
+    return AtribucionSubetapas(subetapas, periodos, fco, desembolso, aporte_capital)
+
+
+def _periodos_pago_capital(movimientos_por_periodo: Dict[int, Dict[str, Decimal]]) -> List[int]:
+    periodos_con_ingresos = [p for p in sorted(movimientos_por_periodo) if movimientos_por_periodo[p]["ingresos"] > 0]
+    return periodos_con_ingresos[-2:] if len(periodos_con_ingresos) >= 2 else periodos_con_ingresos
+
+
+def _cronograma_decimal(
+        movimientos_por_periodo: Dict[int, Dict[str, Decimal]],
+        cupo_credito: float,
+        porcentaje_maximo_mensual: float,
+        periodo_inicial_credito: int,
+        periodo_final_credito: int,
+        tasa_interes_anual: float,
+        estado_inicial: Optional[EstadoCronograma] = None,
+) -> ResultadoCronograma:
+    to_decimal = _to_decimal
+
+    cupo_total = to_decimal(cupo_credito)
+    porcentaje_mensual = to_decimal(porcentaje_maximo_mensual)
+    if porcentaje_mensual > 1:
+        porcentaje_mensual = porcentaje_mensual / Decimal("100")
+    tasa_anual = to_decimal(tasa_interes_anual)
+    if tasa_anual > 1:
+        tasa_anual = tasa_anual / Decimal("100")
 
     periodos = sorted(movimientos_por_periodo.keys())
     if not periodos:
-        return {"creditos": [], "aportes": []}
+        return ResultadoCronograma.vacio(estados=[])
 
     periodos_con_ingresos = [p for p in periodos if movimientos_por_periodo[p]["ingresos"] > 0]
-    periodos_pago_capital = periodos_con_ingresos[-2:] if len(periodos_con_ingresos) >= 2 else periodos_con_ingresos
+    periodos_pago_capital = _periodos_pago_capital(movimientos_por_periodo)
     periodos_pago_restantes = len(periodos_pago_capital)
 
     primer_periodo_ingreso = min(periodos_con_ingresos) if periodos_con_ingresos else None
@@ -70,11 +413,21 @@ def calcular_cronograma(
     interes_por_pagar = Decimal("0")
     flujo_acumulado = Decimal("0")
     cupo_restante = cupo_total
-    maximo_mensual = cupo_total * porcentaje_mensual
+    maximo_mensual = _a_millonesimas(cupo_total * porcentaje_mensual)
+
+    if estado_inicial is not None:
+        # Se retoma el cálculo después del periodo del punto de control.
+        periodos = [periodo for periodo in periodos if periodo > estado_inicial.periodo]
+        saldo_credito = estado_inicial.saldo_credito
+        interes_por_pagar = estado_inicial.interes_por_pagar
+        flujo_acumulado = estado_inicial.flujo_acumulado
+        cupo_restante = estado_inicial.cupo_restante
+        periodos_pago_restantes = estado_inicial.periodos_pago_restantes
 
-    creditos: List[Dict[str, Decimal]] = []
-    aportes: List[Dict[str, Decimal]] = []
-    test: List[Dict[str, Decimal]] = []
+    # Una lista por columna de la tabla (en el orden de CAMPOS_TABLA, sin el periodo).
+    columnas: Dict[str, List[Decimal]] = {campo: [] for campo in CAMPOS_TABLA[1:]}
+    agregar = [columna.append for columna in columnas.values()]
+    estados: List[EstadoCronograma] = []
 
     for periodo in periodos:
         datos = movimientos_por_periodo[periodo]
@@ -93,31 +446,29 @@ def calcular_cronograma(
             saldo_credito += desembolso
             cupo_restante -= desembolso
 
-        interes_generado = saldo_credito * tasa_mensual
+        # Se divide al final: con montos de hasta seis decimales el interés es
+        # exacto antes de redondearlo, igual que en el motor "centavos".
+        interes_generado = _a_millonesimas(saldo_credito * tasa_anual / Decimal("12"))
         interes_por_pagar = interes_generado
 
         pago_credito = Decimal("0")
         if periodo in periodos_pago_capital and periodos_pago_restantes:
             if saldo_credito > 0:
-                pago_credito = saldo_credito / Decimal(str(periodos_pago_restantes))
+                pago_credito = _a_millonesimas(saldo_credito / Decimal(str(periodos_pago_restantes)))
                 saldo_credito -= pago_credito
             periodos_pago_restantes -= 1
 
         flujo_neto = flujo_operativo + desembolso - interes_pagado - pago_credito
 
-        # https: // storage.googleapis.com / siga - cdn - bucket / temporal_dm / datos_gerpro_prueba_v2.json
-        # Porcentaje máximo mensual 20 %
-
+        # El excedente acumulado cubre los déficits siguientes; lo que falte lo cubre un aporte de capital.
         if flujo_neto > 0:
             flujo_acumulado += flujo_neto
-
-
         if flujo_acumulado > 0 and flujo_neto < 0:
             diferencia = flujo_acumulado - abs(flujo_neto)
             if diferencia > 0:
                 flujo_acumulado = diferencia
                 flujo_neto2 = Decimal("0")
-            else:  # -1000
+            else:
                 flujo_neto2 = diferencia
                 valor = flujo_neto - diferencia
                 flujo_acumulado += valor
@@ -127,39 +478,613 @@ def calcular_cronograma(
         aporte_capital = max(Decimal("0"), -flujo_neto2)
         flujo_apalancado = flujo_neto2 + aporte_capital
 
-        creditos.append(
-            {
-                "periodo": Decimal(periodo),
-                "ingresos": ingresos,
-                "costos": costos,
-                "fco": flujo_operativo,
-                "desembolso": desembolso,
-                "saldo": saldo_credito,
-                "interes_generado": interes_generado,
-                "interes_pagado": interes_pagado,
-                "pago_credito": pago_credito,
-                "fcn": flujo_neto,
-            }
+        fila = (
+            ingresos,
+            costos,
+            flujo_operativo,
+            desembolso,
+            saldo_credito,
+            interes_generado,
+            interes_pagado,
+            pago_credito,
+            flujo_neto,
+            aporte_capital,
+            flujo_apalancado,
+            flujo_acumulado,
         )
-        aportes.append(
-            {
-                "periodo": Decimal(periodo),
-                "aporte_capital": aporte_capital,
-                "flujo_apalancado": flujo_apalancado,
-                "flujo_acumulado": flujo_acumulado,
-            }
+        for agregar_valor, valor in zip(agregar, fila):
+            agregar_valor(valor)
+        estados.append(
+            EstadoCronograma(
+                periodo=periodo,
+                saldo_credito=saldo_credito,
+                cupo_restante=cupo_restante,
+                interes_por_pagar=interes_por_pagar,
+                flujo_acumulado=flujo_acumulado,
+                periodos_pago_restantes=periodos_pago_restantes,
+            )
         )
 
-        test.append(
-            {
-                "periodo": Decimal(periodo),
-                "flujo neto": flujo_neto,
-                "aporte capital": aporte_capital,
-                "flujo apalancado": flujo_apalancado,
-                "flujo acumulado": flujo_acumulado,
-            }
+    return ResultadoCronograma(periodos, columnas, estados=estados)
+
+
+def recalcular_cronograma(
+        movimientos: Sequence[Dict[str, float]],
+        anterior: ResultadoCronograma,
+        cupo_credito: float,
+        porcentaje_maximo_mensual: float,
+        periodo_inicial_credito: int,
+        periodo_final_credito: int,
+        tasa_interes_anual: float,
+) -> ResultadoCronograma:
+    """Recalcula un cronograma retomando desde el primer periodo que cambió.
+
+    ``anterior`` debe ser el resultado de :func:`calcular_cronograma` (motor
+    ``"decimal"``) con los mismos parámetros del crédito. Un periodo cambia si
+    difieren sus ingresos o costos, si aparece o desaparece, o si cambia su
+    pertenencia a la ventana de ingresos o a los periodos de pago de capital.
+    Los periodos anteriores se copian de ``anterior`` y el cálculo se reanuda
+    desde el :class:`EstadoCronograma` del último periodo sin cambios.
+
+    El resultado incluye ``desde``: el primer periodo recalculado. Si nada
+    cambió es el siguiente al último periodo y los periodos se copian tal cual.
+    """
+    _validar_parametros(
+        cupo_credito,
+        porcentaje_maximo_mensual,
+        periodo_inicial_credito,
+        periodo_final_credito,
+        tasa_interes_anual,
+    )
+    with localcontext(prec=PRECISION_DECIMAL):
+        nuevos = _agregar_decimal(movimientos)
+        previos = {
+            periodo: {"ingresos": ingresos, "costos": costos}
+            for periodo, ingresos, costos in zip(
+                anterior.periodos, anterior.columna("ingresos"), anterior.columna("costos")
+            )
+        }
+        desde = _primer_periodo_distinto(previos, nuevos)
+        if desde is None:
+            return anterior.con(desde=max(previos, default=0) + 1)
+
+        punto_de_control = None
+        for estado in anterior.get("estados", []):
+            if estado.periodo >= desde:
+                break
+            punto_de_control = estado
+        if punto_de_control is not None:
+            # Los periodos de pago previos a ``desde`` coinciden en ambos datasets, por lo
+            # que los pagos pendientes se derivan del nuevo total menos los ya realizados.
+            pagos = _periodos_pago_capital(nuevos)
+            realizados = sum(1 for periodo in pagos if periodo <= punto_de_control.periodo)
+            punto_de_control = punto_de_control._replace(periodos_pago_restantes=len(pagos) - realizados)
+
+        cola = _cronograma_decimal(
+            nuevos,
+            cupo_credito,
+            porcentaje_maximo_mensual,
+            periodo_inicial_credito,
+            periodo_final_credito,
+            tasa_interes_anual,
+            punto_de_control,
+        )
+        if punto_de_control is None:
+            return cola.con(desde=desde)
+        return anterior.concatenar(
+            cola,
+            anterior.antes_de(desde),
+            estados=[estado for estado in anterior["estados"] if estado.periodo < desde] + cola["estados"],
+            desde=desde,
+        )
+
+
+def _primer_periodo_distinto(
+        previos: Dict[int, Dict[str, Decimal]],
+        nuevos: Dict[int, Dict[str, Decimal]],
+) -> Optional[int]:
+    def firmas(por_periodo: Dict[int, Dict[str, Decimal]]) -> Dict[int, tuple]:
+        periodos = sorted(por_periodo)
+        con_ingresos = [p for p in periodos if por_periodo[p]["ingresos"] > 0]
+        pagos = set(_periodos_pago_capital(por_periodo))
+        primero, ultimo = (con_ingresos[0], con_ingresos[-1]) if con_ingresos else (None, None)
+        return {
+            p: (
+                por_periodo[p]["ingresos"],
+                por_periodo[p]["costos"],
+                primero is not None and primero <= p <= ultimo,
+                p in pagos,
+            )
+            for p in periodos
+        }
+
+    firmas_previas = firmas(previos)
+    firmas_nuevas = firmas(nuevos)
+    distintos = [
+        periodo
+        for periodo in sorted(firmas_previas.keys() | firmas_nuevas.keys())
+        if firmas_previas.get(periodo) != firmas_nuevas.get(periodo)
+    ]
+    pagos_previos = _periodos_pago_capital(previos)
+    pagos_nuevos = _periodos_pago_capital(nuevos)
+    if len(pagos_previos) != len(pagos_nuevos):
+        # Cambia el divisor del pago de capital desde el primer periodo de pago.
+        distintos.append(min(pagos_previos + pagos_nuevos))
+    return min(distintos) if distintos else None
+
+
+def agregar_movimientos(movimientos: Iterable[Dict[str, float]]) -> SeriePeriodos:
+    """Agrega ingresos y costos por periodo en ``float``.
+
+    Usa ``numpy.bincount`` cuando numpy está disponible y un diccionario en
+    caso contrario.
+    """
+    if np is not None:
+        movimientos = movimientos if isinstance(movimientos, Sequence) else list(movimientos)
+        cantidad = len(movimientos)
+        periodo_mov = np.fromiter((int(mov["periodo"]) for mov in movimientos), dtype=np.int64, count=cantidad)
+        valor_mov = np.fromiter((float(mov["valor"]) for mov in movimientos), dtype=np.float64, count=cantidad)
+        conceptos = [mov["concepto"] for mov in movimientos]
+        es_ingreso = np.fromiter((concepto == "ingresos" for concepto in conceptos), dtype=bool, count=cantidad)
+        desconocidos = ~es_ingreso & np.fromiter(
+            (concepto != "costos" for concepto in conceptos), dtype=bool, count=cantidad
+        )
+        if desconocidos.any():
+            raise ValueError(f"Concepto desconocido: {conceptos[int(np.argmax(desconocidos))]}")
+        periodos_arr, indice = np.unique(periodo_mov, return_inverse=True)
+        minimo = len(periodos_arr)
+        periodos = tuple(periodos_arr.tolist())
+        ingresos = tuple(np.bincount(indice, weights=np.where(es_ingreso, valor_mov, 0.0), minlength=minimo).tolist())
+        costos = tuple(np.bincount(indice, weights=np.where(es_ingreso, 0.0, valor_mov), minlength=minimo).tolist())
+    else:
+        totales: Dict[int, List[float]] = {}
+        for mov in movimientos:
+            concepto = mov["concepto"]
+            if concepto not in ("ingresos", "costos"):
+                raise ValueError(f"Concepto desconocido: {concepto}")
+            periodo_data = totales.setdefault(int(mov["periodo"]), [0.0, 0.0])
+            periodo_data[0 if concepto == "ingresos" else 1] += float(mov["valor"])
+        periodos = tuple(sorted(totales))
+        ingresos = tuple(totales[periodo][0] for periodo in periodos)
+        costos = tuple(totales[periodo][1] for periodo in periodos)
+    return _serie_desde_totales(periodos, ingresos, costos)
+
+
+def _serie_desde_totales(
+        periodos: Tuple[int, ...],
+        ingresos: Tuple[float, ...],
+        costos: Tuple[float, ...],
+) -> SeriePeriodos:
+    periodos_con_ingresos = [periodo for periodo, ingreso in zip(periodos, ingresos) if ingreso > 0]
+    periodos_pago_capital = set(periodos_con_ingresos[-2:])
+    if periodos_con_ingresos:
+        primero, ultimo = periodos_con_ingresos[0], periodos_con_ingresos[-1]
+        dentro_de_ingresos = tuple(primero <= periodo <= ultimo for periodo in periodos)
+    else:
+        dentro_de_ingresos = (False,) * len(periodos)
+    return SeriePeriodos(
+        periodos=periodos,
+        ingresos=ingresos,
+        costos=costos,
+        dentro_de_ingresos=dentro_de_ingresos,
+        paga_capital=tuple(periodo in periodos_pago_capital for periodo in periodos),
+    )
+
+
+def _normalizar_tasas(porcentaje_maximo_mensual: float, tasa_interes_anual: float) -> Tuple[float, float]:
+    """Convierte porcentajes (8, 12) a fracciones y la tasa anual a mensual."""
+    porcentaje_mensual = float(porcentaje_maximo_mensual)
+    if porcentaje_mensual > 1:
+        porcentaje_mensual /= 100
+    tasa_anual = float(tasa_interes_anual)
+    if tasa_anual > 1:
+        tasa_anual /= 100
+    return porcentaje_mensual, tasa_anual / 12
+
+
+def _recurrencia_credito(
+        serie: SeriePeriodos,
+        cupo_credito: float,
+        porcentaje_maximo_mensual: float,
+        periodo_inicial_credito: int,
+        periodo_final_credito: int,
+        tasa_interes_anual: float,
+) -> Dict[str, List[float]]:
+    """Recorre los periodos aplicando desembolsos, intereses y pagos de capital en ``float``.
+
+    Es la única parte inherentemente secuencial del cronograma: cada periodo
+    depende del saldo y del cupo restante del anterior.
+    """
+    porcentaje_mensual, tasa_mensual = _normalizar_tasas(porcentaje_maximo_mensual, tasa_interes_anual)
+    cupo_restante = float(cupo_credito)
+    maximo_mensual = cupo_restante * porcentaje_mensual
+
+    n = len(serie.periodos)
+    desembolso = [0.0] * n
+    saldo = [0.0] * n
+    interes_generado = [0.0] * n
+    interes_pagado = [0.0] * n
+    pago_credito = [0.0] * n
+    saldo_credito = 0.0
+    interes_por_pagar = 0.0
+    periodos_pago_restantes = sum(serie.paga_capital)
+    filas = zip(serie.periodos, serie.ingresos, serie.costos, serie.dentro_de_ingresos, serie.paga_capital)
+    for i, (periodo, ingresos, costos, dentro, paga) in enumerate(filas):
+        interes_pagado[i] = interes_por_pagar
+        necesidad = costos - ingresos
+        if (
+                dentro
+                and necesidad > 0
+                and cupo_restante > 0
+                and periodo_inicial_credito <= periodo <= periodo_final_credito
+        ):
+            monto = min(necesidad, maximo_mensual, cupo_restante)
+            desembolso[i] = monto
+            saldo_credito += monto
+            cupo_restante -= monto
+        interes_por_pagar = saldo_credito * tasa_mensual
+        interes_generado[i] = interes_por_pagar
+        if paga and periodos_pago_restantes:
+            if saldo_credito > 0:
+                pago = saldo_credito / periodos_pago_restantes
+                pago_credito[i] = pago
+                saldo_credito -= pago
+            periodos_pago_restantes -= 1
+        saldo[i] = saldo_credito
+    return {
+        "desembolso": desembolso,
+        "saldo": saldo,
+        "interes_generado": interes_generado,
+        "interes_pagado": interes_pagado,
+        "pago_credito": pago_credito,
+    }
+
+
+def _calcular_cronograma_numpy(
+        movimientos: Sequence[Dict[str, float]],
+        cupo_credito: float,
+        porcentaje_maximo_mensual: float,
+        periodo_inicial_credito: int,
+        periodo_final_credito: int,
+        tasa_interes_anual: float,
+) -> ResultadoCronograma:
+    """Variante vectorizada de :func:`calcular_cronograma` sobre enteros en millonésimas de peso.
+
+    La agregación por periodo (:func:`_agregar_unidades_numpy`) y los flujos
+    acumulados se resuelven con operaciones de arreglo en ``int64``; solo la
+    recurrencia del crédito se recorre periodo a periodo, con la misma
+    aritmética entera del motor ``"centavos"`` (:func:`_credito_en_unidades`).
+    Con enteros no hay errores de representación: los montos que caen justo
+    en medio centavo se redondean igual que con ``Decimal``.
+    """
+    if np is None:
+        raise ValueError("El motor 'numpy' requiere tener numpy instalado.")
+
+    periodos, ingresos, costos = _agregar_unidades_numpy(movimientos)
+    if not periodos:
+        return ResultadoCronograma.vacio()
+    columnas = _credito_en_unidades(
+        periodos,
+        ingresos.tolist(),
+        costos.tolist(),
+        cupo_credito,
+        porcentaje_maximo_mensual,
+        periodo_inicial_credito,
+        periodo_final_credito,
+        tasa_interes_anual,
+    )
+
+    # El flujo acumulado nunca baja de cero: acumulado_t = max(0, acumulado_t-1 + fcn_t),
+    # que equivale a la suma acumulada menos su mínimo corrido (acotado en cero).
+    flujo_neto = np.frombuffer(columnas["fcn"], dtype=np.int64)
+    suma = np.cumsum(flujo_neto)
+    flujo_acumulado = suma - np.minimum.accumulate(np.minimum(suma, 0))
+    acumulado_previo = np.concatenate(([0], flujo_acumulado[:-1]))
+    columnas["aporte_capital"] = array("q", np.maximum(0, -(acumulado_previo + flujo_neto)).tobytes())
+    columnas["flujo_apalancado"] = array("q", np.maximum(flujo_neto, 0).tobytes())
+    columnas["flujo_acumulado"] = array("q", flujo_acumulado.tobytes())
+    return ResultadoCronograma(periodos, columnas, escala=ESCALA_CENTAVOS)
+
+
+def _agregar_unidades_numpy(movimientos: Sequence[Dict[str, float]]) -> Tuple[List[int], "np.ndarray", "np.ndarray"]:
+    """Periodos e ingresos y costos por periodo en millonésimas (``int64``), como :func:`_agregar_unidades`.
+
+    Los montos por debajo de :data:`LIMITE_FLOAT_EXACTO` se convierten con
+    ``rint(float(valor) * 10**6)``, exacto con hasta seis decimales (ver
+    :func:`_agregar_unidades`); los demás pasan uno por uno por :func:`_a_unidades`.
+    """
+    movimientos = movimientos if isinstance(movimientos, Sequence) else list(movimientos)
+    cantidad = len(movimientos)
+    periodo_mov = np.fromiter((int(mov["periodo"]) for mov in movimientos), dtype=np.int64, count=cantidad)
+    valores = [mov["valor"] for mov in movimientos]
+    valor_mov = np.fromiter((float(valor) for valor in valores), dtype=np.float64, count=cantidad)
+    conceptos = [mov["concepto"] for mov in movimientos]
+    es_ingreso = np.fromiter((concepto == "ingresos" for concepto in conceptos), dtype=bool, count=cantidad)
+    desconocidos = ~es_ingreso & np.fromiter(
+        (concepto != "costos" for concepto in conceptos), dtype=bool, count=cantidad
+    )
+    if desconocidos.any():
+        raise ValueError(f"Concepto desconocido: {conceptos[int(np.argmax(desconocidos))]}")
+
+    exactos = np.abs(valor_mov) < LIMITE_FLOAT_EXACTO
+    unidades = np.zeros(cantidad, dtype=np.int64)
+    unidades[exactos] = np.rint(valor_mov[exactos] * FACTOR_CENTAVOS)
+    for posicion in np.flatnonzero(~exactos).tolist():
+        unidades[posicion] = _a_unidades(valores[posicion])
+
+    periodos, indice = np.unique(periodo_mov, return_inverse=True)
+    # ``bincount`` suma en float64; ``add.at`` mantiene la suma entera y exacta.
+    ingresos = np.zeros(len(periodos), dtype=np.int64)
+    costos = np.zeros(len(periodos), dtype=np.int64)
+    np.add.at(ingresos, indice[es_ingreso], unidades[es_ingreso])
+    np.add.at(costos, indice[~es_ingreso], unidades[~es_ingreso])
+    return periodos.tolist(), ingresos, costos
+
+
+def _a_unidades(valor: float) -> int:
+    """Monto en millonésimas de peso; lo que pase de seis decimales se redondea (mitad hacia arriba)."""
+    return int(_to_decimal(valor).scaleb(ESCALA_CENTAVOS).to_integral_value(rounding=ROUND_HALF_UP))
+
+
+def _agregar_unidades(movimientos: Iterable[Dict[str, float]]) -> Dict[int, Dict[str, int]]:
+    """Como :func:`_agregar_decimal`, pero cada monto se suma ya convertido a millonésimas enteras.
+
+    Un ``float`` por debajo de :data:`LIMITE_FLOAT_EXACTO` se convierte con
+    ``round(valor * 10**6)``: si el monto tiene hasta seis decimales, el error
+    de representación más el del producto no llega a media millonésima y el
+    entero es exacto; con más decimales queda redondeado al más cercano. Los
+    demás montos (``Decimal``, enteros, texto) pasan por :func:`_a_unidades`.
+    """
+    totales: Dict[int, Dict[str, int]] = {}
+    for mov in movimientos:
+        concepto = mov["concepto"]
+        if concepto not in ("ingresos", "costos"):
+            raise ValueError(f"Concepto desconocido: {concepto}")
+        periodo = int(mov["periodo"])
+        conceptos = totales.get(periodo)
+        if conceptos is None:
+            conceptos = totales[periodo] = {"ingresos": 0, "costos": 0}
+        valor = mov["valor"]
+        if type(valor) is float and -LIMITE_FLOAT_EXACTO < valor < LIMITE_FLOAT_EXACTO:
+            conceptos[concepto] += round(valor * FACTOR_CENTAVOS)
+        else:
+            conceptos[concepto] += _a_unidades(valor)
+    return totales
+
+
+def _fraccion(valor: float) -> Tuple[int, int]:
+    """Porcentaje como fracción exacta ``(numerador, denominador)``; 8 y 0.08 dan lo mismo."""
+    numerador, denominador = _to_decimal(valor).as_integer_ratio()
+    if numerador > denominador:
+        denominador *= 100
+    return numerador, denominador
+
+
+def _dividir(numerador: int, denominador: int) -> int:
+    """``numerador / denominador`` (``denominador > 0``) al entero más cercano, mitades lejos de cero."""
+    cociente, resto = divmod(abs(numerador), denominador)
+    if 2 * resto >= denominador:
+        cociente += 1
+    return cociente if numerador >= 0 else -cociente
+
+
+def _calcular_cronograma_centavos(
+        movimientos: Iterable[Dict[str, float]],
+        cupo_credito: float,
+        porcentaje_maximo_mensual: float,
+        periodo_inicial_credito: int,
+        periodo_final_credito: int,
+        tasa_interes_anual: float,
+) -> ResultadoCronograma:
+    """Variante de :func:`calcular_cronograma` con aritmética entera.
+
+    Cada monto se lee directamente como entero en millonésimas de peso
+    (:data:`ESCALA_CENTAVOS`, ver :func:`_agregar_unidades`), así que tanto la suma por
+    periodo como la recurrencia del motor ``"decimal"`` se resuelven con
+    enteros de Python (ver :func:`_credito_en_unidades`).
+
+    El motor ``"decimal"`` redondea a la millonésima en los mismos puntos
+    y con la misma regla, así que para montos de hasta seis decimales ambos
+    dan exactamente los mismos valores. Las columnas se
+    guardan en ``array('q')``, lo que limita los montos a unos 9 billones.
+    """
+    totales = _agregar_unidades(movimientos)
+    if not totales:
+        return ResultadoCronograma.vacio()
+
+    periodos = sorted(totales)
+    columnas = _credito_en_unidades(
+        periodos,
+        [totales[periodo]["ingresos"] for periodo in periodos],
+        [totales[periodo]["costos"] for periodo in periodos],
+        cupo_credito,
+        porcentaje_maximo_mensual,
+        periodo_inicial_credito,
+        periodo_final_credito,
+        tasa_interes_anual,
+    )
+
+    flujo_acumulado = 0
+    for nombre in ("aporte_capital", "flujo_apalancado", "flujo_acumulado"):
+        columnas[nombre] = array("q")
+    agregar_aporte = columnas["aporte_capital"].append
+    agregar_apalancado = columnas["flujo_apalancado"].append
+    agregar_acumulado = columnas["flujo_acumulado"].append
+    for flujo_neto in columnas["fcn"]:
+        # Mismas reglas que el motor "decimal": el excedente acumulado cubre los
+        # déficits siguientes y lo que falte lo cubre un aporte de capital.
+        if flujo_neto > 0:
+            flujo_acumulado += flujo_neto
+        if flujo_acumulado > 0 and flujo_neto < 0:
+            diferencia = flujo_acumulado + flujo_neto
+            if diferencia > 0:
+                flujo_acumulado = diferencia
+                por_cubrir = 0
+            else:
+                por_cubrir = diferencia
+                flujo_acumulado = 0
+        else:
+            por_cubrir = flujo_neto
+        aporte_capital = max(0, -por_cubrir)
+        agregar_aporte(aporte_capital)
+        agregar_apalancado(por_cubrir + aporte_capital)
+        agregar_acumulado(flujo_acumulado)
+
+    return ResultadoCronograma(periodos, columnas, escala=ESCALA_CENTAVOS)
+
+
+def _credito_en_unidades(
+        periodos: Sequence[int],
+        ingresos: Sequence[int],
+        costos: Sequence[int],
+        cupo_credito: float,
+        porcentaje_maximo_mensual: float,
+        periodo_inicial_credito: int,
+        periodo_final_credito: int,
+        tasa_interes_anual: float,
+) -> Dict[str, array]:
+    """Recurrencia del crédito sobre totales por periodo en millonésimas enteras.
+
+    Retorna las columnas de ``ingresos`` a ``fcn`` en ``array('q')``. Sumas y
+    restas son exactas; solo se redondea, al entero más cercano con mitades
+    lejos de cero, en tres puntos:
+
+    - el máximo mensual (``cupo * porcentaje``), una vez;
+    - el interés de cada periodo (``saldo * tasa_anual / 12``);
+    - cada cuota de capital (``saldo / pagos restantes``); la última cuota
+      es el saldo completo, así que la deuda siempre queda en cero.
+
+    La comparten los motores ``"centavos"`` y ``"numpy"``.
+    """
+    periodos_con_ingresos = [periodo for periodo, ingreso in zip(periodos, ingresos) if ingreso > 0]
+    periodos_pago_capital = set(periodos_con_ingresos[-2:])
+    periodos_pago_restantes = len(periodos_pago_capital)
+    primer_periodo_ingreso = periodos_con_ingresos[0] if periodos_con_ingresos else None
+    ultimo_periodo_ingreso = periodos_con_ingresos[-1] if periodos_con_ingresos else None
+
+    porcentaje_numerador, porcentaje_denominador = _fraccion(porcentaje_maximo_mensual)
+    tasa_numerador, tasa_denominador = _fraccion(tasa_interes_anual)
+    tasa_denominador *= 12
+    cupo_restante = _a_unidades(cupo_credito)
+    maximo_mensual = _dividir(cupo_restante * porcentaje_numerador, porcentaje_denominador)
+
+    saldo_credito = 0
+    interes_por_pagar = 0
+    columnas = {campo: array("q") for campo in CAMPOS_TABLA[1:10]}
+    agregar = [columna.append for columna in columnas.values()]
+
+    for periodo, ingreso, costo in zip(periodos, ingresos, costos):
+        flujo_operativo = ingreso - costo
+
+        interes_pagado = interes_por_pagar
+        desembolso = 0
+        if (
+                -flujo_operativo > 0
+                and cupo_restante > 0
+                and periodo_inicial_credito <= periodo <= periodo_final_credito
+                and primer_periodo_ingreso is not None
+                and primer_periodo_ingreso <= periodo <= ultimo_periodo_ingreso
+        ):
+            desembolso = min(-flujo_operativo, maximo_mensual, cupo_restante)
+            saldo_credito += desembolso
+            cupo_restante -= desembolso
+
+        interes_generado = _dividir(saldo_credito * tasa_numerador, tasa_denominador)
+        interes_por_pagar = interes_generado
+
+        pago_credito = 0
+        if periodo in periodos_pago_capital and periodos_pago_restantes:
+            if saldo_credito > 0:
+                pago_credito = _dividir(saldo_credito, periodos_pago_restantes)
+                saldo_credito -= pago_credito
+            periodos_pago_restantes -= 1
+
+        fila = (
+            ingreso,
+            costo,
+            flujo_operativo,
+            desembolso,
+            saldo_credito,
+            interes_generado,
+            interes_pagado,
+            pago_credito,
+            flujo_operativo + desembolso - interes_pagado - pago_credito,
         )
+        for agregar_valor, valor in zip(agregar, fila):
+            agregar_valor(valor)
+    return columnas
+
+
+def _resumir_escenario(serie: SeriePeriodos, parametros: Dict[str, float]) -> Dict[str, float]:
+    credito = _recurrencia_credito(serie, **parametros)
+    total_aporte = 0.0
+    flujo_acumulado = 0.0
+    for ingresos, costos, desembolso, interes_pagado, pago_credito in zip(
+            serie.ingresos,
+            serie.costos,
+            credito["desembolso"],
+            credito["interes_pagado"],
+            credito["pago_credito"],
+    ):
+        flujo_neto = ingresos - costos + desembolso - interes_pagado - pago_credito
+        disponible = flujo_acumulado + flujo_neto
+        if disponible < 0:
+            total_aporte -= disponible
+        flujo_acumulado = max(0.0, disponible)
+    return {
+        **parametros,
+        "total_desembolso": sum(credito["desembolso"]),
+        "total_aporte": total_aporte,
+        "saldo_maximo": max(credito["saldo"], default=0.0),
+        "total_interes": sum(credito["interes_generado"]),
+    }
+
+
+def _resumir_lote(serie: SeriePeriodos, lote: List[Dict[str, float]]) -> List[Dict[str, float]]:
+    return [_resumir_escenario(serie, parametros) for parametros in lote]
+
+
+def calcular_escenarios(
+        movimientos: Iterable[Dict[str, float]],
+        grid: Mapping[str, Iterable[float]],
+        max_workers: Optional[int] = None,
+        tamano_lote: int = 500,
+) -> List[Dict[str, float]]:
+    """Evalúa una grilla de parámetros del crédito sobre un mismo dataset.
+
+    ``grid`` asocia cada nombre de :data:`PARAMETROS_CREDITO` a una lista de
+    valores (o a un valor único). Los movimientos se agregan una sola vez y
+    cada combinación reutiliza la serie por periodo. Las combinaciones con
+    periodo inicial mayor al final se omiten. Con ``max_workers`` mayor a uno
+    los lotes se reparten en un ``ProcessPoolExecutor``.
+
+    Retorna, por escenario, los parámetros junto con ``total_desembolso``,
+    ``total_aporte``, ``saldo_maximo`` y ``total_interes`` en ``float`` sin
+    redondear.
+    """
+    faltantes = [nombre for nombre in PARAMETROS_CREDITO if nombre not in grid]
+    if faltantes:
+        raise ValueError(f"Faltan parámetros en la grilla: {', '.join(faltantes)}")
+    desconocidos = [nombre for nombre in grid if nombre not in PARAMETROS_CREDITO]
+    if desconocidos:
+        raise ValueError(f"Parámetros desconocidos en la grilla: {', '.join(desconocidos)}")
 
-    return {"creditos": creditos, "aportes": aportes}
+    valores = [
+        list(grid[nombre]) if isinstance(grid[nombre], Iterable) else [grid[nombre]]
+        for nombre in PARAMETROS_CREDITO
+    ]
+    escenarios = []
+    for combinacion in itertools.product(*valores):
+        parametros = dict(zip(PARAMETROS_CREDITO, combinacion))
+        if parametros["periodo_inicial_credito"] > parametros["periodo_final_credito"]:
+            continue
+        _validar_parametros(**parametros)
+        escenarios.append(parametros)
 
-    # return {"test": test}
\ No newline at end of file
+    serie = agregar_movimientos(movimientos)
+    lotes = [escenarios[i:i + tamano_lote] for i in range(0, len(escenarios), tamano_lote)]
+    if not max_workers or max_workers <= 1 or len(lotes) <= 1:
+        return [resumen for lote in lotes for resumen in _resumir_lote(serie, lote)]
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        resultados = executor.map(_resumir_lote, itertools.repeat(serie), lotes)
+        return [resumen for lote in resultados for resumen in lote]
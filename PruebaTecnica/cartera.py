@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import time
+from concurrent.futures import as_completed
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional
+
+from .cache import obtener_cache_resultados
+from .calculos import PARAMETROS_CREDITO
+from .models import CreditoConstructor, ResumenPeriodo
+from .persistencia import guardar_recalculo
+from .procesos import Totales, calcular_proyecto, crear_pool_procesos
+from .servicios import parametros_credito
+
+class ResultadoProyecto(NamedTuple):
+    """Resumen del recálculo de un proyecto de la cartera."""
+
+    proyecto: str
+    periodos: int
+    segundos_calculo: float
+    segundos_guardado: float
+    error: str = ""
+
+
+def parametros_guardados(credito: CreditoConstructor) -> dict:
+    """Parámetros del crédito almacenado con los nombres de :data:`~PruebaTecnica.calculos.PARAMETROS_CREDITO`."""
+    return {
+        "cupo_credito": credito.cupo_total,
+        "porcentaje_maximo_mensual": credito.porcentaje_maximo_mensual,
+        "periodo_inicial_credito": credito.periodo_inicial,
+        "periodo_final_credito": credito.periodo_final,
+        "tasa_interes_anual": credito.tasa_interes_anual,
+    }
+
+
+def recalcular_cartera(
+        proyectos: Optional[Iterable[str]] = None,
+        cambios: Optional[dict] = None,
+        max_workers: Optional[int] = None,
+        guardar: bool = True,
+        al_terminar: Optional[Callable[[ResultadoProyecto], None]] = None,
+) -> List[ResultadoProyecto]:
+    """Recalcula el cronograma de todos los proyectos con crédito (o solo de ``proyectos``).
+
+    Los totales por periodo de todos los proyectos se leen de
+    :class:`~PruebaTecnica.models.ResumenPeriodo` en una consulta y cada
+    cálculo corre en un pool de ``max_workers`` procesos iniciados con
+    ``spawn`` (en el proceso actual si es ``None`` o 1), que ejecutan
+    :func:`~PruebaTecnica.procesos.calcular_proyecto` sin cargar Django ni
+    usar la base: a medida que terminan, el proceso principal guarda el
+    cronograma de cada proyecto en su propia transacción. ``cambios`` reemplaza parámetros del
+    crédito en todos los proyectos, por ejemplo ``{"tasa_interes_anual": 14}``.
+    ``al_terminar`` recibe el :class:`ResultadoProyecto` de cada proyecto.
+    """
+    cambios = cambios or {}
+    desconocidos = set(cambios) - set(PARAMETROS_CREDITO)
+    if desconocidos:
+        raise ValueError(f"Parámetros desconocidos: {', '.join(sorted(desconocidos))}")
+
+    creditos = CreditoConstructor.objects.select_related("proyecto").order_by("proyecto__nombre")
+    if proyectos is not None:
+        creditos = creditos.filter(proyecto__nombre__in=list(proyectos))
+    creditos = {credito.proyecto_id: credito for credito in creditos}
+    totales = _totales_por_proyecto(creditos)
+    parametros = {
+        proyecto_id: {**parametros_guardados(credito), **cambios}
+        for proyecto_id, credito in creditos.items()
+    }
+
+    reporte: List[ResultadoProyecto] = []
+
+    def registrar(resultado: ResultadoProyecto) -> None:
+        reporte.append(resultado)
+        if al_terminar is not None:
+            al_terminar(resultado)
+
+    def completar(proyecto_id: int, resultados: Optional[dict], segundos: float, error: str) -> None:
+        credito = creditos[proyecto_id]
+        guardado = 0.0
+        if resultados is not None and guardar:
+            inicio = time.perf_counter()
+            guardar_recalculo(credito.proyecto, parametros[proyecto_id], resultados)
+            obtener_cache_resultados().invalidar(credito.proyecto.nombre)
+            guardado = time.perf_counter() - inicio
+        periodos = len(resultados["creditos"]) if resultados is not None else 0
+        registrar(ResultadoProyecto(credito.proyecto.nombre, periodos, segundos, guardado, error))
+
+    tareas = []
+    for proyecto_id in creditos:
+        if not totales.get(proyecto_id):
+            completar(proyecto_id, None, 0.0, "sin movimientos almacenados")
+        else:
+            tareas.append((proyecto_id, totales[proyecto_id], parametros_credito(parametros[proyecto_id])))
+
+    if not max_workers or max_workers <= 1 or len(tareas) <= 1:
+        for tarea in tareas:
+            completar(*calcular_proyecto(*tarea))
+        return reporte
+
+    with crear_pool_procesos(max_workers) as executor:
+        futuros = [executor.submit(calcular_proyecto, *tarea) for tarea in tareas]
+        for futuro in as_completed(futuros):
+            completar(*futuro.result())
+    return reporte
+
+
+def _totales_por_proyecto(creditos: Dict[int, CreditoConstructor]) -> Dict[int, Totales]:
+    totales: Dict[int, Totales] = {}
+    filas = (
+        ResumenPeriodo.objects.filter(proyecto_id__in=list(creditos))
+        .order_by("proyecto_id", "periodo")
+        .values_list("proyecto_id", "periodo", "ingresos", "costos")
+    )
+    for proyecto_id, periodo, ingresos, costos in filas.iterator(chunk_size=2000):
+        totales.setdefault(proyecto_id, {})[periodo] = {"ingresos": ingresos, "costos": costos}
+    return totales
+
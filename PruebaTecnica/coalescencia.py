@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from .metricas import COALESCIDAS
+
+
+class _Abandonada(Exception):
+    """La ejecución que esperaban se canceló antes de terminar y hay que repetirla."""
+
+
+class Coalescedor:
+    """Agrupa las llamadas concurrentes con la misma clave en una sola ejecución.
+
+    La primera llamada con una clave ejecuta la función; las que llegan
+    mientras tanto esperan y reciben el mismo resultado (o la misma
+    excepción) sin repetir el trabajo. Al terminar la clave queda libre y la
+    próxima llamada vuelve a ejecutar: no es una cache. Funciona entre hilos y
+    entre corrutinas, incluso mezclados, porque el resultado se publica en un
+    :class:`concurrent.futures.Future`. El resultado es compartido y no debe
+    modificarse.
+
+    Si la ejecución se cancela (por ejemplo, el cliente de la petición que la
+    inició se desconecta) o se interrumpe con otra ``BaseException``, eso no
+    es un resultado del trabajo: la clave queda libre y una de las llamadas en
+    espera lo ejecuta de nuevo para las demás.
+    """
+
+    def __init__(self, operacion: str):
+        self.operacion = operacion
+        self._en_curso: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+    def ejecutar(self, clave: Hashable, funcion: Callable[..., Any], *args: Any) -> Any:
+        while True:
+            futuro, primera = self._unirse(clave)
+            if primera:
+                break
+            try:
+                return futuro.result()
+            except _Abandonada:
+                continue
+        try:
+            resultado = funcion(*args)
+        except BaseException as exc:
+            self._publicar(clave, futuro, excepcion=exc)
+            raise
+        self._publicar(clave, futuro, resultado=resultado)
+        return resultado
+
+    async def ejecutar_async(self, clave: Hashable, funcion: Callable[..., Awaitable[Any]], *args: Any) -> Any:
+        while True:
+            futuro, primera = self._unirse(clave)
+            if primera:
+                break
+            try:
+                return await asyncio.wrap_future(futuro)
+            except _Abandonada:
+                continue
+        try:
+            resultado = await funcion(*args)
+        except BaseException as exc:
+            self._publicar(clave, futuro, excepcion=exc)
+            raise
+        self._publicar(clave, futuro, resultado=resultado)
+        return resultado
+
+    def en_curso(self) -> int:
+        return len(self._en_curso)
+
+    def _unirse(self, clave: Hashable) -> Tuple[Future, bool]:
+        with self._lock:
+            futuro = self._en_curso.get(clave)
+            primera = futuro is None
+            if primera:
+                futuro = self._en_curso[clave] = Future()
+                # En ejecución no se puede cancelar: una corrutina en espera que
+                # se cancela no debe cancelar el resultado de las demás.
+                futuro.set_running_or_notify_cancel()
+        if not primera:
+            COALESCIDAS.incrementar(operacion=self.operacion)
+        return futuro, primera
+
+    def _publicar(
+            self,
+            clave: Hashable,
+            futuro: Future,
+            resultado: Any = None,
+            excepcion: Optional[BaseException] = None,
+    ) -> None:
+        # Se libera la clave antes de publicar: quien llegue después ejecuta de nuevo.
+        with self._lock:
+            del self._en_curso[clave]
+        if excepcion is not None and not isinstance(excepcion, Exception):
+            excepcion = _Abandonada()
+        if excepcion is not None:
+            futuro.set_exception(excepcion)
+        else:
+            futuro.set_result(resultado)
@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import os
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Respuestas que suelen ser transitorias (límite de peticiones, reinicios, balanceadores).
+ESTADOS_REINTENTABLES = (429, 500, 502, 503, 504)
+TAMANO_LECTURA = 64 * 1024
+
+
+class RespuestaDemasiadoGrande(requests.RequestException):
+    """El cuerpo de la respuesta, ya descomprimido, supera el máximo permitido."""
+
+
+class ClienteDatasets:
+    """Cliente HTTP compartido para descargar datasets.
+
+    Mantiene una ``requests.Session`` con un pool de hasta ``conexiones``
+    conexiones por servidor, así que las descargas sucesivas al mismo
+    almacenamiento reutilizan la conexión (sin repetir TCP ni TLS). Los errores
+    de conexión y las respuestas :data:`ESTADOS_REINTENTABLES` se reintentan
+    hasta ``reintentos`` veces con espera exponencial (``espera_reintento``,
+    el doble, ...), respetando ``Retry-After``. Los cuerpos llegan comprimidos
+    con gzip cuando el servidor lo admite y se cortan con
+    :class:`RespuestaDemasiadoGrande` si ya descomprimidos superan ``max_bytes``.
+
+    La sesión no guarda estado propio (cookies, autenticación) y su pool es
+    seguro entre hilos, por lo que una sola instancia sirve a todo el proceso.
+    """
+
+    def __init__(
+            self,
+            timeout: float = 15,
+            conexiones: int = 10,
+            reintentos: int = 3,
+            espera_reintento: float = 0.5,
+            max_bytes: int = 64 * 1024 * 1024,
+    ):
+        self.timeout = timeout
+        self.conexiones = conexiones
+        self.reintentos = reintentos
+        self.espera_reintento = espera_reintento
+        self.max_bytes = max_bytes
+        self._reiniciar()
+
+    @classmethod
+    def desde_settings(cls) -> "ClienteDatasets":
+        return cls(
+            timeout=settings.GERPRO_DESCARGAS["TIMEOUT"],
+            conexiones=settings.GERPRO_DESCARGAS["CONEXIONES"],
+            reintentos=settings.GERPRO_DESCARGAS["REINTENTOS"],
+            espera_reintento=settings.GERPRO_DESCARGAS["ESPERA_REINTENTO"],
+            max_bytes=settings.GERPRO_DESCARGAS["MAX_BYTES"],
+        )
+
+    def _reiniciar(self) -> None:
+        # Un proceso hijo (fork) no puede compartir los sockets del padre: abre los suyos.
+        reintentos = Retry(
+            total=self.reintentos,
+            backoff_factor=self.espera_reintento,
+            status_forcelist=ESTADOS_REINTENTABLES,
+            allowed_methods=frozenset({"GET", "HEAD"}),
+            respect_retry_after_header=True,
+            # Agotados los reintentos se entrega la última respuesta y raise_for_status decide.
+            raise_on_status=False,
+        )
+        adaptador = HTTPAdapter(pool_connections=self.conexiones, pool_maxsize=self.conexiones, max_retries=reintentos)
+        # La sesión ya envía ``Accept-Encoding: gzip, deflate`` y descomprime al leer.
+        sesion = requests.Session()
+        sesion.mount("http://", adaptador)
+        sesion.mount("https://", adaptador)
+        self.sesion = sesion
+
+    def obtener(self, url: str, cabeceras: Optional[Dict[str, str]] = None) -> requests.Response:
+        """``GET`` de ``url`` con el cuerpo ya leído en ``respuesta.content``.
+
+        No lanza por el código de estado: quien llama decide (por ejemplo, un
+        ``304`` de una petición condicional es una respuesta válida).
+        """
+        with self.abrir(url, cabeceras) as respuesta:
+            # Lo mismo que hace ``Response.content``, pero con el límite de tamaño.
+            respuesta._content = b"".join(self.fragmentos(respuesta))
+        return respuesta
+
+    @contextmanager
+    def abrir(self, url: str, cabeceras: Optional[Dict[str, str]] = None) -> Iterator[requests.Response]:
+        """``GET`` en streaming; el cuerpo se lee con :meth:`fragmentos` y la conexión vuelve al pool al salir."""
+        respuesta = self.sesion.get(url, headers=cabeceras, timeout=self.timeout, stream=True)
+        try:
+            largo = respuesta.headers.get("Content-Length")
+            # Sin compresión el largo declarado ya permite rechazar la respuesta sin leerla.
+            if largo and largo.isdigit() and not respuesta.headers.get("Content-Encoding"):
+                self._verificar_tamano(url, int(largo))
+            yield respuesta
+        finally:
+            respuesta.close()
+
+    def fragmentos(self, respuesta: requests.Response, tamano: int = TAMANO_LECTURA) -> Iterator[bytes]:
+        """Cuerpo descomprimido de ``respuesta`` en fragmentos, cortado al superar ``max_bytes``."""
+        leidos = 0
+        for fragmento in respuesta.iter_content(tamano):
+            leidos += len(fragmento)
+            self._verificar_tamano(respuesta.url, leidos)
+            yield fragmento
+
+    def _verificar_tamano(self, url: str, cantidad: int) -> None:
+        if cantidad > self.max_bytes:
+            raise RespuestaDemasiadoGrande(f"El dataset {url} supera el máximo de {self.max_bytes} bytes.")
+
+    def cerrar(self) -> None:
+        self.sesion.close()
+
+
+_cliente: Optional[ClienteDatasets] = None
+_lock_cliente = threading.Lock()
+
+
+def obtener_cliente() -> ClienteDatasets:
+    global _cliente
+    if _cliente is None:
+        with _lock_cliente:
+            if _cliente is None:
+                _cliente = ClienteDatasets.desde_settings()
+                os.register_at_fork(after_in_child=_cliente._reiniciar)
+    return _cliente
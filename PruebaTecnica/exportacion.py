@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import csv
+from typing import IO, Callable, Dict, Iterator, Sequence, Tuple
+
+from .models import AporteCapital, DesembolsoCredito, MovimientoFinanciero, Proyecto, Subetapa
+
+try:
+    import openpyxl
+except ImportError:  # openpyxl es opcional: solo lo requiere la exportación a XLSX.
+    openpyxl = None
+
+# Filas que se piden a la base por cada viaje al recorrer un queryset con ``iterator``.
+TAMANO_LOTE = 2000
+
+EXPORTACION_DESEMBOLSOS = "desembolsos"
+EXPORTACION_APORTES = "aportes"
+EXPORTACION_MOVIMIENTOS = "movimientos"
+
+
+class _Eco:
+    """Objeto con ``write`` que retorna lo escrito, para que ``csv.writer`` produzca cadenas."""
+
+    def write(self, valor: str) -> str:
+        return valor
+
+
+def _desembolsos(proyecto: Proyecto) -> Iterator[tuple]:
+    return (
+        DesembolsoCredito.objects.filter(credito__proyecto=proyecto)
+        .order_by("periodo")
+        .values_list(
+            "periodo",
+            "monto",
+            "saldo_despues_del_desembolso",
+            "interes_generado",
+            "interes_pagado",
+            "pago_capital",
+            "flujo_caja_neto",
+        )
+        .iterator(chunk_size=TAMANO_LOTE)
+    )
+
+
+def _aportes(proyecto: Proyecto) -> Iterator[tuple]:
+    return (
+        AporteCapital.objects.filter(proyecto=proyecto)
+        .order_by("periodo")
+        .values_list("periodo", "monto", "flujo_caja_apalancado", "flujo_acumulado")
+        .iterator(chunk_size=TAMANO_LOTE)
+    )
+
+
+def _movimientos(proyecto: Proyecto) -> Iterator[tuple]:
+    # Los nombres de las subetapas se resuelven aparte para recorrer solo el
+    # índice ``movimiento_proyecto_periodo``, sin join.
+    subetapas = dict(Subetapa.objects.filter(proyecto=proyecto).values_list("pk", "nombre"))
+    filas = (
+        MovimientoFinanciero.objects.del_proyecto(proyecto)
+        .values_list("periodo", "concepto", "subetapa_id", "valor")
+        .iterator(chunk_size=TAMANO_LOTE)
+    )
+    return ((periodo, concepto, subetapas[subetapa], valor) for periodo, concepto, subetapa, valor in filas)
+
+
+# Encabezados (con los nombres de la API de resultados) y filas de cada exportación.
+EXPORTACIONES: Dict[str, Tuple[Sequence[str], Callable[[Proyecto], Iterator[tuple]]]] = {
+    EXPORTACION_DESEMBOLSOS: (
+        ("periodo", "desembolso", "saldo", "interes_generado", "interes_pagado", "pago_credito", "fcn"),
+        _desembolsos,
+    ),
+    EXPORTACION_APORTES: (("periodo", "aporte_capital", "flujo_apalancado", "flujo_acumulado"), _aportes),
+    EXPORTACION_MOVIMIENTOS: (("periodo", "concepto", "subetapa", "valor"), _movimientos),
+}
+
+
+def iterar_csv(proyecto: Proyecto, tipo: str) -> Iterator[str]:
+    """Líneas CSV de la exportación ``tipo`` del proyecto, leídas de la base por lotes."""
+    encabezados, filas = EXPORTACIONES[tipo]
+    escritor = csv.writer(_Eco())
+    yield escritor.writerow(encabezados)
+    for fila in filas(proyecto):
+        yield escritor.writerow(fila)
+
+
+def escribir_xlsx(proyecto: Proyecto, destino: IO[bytes]) -> None:
+    """Escribe en ``destino`` un libro con una hoja por exportación.
+
+    Usa el modo ``write_only`` de openpyxl, que vuelca cada fila al archivo al
+    agregarla, así que la memoria no crece con el tamaño del proyecto.
+    """
+    if openpyxl is None:
+        raise ValueError("La exportación a XLSX requiere openpyxl.")
+    libro = openpyxl.Workbook(write_only=True)
+    for tipo, (encabezados, filas) in EXPORTACIONES.items():
+        hoja = libro.create_sheet(tipo.capitalize())
+        hoja.append(encabezados)
+        for fila in filas(proyecto):
+            hoja.append(fila)
+    libro.save(destino)
@@ -2,18 +2,12 @@ from decimal import Decimal
 
 from django import forms
 
+from .models import Proyecto
+
+
+class ParametrosCreditoForm(forms.Form):
+    """Parámetros del crédito constructor que recibe el motor de cálculo."""
 
-class CronogramaForm(forms.Form):
-    proyecto = forms.CharField(
-        max_length=100,
-        initial="Central Park",
-        label="Nombre del proyecto",
-    )
-    dataset_url = forms.URLField(
-        label="URL del JSON",
-        help_text="Enlace al archivo JSON con los movimientos por subetapa.",
-        initial="https://storage.googleapis.com/siga-cdn-bucket/temporal_dm/datos_gerpro_prueba.json",
-    )
     cupo_credito = forms.DecimalField(
         label="Cupo del crédito",
         min_value=Decimal("0.01"),
@@ -59,3 +53,46 @@ class CronogramaForm(forms.Form):
             )
         return cleaned
 
+
+class CronogramaForm(ParametrosCreditoForm):
+    field_order = ["proyecto", "dataset_url"]
+
+    proyecto = forms.CharField(
+        max_length=100,
+        initial="Central Park",
+        label="Nombre del proyecto",
+    )
+    dataset_url = forms.URLField(
+        label="URL del JSON",
+        help_text="Enlace al archivo JSON con los movimientos por subetapa.",
+        initial="https://storage.googleapis.com/siga-cdn-bucket/temporal_dm/datos_gerpro_prueba.json",
+    )
+    streaming = forms.BooleanField(
+        label="Procesar en streaming",
+        required=False,
+        help_text="Para datasets muy grandes (JSON o NDJSON): se procesa mientras se descarga, sin usar la cache.",
+    )
+    en_segundo_plano = forms.BooleanField(
+        label="Calcular en segundo plano",
+        required=False,
+        help_text="Responde de inmediato y el cronograma se muestra cuando termina el cálculo.",
+    )
+
+
+class RecalculoForm(ParametrosCreditoForm):
+    """Recalcula el cronograma de un proyecto con los movimientos ya almacenados."""
+
+    field_order = ["proyecto"]
+
+    proyecto = forms.ModelChoiceField(
+        queryset=Proyecto.objects.all(),
+        to_field_name="nombre",
+        label="Proyecto",
+        help_text="Se usan los movimientos guardados; no se descarga el JSON.",
+    )
+    guardar = forms.BooleanField(
+        label="Guardar el cronograma",
+        required=False,
+        initial=True,
+        help_text="Sin marcar solo se muestra el resultado (análisis de sensibilidad).",
+    )
@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import codecs
+import json
+import tempfile
+from decimal import Decimal
+from typing import IO, Dict, Iterable, Iterator, Optional
+
+from .calculos import calcular_cronograma_por_periodo
+from .descargas import ClienteDatasets, obtener_cliente
+from .metricas import observar_dataset
+from .persistencia import (
+    EscritorMovimientos,
+    bloqueo_proyecto,
+    guardar_cronograma,
+    guardar_proyecto,
+    marcar_huella,
+    transaccion_escritura,
+)
+from .validacion import iterar_validados
+
+TAMANO_FRAGMENTO = 64 * 1024
+# Tamaño máximo de un único movimiento en el texto; evita acumular sin límite
+# cuando el cuerpo está truncado o no es JSON.
+MAX_BYTES_MOVIMIENTO = 1024 * 1024
+# Movimientos apartados que se retienen en memoria antes de pasar a disco.
+MAX_MEMORIA_APARTADOS = 8 * 1024 * 1024
+
+_ESPACIOS = " \t\r\n"
+
+
+def iterar_movimientos(fragmentos: Iterable[bytes]) -> Iterator[dict]:
+    """Decodifica movimientos a medida que llegan los fragmentos del cuerpo.
+
+    Acepta un arreglo JSON de objetos (``[{...}, {...}]``) o NDJSON (un objeto
+    por línea). Solo se retiene en memoria el texto del movimiento en curso.
+    """
+    decodificador_utf8 = codecs.getincrementaldecoder("utf-8")()
+    # ``parse_float=Decimal`` conserva los centavos exactos sin pasar por float.
+    decodificador = json.JSONDecoder(parse_float=Decimal)
+    fragmentos = iter(fragmentos)
+    texto = ""
+    pos = 0
+    fin = False
+    es_arreglo = None
+    esperando_separador = False
+
+    def leer() -> bool:
+        nonlocal texto, pos, fin
+        if fin:
+            return False
+        fragmento = next(fragmentos, None)
+        if fragmento is None:
+            fin = True
+            texto = texto[pos:] + decodificador_utf8.decode(b"", final=True)
+        else:
+            texto = texto[pos:] + decodificador_utf8.decode(fragmento)
+        pos = 0
+        return True
+
+    while True:
+        while pos < len(texto) and texto[pos] in _ESPACIOS:
+            pos += 1
+        if pos >= len(texto):
+            if leer():
+                continue
+            if es_arreglo:
+                raise ValueError("El arreglo JSON no está cerrado.")
+            return
+
+        caracter = texto[pos]
+        if es_arreglo is None:
+            es_arreglo = caracter == "["
+            if es_arreglo:
+                pos += 1
+            continue
+        if es_arreglo and esperando_separador:
+            if caracter == ",":
+                esperando_separador = False
+                pos += 1
+                continue
+            if caracter == "]":
+                pos += 1
+                break
+            raise ValueError(f"Se esperaba ',' o ']' y se encontró {caracter!r}.")
+        if es_arreglo and caracter == "]":
+            pos += 1
+            break
+        if caracter != "{":
+            raise ValueError(f"Cada movimiento debe ser un objeto JSON; se encontró {caracter!r}.")
+
+        try:
+            movimiento, pos = decodificador.raw_decode(texto, pos)
+        except json.JSONDecodeError:
+            if len(texto) - pos > MAX_BYTES_MOVIMIENTO:
+                raise ValueError("Movimiento demasiado grande o JSON mal formado.")
+            if leer():
+                continue
+            raise
+        esperando_separador = True
+        yield movimiento
+
+    while True:
+        if texto[pos:].strip(_ESPACIOS):
+            raise ValueError("Contenido inesperado después del arreglo JSON.")
+        if not leer():
+            return
+
+
+class AgregadorPeriodos:
+    """Acumula ingresos y costos por periodo en ``Decimal`` a medida que llegan los movimientos."""
+
+    def __init__(self):
+        self.totales: Dict[int, Dict[str, Decimal]] = {}
+        self.cantidad = 0
+
+    def agregar(self, movimiento: dict) -> None:
+        concepto = movimiento["concepto"]
+        if concepto not in ("ingresos", "costos"):
+            raise ValueError(f"Concepto desconocido: {concepto}")
+        valor = movimiento["valor"]
+        periodo_data = self.totales.setdefault(
+            int(movimiento["periodo"]), {"ingresos": Decimal("0"), "costos": Decimal("0")}
+        )
+        periodo_data[concepto] += valor if isinstance(valor, Decimal) else Decimal(str(valor))
+        self.cantidad += 1
+
+
+def importar_en_streaming(
+        dataset_url: str,
+        nombre_proyecto: str,
+        parametros: dict,
+        cliente: Optional[ClienteDatasets] = None,
+) -> dict:
+    """Descarga, agrega, calcula y persiste un dataset sin materializarlo completo.
+
+    Cada movimiento se suma a los totales por periodo y se aparta en un
+    archivo temporal (en memoria hasta :data:`MAX_MEMORIA_APARTADOS`). Recién
+    con el cuerpo completo y validado se calcula el cronograma y se abre la
+    transacción, en la que el
+    :class:`~PruebaTecnica.persistencia.EscritorMovimientos` escribe por lotes
+    lo apartado; así la descarga no retiene el lock de escritura. Si el JSON es
+    inválido o el cálculo falla no se escribe nada. Los movimientos inválidos
+    no se apartan, y al terminar el cuerpo se lanza
+    :class:`~PruebaTecnica.validacion.DatasetInvalido` con todos los errores.
+    La descarga usa ``cliente`` (por defecto el del proceso, ver
+    :func:`~PruebaTecnica.descargas.obtener_cliente`).
+    """
+    cliente = cliente or obtener_cliente()
+    with tempfile.SpooledTemporaryFile(MAX_MEMORIA_APARTADOS, mode="w+", encoding="utf-8") as apartados:
+        agregador = AgregadorPeriodos()
+        with cliente.abrir(dataset_url) as respuesta:
+            respuesta.raise_for_status()
+            movimientos = iterar_movimientos(cliente.fragmentos(respuesta, TAMANO_FRAGMENTO))
+            for movimiento in iterar_validados(movimientos):
+                agregador.agregar(movimiento)
+                _apartar(apartados, movimiento)
+        observar_dataset(agregador.cantidad, len(agregador.totales))
+
+        resultados = calcular_cronograma_por_periodo(
+            agregador.totales,
+            cupo_credito=float(parametros["cupo_credito"]),
+            porcentaje_maximo_mensual=float(parametros["porcentaje_maximo_mensual"]),
+            periodo_inicial_credito=parametros["periodo_inicial_credito"],
+            periodo_final_credito=parametros["periodo_final_credito"],
+            tasa_interes_anual=float(parametros["tasa_interes_anual"]),
+        )
+
+        apartados.seek(0)
+        with bloqueo_proyecto(nombre_proyecto), transaccion_escritura():
+            proyecto, credito = guardar_proyecto(nombre_proyecto, parametros, dataset_url)
+            escritor = EscritorMovimientos(proyecto)
+            for movimiento in _leer_apartados(apartados):
+                escritor.agregar(movimiento)
+            escritor.cerrar()
+            guardar_cronograma(proyecto, credito, resultados)
+            marcar_huella(proyecto)
+    return resultados
+
+
+def _apartar(apartados: IO[str], movimiento: dict) -> None:
+    # El valor va como texto para no perder centavos al releerlo.
+    fila = (movimiento["subetapa"], int(movimiento["periodo"]), movimiento["concepto"], str(movimiento["valor"]))
+    apartados.write(json.dumps(fila, ensure_ascii=False, separators=(",", ":")))
+    apartados.write("\n")
+
+
+def _leer_apartados(apartados: IO[str]) -> Iterator[dict]:
+    for linea in apartados:
+        subetapa, periodo, concepto, valor = json.loads(linea)
+        yield {"subetapa": subetapa, "periodo": periodo, "concepto": concepto, "valor": valor}
@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+import contextvars
+import cProfile
+import json
+import logging
+import re
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from .metricas import ETAPA_SEGUNDOS
+
+try:
+    import pyinstrument
+except ImportError:  # pyinstrument es opcional: sin él los perfiles se toman con cProfile.
+    pyinstrument = None
+
+logger = logging.getLogger(__name__)
+
+_medicion: contextvars.ContextVar[Optional["Medicion"]] = contextvars.ContextVar("medicion", default=None)
+
+
+class Medicion:
+    """Tiempos y consultas SQL de una petición, separados por etapa.
+
+    Cada etapa acumula los segundos y las consultas ocurridas mientras estuvo
+    abierta; las etapas pueden anidarse (``descarga`` contiene a
+    ``decodificacion``) y los valores de cada una incluyen los de las internas.
+    """
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.etapas: Dict[str, List[float]] = {}
+        self.consultas = 0
+        self.segundos_consultas = 0.0
+
+    def registrar(self, nombre: str, segundos: float, consultas: int) -> None:
+        acumulado = self.etapas.setdefault(nombre, [0.0, 0])
+        acumulado[0] += segundos
+        acumulado[1] += consultas
+
+    def total(self) -> float:
+        return time.perf_counter() - self.inicio
+
+    def server_timing(self) -> str:
+        """Valor de la cabecera ``Server-Timing``, con duraciones en milisegundos."""
+        entradas = [
+            f'{nombre};dur={segundos * 1000:.1f};desc="{consultas} consultas"'
+            for nombre, (segundos, consultas) in self.etapas.items()
+        ]
+        entradas.append(f'db;dur={self.segundos_consultas * 1000:.1f};desc="{self.consultas} consultas"')
+        entradas.append(f"total;dur={self.total() * 1000:.1f}")
+        return ", ".join(entradas)
+
+    def como_diccionario(self) -> dict:
+        return {
+            "duracion_ms": round(self.total() * 1000, 1),
+            "consultas": self.consultas,
+            "consultas_ms": round(self.segundos_consultas * 1000, 1),
+            "etapas": {
+                nombre: {"duracion_ms": round(segundos * 1000, 1), "consultas": consultas}
+                for nombre, (segundos, consultas) in self.etapas.items()
+            },
+        }
+
+
+def medicion_actual() -> Optional[Medicion]:
+    return _medicion.get()
+
+
+@contextmanager
+def etapa(nombre: str) -> Iterator[None]:
+    """Mide ``nombre`` en el histograma ``gerpro_etapa_segundos`` y en la petición en curso.
+
+    Fuera de una petición instrumentada (comandos, trabajos en segundo plano)
+    solo alimenta la métrica.
+    """
+    medicion = _medicion.get()
+    inicio = time.perf_counter()
+    consultas = medicion.consultas if medicion is not None else 0
+    try:
+        yield
+    finally:
+        segundos = time.perf_counter() - inicio
+        ETAPA_SEGUNDOS.observar(segundos, etapa=nombre)
+        if medicion is not None:
+            medicion.registrar(nombre, segundos, medicion.consultas - consultas)
+
+
+def contar_consultas(execute, sql, params, many, context):
+    """``execute_wrapper`` que suma cada consulta a la medición de la petición en curso.
+
+    Se instala en cada conexión al abrirse (ver :func:`instalar_contador`); el
+    contexto se propaga a los hilos de ``sync_to_async``, así que también
+    cuenta las consultas de las vistas asíncronas.
+    """
+    medicion = _medicion.get()
+    if medicion is None:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        medicion.consultas += 1
+        medicion.segundos_consultas += time.perf_counter() - inicio
+
+
+def instalar_contador(sender, connection, **kwargs) -> None:
+    """Receptor de ``connection_created``."""
+    if contar_consultas not in connection.execute_wrappers:
+        connection.execute_wrappers.append(contar_consultas)
+
+
+class InstrumentacionMiddleware:
+    """Mide cada petición y expone el desglose en la cabecera ``Server-Timing``.
+
+    Además deja un registro estructurado por petición en el logger
+    ``PruebaTecnica.instrumentacion`` y, si se pide, perfila la vista (ver
+    ``GERPRO_INSTRUMENTACION`` en settings). En respuestas en streaming la
+    cabecera solo cubre lo ocurrido antes de empezar a enviar el cuerpo.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.es_async = iscoroutinefunction(get_response)
+        if self.es_async:
+            markcoroutinefunction(self)
+
+    @property
+    def configuracion(self) -> dict:
+        return settings.GERPRO_INSTRUMENTACION
+
+    def __call__(self, request):
+        if self.es_async:
+            return self.__acall__(request)
+        if not self.configuracion["ACTIVA"]:
+            return self.get_response(request)
+        medicion = Medicion()
+        token = _medicion.set(medicion)
+        try:
+            if self._perfilar(request):
+                respuesta = self._con_perfil(request)
+            else:
+                respuesta = self.get_response(request)
+        finally:
+            _medicion.reset(token)
+        return self._terminar(request, respuesta, medicion)
+
+    async def __acall__(self, request):
+        if not self.configuracion["ACTIVA"]:
+            return await self.get_response(request)
+        medicion = Medicion()
+        token = _medicion.set(medicion)
+        try:
+            # El perfilador sigue a un solo hilo: en modo asíncrono no se perfila.
+            respuesta = await self.get_response(request)
+        finally:
+            _medicion.reset(token)
+        return self._terminar(request, respuesta, medicion)
+
+    def _perfilar(self, request) -> bool:
+        if self.configuracion["PERFILAR"]:
+            return True
+        token = self.configuracion["TOKEN_PERFIL"]
+        return bool(token) and request.headers.get("X-Gerpro-Perfil") == token
+
+    def _con_perfil(self, request):
+        directorio = Path(self.configuracion["DIR_PERFILES"])
+        directorio.mkdir(parents=True, exist_ok=True)
+        ruta = re.sub(r"[^A-Za-z0-9]+", "_", request.path).strip("_") or "raiz"
+        nombre = f"{time.strftime('%Y%m%d-%H%M%S')}-{ruta}-{uuid.uuid4().hex[:8]}"
+        if pyinstrument is not None:
+            perfilador = pyinstrument.Profiler()
+            perfilador.start()
+            try:
+                respuesta = self.get_response(request)
+            finally:
+                perfilador.stop()
+            archivo = directorio / f"{nombre}.html"
+            archivo.write_text(perfilador.output_html(), encoding="utf-8")
+        else:
+            perfilador = cProfile.Profile()
+            respuesta = perfilador.runcall(self.get_response, request)
+            archivo = directorio / f"{nombre}.prof"
+            perfilador.dump_stats(archivo)
+        respuesta["X-Gerpro-Perfil"] = archivo.name
+        return respuesta
+
+    def _terminar(self, request, respuesta, medicion: Medicion):
+        respuesta["Server-Timing"] = medicion.server_timing()
+        registro = {
+            "metodo": request.method,
+            "ruta": request.path,
+            "estado": respuesta.status_code,
+            **medicion.como_diccionario(),
+        }
+        logger.info(json.dumps(registro), extra={"medicion": registro})
+        return respuesta
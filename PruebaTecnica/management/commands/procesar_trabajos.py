@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from PruebaTecnica.models import TrabajoCronograma
+from PruebaTecnica.trabajos import ejecutar_trabajo, vencimiento_trabajos
+
+
+class Command(BaseCommand):
+    help = (
+        "Ejecuta los trabajos de cronograma pendientes, por ejemplo los que quedaron "
+        "encolados cuando se reinició el servidor, y retoma los que quedaron en proceso "
+        "sin avanzar por más de GERPRO_TRABAJOS['VENCIMIENTO'] segundos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--continuo",
+            action="store_true",
+            help="Sigue esperando trabajos nuevos en lugar de terminar al vaciar la cola.",
+        )
+        parser.add_argument(
+            "--intervalo",
+            type=float,
+            default=2.0,
+            help="Segundos entre consultas en modo continuo.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            pendientes = list(
+                TrabajoCronograma.objects.disponibles(vencimiento_trabajos())
+                .order_by("creado")
+                .values_list("pk", flat=True)
+            )
+            for trabajo_id in pendientes:
+                if ejecutar_trabajo(trabajo_id):
+                    trabajo = TrabajoCronograma.objects.get(pk=trabajo_id)
+                    self.stdout.write(f"{trabajo_id}: {trabajo.get_estado_display()}")
+            if not options["continuo"]:
+                break
+            time.sleep(options["intervalo"])
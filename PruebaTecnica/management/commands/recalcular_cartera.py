@@ -0,0 +1,83 @@
+import os
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+
+from PruebaTecnica.cartera import ResultadoProyecto, recalcular_cartera
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula en paralelo el cronograma de todos los proyectos con crédito usando los movimientos "
+        "almacenados. Los parámetros indicados reemplazan los del crédito guardado en cada proyecto."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("proyectos", nargs="*", help="Nombres de proyectos; por defecto toda la cartera.")
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Procesos para el cálculo (1 = en el proceso actual). Por defecto, uno por CPU.",
+        )
+        parser.add_argument("--cupo", type=Decimal, dest="cupo_credito")
+        parser.add_argument("--porcentaje", type=Decimal, dest="porcentaje_maximo_mensual")
+        parser.add_argument("--inicial", type=int, dest="periodo_inicial_credito")
+        parser.add_argument("--final", type=int, dest="periodo_final_credito")
+        parser.add_argument("--tasa", type=Decimal, dest="tasa_interes_anual")
+        parser.add_argument(
+            "--sin-guardar",
+            action="store_true",
+            help="Solo calcula y reporta los tiempos; no reemplaza los cronogramas almacenados.",
+        )
+
+    def handle(self, *args, **options):
+        if options["workers"] < 1:
+            raise CommandError("--workers debe ser al menos 1.")
+        cambios = {
+            nombre: options[nombre]
+            for nombre in (
+                "cupo_credito",
+                "porcentaje_maximo_mensual",
+                "periodo_inicial_credito",
+                "periodo_final_credito",
+                "tasa_interes_anual",
+            )
+            if options[nombre] is not None
+        }
+
+        inicio = time.perf_counter()
+        reporte = recalcular_cartera(
+            proyectos=options["proyectos"] or None,
+            cambios=cambios,
+            max_workers=options["workers"],
+            guardar=not options["sin_guardar"],
+            al_terminar=self._informar,
+        )
+        total = time.perf_counter() - inicio
+
+        if not reporte:
+            raise CommandError("No hay proyectos con crédito para recalcular.")
+        fallidos = [resultado for resultado in reporte if resultado.error]
+        recalculados = len(reporte) - len(fallidos)
+        resumen = (
+            f"{recalculados} proyectos recalculados en {total:.2f} s "
+            f"({recalculados / total if total else 0:.1f} proyectos/s, "
+            f"{sum(r.periodos for r in reporte) / total if total else 0:.0f} periodos/s) "
+            f"con {options['workers']} worker(s)."
+        )
+        if fallidos:
+            self.stdout.write(self.style.WARNING(f"{resumen} {len(fallidos)} con errores."))
+        else:
+            self.stdout.write(self.style.SUCCESS(resumen))
+
+    def _informar(self, resultado: ResultadoProyecto) -> None:
+        if resultado.error:
+            self.stdout.write(self.style.ERROR(f"{resultado.proyecto}: {resultado.error}"))
+            return
+        self.stdout.write(
+            f"{resultado.proyecto}: {resultado.periodos} periodos · "
+            f"cálculo {resultado.segundos_calculo * 1000:.1f} ms · "
+            f"guardado {resultado.segundos_guardado * 1000:.1f} ms"
+        )
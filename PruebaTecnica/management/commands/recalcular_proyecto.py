@@ -0,0 +1,66 @@
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+
+from PruebaTecnica.calculos import PARAMETROS_CREDITO
+from PruebaTecnica.cartera import parametros_guardados
+from PruebaTecnica.models import CreditoConstructor, Proyecto
+from PruebaTecnica.servicios import recalcular_desde_base
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula el cronograma de un proyecto con los movimientos almacenados, sin descargar el JSON. "
+        "Los parámetros que no se indiquen se toman del crédito guardado."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("proyecto", help="Nombre del proyecto.")
+        parser.add_argument("--cupo", type=Decimal, dest="cupo_credito")
+        parser.add_argument("--porcentaje", type=Decimal, dest="porcentaje_maximo_mensual")
+        parser.add_argument("--inicial", type=int, dest="periodo_inicial_credito")
+        parser.add_argument("--final", type=int, dest="periodo_final_credito")
+        parser.add_argument("--tasa", type=Decimal, dest="tasa_interes_anual")
+        parser.add_argument(
+            "--sin-guardar",
+            action="store_true",
+            help="Solo muestra los totales; no reemplaza el cronograma almacenado.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            proyecto = Proyecto.objects.get(nombre=options["proyecto"])
+        except Proyecto.DoesNotExist:
+            raise CommandError(f"No existe el proyecto {options['proyecto']!r}.")
+
+        parametros = self._parametros(proyecto, options)
+        try:
+            resultados = recalcular_desde_base(proyecto, parametros, guardar=not options["sin_guardar"])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        creditos = resultados["creditos"]
+        aportes = resultados["aportes"]
+        self.stdout.write(
+            f"{proyecto}: {len(creditos)} periodos · "
+            f"desembolsos {sum(c['desembolso'] for c in creditos):.2f} · "
+            f"intereses {sum(c['interes_pagado'] for c in creditos):.2f} · "
+            f"aportes {sum(a['aporte_capital'] for a in aportes):.2f}"
+        )
+        if not options["sin_guardar"]:
+            self.stdout.write(self.style.SUCCESS("Cronograma almacenado."))
+
+    @staticmethod
+    def _parametros(proyecto: Proyecto, options: dict) -> dict:
+        faltantes = [nombre for nombre in PARAMETROS_CREDITO if options[nombre] is None]
+        if not faltantes:
+            return {nombre: options[nombre] for nombre in PARAMETROS_CREDITO}
+        try:
+            credito = proyecto.credito_constructor
+        except CreditoConstructor.DoesNotExist:
+            raise CommandError(f"El proyecto no tiene crédito guardado; indique {', '.join(faltantes)}.")
+        guardados = parametros_guardados(credito)
+        return {
+            nombre: guardados[nombre] if options[nombre] is None else options[nombre]
+            for nombre in PARAMETROS_CREDITO
+        }
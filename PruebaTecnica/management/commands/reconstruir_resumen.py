@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from PruebaTecnica.models import Proyecto
+from PruebaTecnica.persistencia import reconstruir_resumen
+
+
+class Command(BaseCommand):
+    help = "Recalcula el resumen por periodo (ResumenPeriodo) a partir de los movimientos almacenados."
+
+    def add_arguments(self, parser):
+        parser.add_argument("proyectos", nargs="*", help="Nombres de los proyectos; por defecto todos.")
+
+    def handle(self, *args, **options):
+        proyectos = Proyecto.objects.all()
+        if options["proyectos"]:
+            proyectos = proyectos.filter(nombre__in=options["proyectos"])
+            faltantes = set(options["proyectos"]) - set(proyectos.values_list("nombre", flat=True))
+            if faltantes:
+                raise CommandError(f"No existen los proyectos: {', '.join(sorted(faltantes))}.")
+        for proyecto in proyectos:
+            periodos = reconstruir_resumen(proyecto)
+            self.stdout.write(f"{proyecto}: {periodos} periodos")
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from PruebaTecnica.models import Proyecto
+from PruebaTecnica.persistencia import reconstruir_resumen, verificar_resumen
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara el resumen por periodo (ResumenPeriodo) con la suma de los movimientos y "
+        "reporta los periodos que difieren. Termina con error si encuentra diferencias."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("proyectos", nargs="*", help="Nombres de los proyectos; por defecto todos.")
+        parser.add_argument(
+            "--reparar",
+            action="store_true",
+            help="Reconstruye el resumen de los proyectos con diferencias.",
+        )
+
+    def handle(self, *args, **options):
+        proyectos = Proyecto.objects.all()
+        if options["proyectos"]:
+            proyectos = proyectos.filter(nombre__in=options["proyectos"])
+
+        inconsistentes = 0
+        for proyecto in proyectos:
+            diferencias = verificar_resumen(proyecto)
+            if not diferencias:
+                continue
+            inconsistentes += 1
+            for periodo, esperado, almacenado in diferencias:
+                self.stdout.write(f"{proyecto} · P{periodo}: esperado {esperado}, almacenado {almacenado}")
+            if options["reparar"]:
+                reconstruir_resumen(proyecto)
+                self.stdout.write(self.style.SUCCESS(f"{proyecto}: resumen reconstruido"))
+
+        if inconsistentes and not options["reparar"]:
+            raise CommandError(f"{inconsistentes} proyecto(s) con el resumen desactualizado.")
+        if not inconsistentes:
+            self.stdout.write(self.style.SUCCESS("El resumen coincide con los movimientos."))
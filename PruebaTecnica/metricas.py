@@ -0,0 +1,343 @@
+from __future__ import annotations
+
+import atexit
+import bisect
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+from django.conf import settings
+
+SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+MOVIMIENTOS = (100, 500, 1_000, 5_000, 10_000, 50_000, 100_000, 500_000, 1_000_000)
+PERIODOS = (12, 24, 36, 48, 60, 120, 240, 480, 1200)
+
+CONTADOR = "counter"
+HISTOGRAMA = "histogram"
+
+
+class Metrica:
+    """Definición de un contador o un histograma; los valores viven en el :class:`Registro`.
+
+    Los contadores se exponen con su nombre tal cual (por convención terminan
+    en ``_total``); los histogramas con ``_bucket``, ``_sum`` y ``_count``.
+    """
+
+    def __init__(
+            self,
+            nombre: str,
+            ayuda: str,
+            tipo: str = CONTADOR,
+            etiquetas: Sequence[str] = (),
+            limites: Sequence[float] = SEGUNDOS,
+    ):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.tipo = tipo
+        self.etiquetas = tuple(etiquetas)
+        self.limites = tuple(limites)
+        METRICAS[nombre] = self
+
+    def incrementar(self, valor: float = 1, **etiquetas: str) -> None:
+        obtener_registro().sumar(self, self._clave(etiquetas), valor)
+
+    def observar(self, valor: float, **etiquetas: str) -> None:
+        obtener_registro().observar(self, self._clave(etiquetas), valor)
+
+    @contextmanager
+    def medir(self, **etiquetas: str) -> Iterator[None]:
+        """Observa los segundos que tarda el bloque, aunque termine con una excepción."""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(time.perf_counter() - inicio, **etiquetas)
+
+    def _clave(self, etiquetas: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(etiquetas[nombre]) for nombre in self.etiquetas)
+
+
+METRICAS: Dict[str, Metrica] = {}
+
+CRONOGRAMA_SEGUNDOS = Metrica(
+    "gerpro_cronograma_segundos",
+    "Duración de punta a punta de un cronograma: descarga, cálculo y guardado.",
+    HISTOGRAMA,
+    etiquetas=("modo",),
+)
+ETAPA_SEGUNDOS = Metrica(
+    "gerpro_etapa_segundos",
+    "Duración de cada etapa del cálculo (ver PruebaTecnica.instrumentacion.etapa).",
+    HISTOGRAMA,
+    etiquetas=("etapa",),
+)
+DATASET_MOVIMIENTOS = Metrica(
+    "gerpro_dataset_movimientos",
+    "Movimientos de cada dataset calculado.",
+    HISTOGRAMA,
+    limites=MOVIMIENTOS,
+)
+DATASET_PERIODOS = Metrica(
+    "gerpro_dataset_periodos",
+    "Periodos del cronograma de cada dataset calculado.",
+    HISTOGRAMA,
+    limites=PERIODOS,
+)
+FILAS_ESCRITAS = Metrica(
+    "gerpro_filas_escritas_total",
+    "Filas insertadas o actualizadas en transacciones confirmadas, por modelo.",
+    etiquetas=("modelo",),
+)
+CACHE_CONSULTAS = Metrica(
+    "gerpro_cache_consultas_total",
+    "Consultas a las caches de datasets y resultados, por resultado (acierto o fallo).",
+    etiquetas=("cache", "resultado"),
+)
+
+COALESCIDAS = Metrica(
+    "gerpro_coalescidas_total",
+    "Llamadas que esperaron el resultado de otra idéntica en curso en lugar de repetirla, por operación.",
+    etiquetas=("operacion",),
+)
+
+
+# Ids de los registros de este proceso; ver _proceso_vivo.
+_IDS_PROPIOS: Set[str] = set()
+
+
+def observar_dataset(movimientos: int, periodos: int) -> None:
+    DATASET_MOVIMIENTOS.observar(movimientos)
+    DATASET_PERIODOS.observar(periodos)
+
+
+class Registro:
+    """Valores de las métricas del proceso, protegidos por un lock.
+
+    Con ``directorio`` cada proceso vuelca sus valores a ``<directorio>/<id>.json``
+    como mucho cada ``intervalo`` segundos, y :meth:`exponer` suma los archivos
+    de todos los procesos. Así varios workers (gunicorn, uvicorn) publican
+    totales de toda la instancia sin un servicio externo; lo que otro proceso
+    midió en el último ``intervalo`` puede no aparecer todavía.
+
+    Para que los contadores no retrocedan, lo que midieron los procesos
+    terminados no se descarta: el primer volcado de cada proceso suma a sus
+    propios valores los archivos de procesos que ya no existen y los borra, así
+    que el directorio tiene un archivo por proceso vivo y no uno por cada
+    proceso que hubo. Los procesos se identifican por pid, por lo que el
+    directorio no debe compartirse entre máquinas.
+    """
+
+    def __init__(self, directorio: Optional[Path] = None, intervalo: float = 1.0):
+        self.directorio = Path(directorio) if directorio else None
+        self.intervalo = intervalo
+        self._reiniciar()
+
+    @classmethod
+    def desde_settings(cls) -> "Registro":
+        return cls(settings.GERPRO_METRICAS["DIR"], settings.GERPRO_METRICAS["INTERVALO"])
+
+    def _reiniciar(self) -> None:
+        # Un proceso hijo (fork) empieza de cero y con su propio archivo: lo
+        # heredado ya lo cuenta el padre. Los locks se recrean por si otro hilo
+        # del padre los tenía tomados al momento del fork.
+        self._lock = threading.Lock()
+        self._lock_volcado = threading.Lock()
+        self._valores: Dict[str, Dict[Tuple[str, ...], object]] = {}
+        self._id = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._volcado_en = 0.0
+        self._heredado = False
+        _IDS_PROPIOS.add(self._id)
+
+    def sumar(self, metrica: Metrica, clave: Tuple[str, ...], valor: float) -> None:
+        with self._lock:
+            serie = self._valores.setdefault(metrica.nombre, {})
+            serie[clave] = serie.get(clave, 0) + valor
+        self._quizas_volcar()
+
+    def observar(self, metrica: Metrica, clave: Tuple[str, ...], valor: float) -> None:
+        with self._lock:
+            serie = self._valores.setdefault(metrica.nombre, {})
+            # Conteo por cubeta (no acumulado), seguido de la suma y la cantidad.
+            datos = serie.get(clave)
+            if datos is None:
+                datos = serie[clave] = [0] * (len(metrica.limites) + 1) + [0.0, 0]
+            datos[bisect.bisect_left(metrica.limites, valor)] += 1
+            datos[-2] += valor
+            datos[-1] += 1
+        self._quizas_volcar()
+
+    def instantanea(self) -> Dict[str, List[list]]:
+        """Valores del proceso en un formato serializable: ``{nombre: [[etiquetas, valor], ...]}``."""
+        with self._lock:
+            return {
+                nombre: [
+                    [list(clave), list(valor) if isinstance(valor, list) else valor] for clave, valor in serie.items()
+                ]
+                for nombre, serie in self._valores.items()
+            }
+
+    def volcar(self, esperar: bool = True) -> None:
+        """Escribe los valores del proceso en su archivo; sin ``esperar`` no hace nada si otro hilo ya escribe."""
+        if self.directorio is None or not self._lock_volcado.acquire(blocking=esperar):
+            return
+        try:
+            self._volcado_en = time.monotonic()
+            self.directorio.mkdir(parents=True, exist_ok=True)
+            heredados = [] if self._heredado else self._heredar_terminados()
+            instantanea = self.instantanea()
+            ruta = self.directorio / f"{self._id}.json"
+            temporal = ruta.with_suffix(".tmp")
+            temporal.write_text(json.dumps(instantanea), encoding="utf-8")
+            os.replace(temporal, ruta)
+            # Hasta aquí los heredados cuentan dos veces; desde aquí, solo en el archivo propio.
+            for heredado in heredados:
+                heredado.unlink(missing_ok=True)
+            self._heredado = True
+        finally:
+            self._lock_volcado.release()
+
+    def _heredar_terminados(self) -> List[Path]:
+        """Suma a los valores propios los archivos de procesos terminados y retorna los que hay que borrar."""
+        heredados = []
+        for ruta in self.directorio.glob("*.json"):
+            if _proceso_vivo(ruta.stem):
+                continue
+            # Renombrarlo con el id propio lo reclama: si otro proceso también
+            # lo encontró, solo uno de los dos puede moverlo.
+            reclamado = ruta.with_name(f"{self._id}-{ruta.name}")
+            try:
+                os.rename(ruta, reclamado)
+                instantanea = json.loads(reclamado.read_text(encoding="utf-8"))
+            except FileNotFoundError:
+                continue
+            except (OSError, ValueError):
+                reclamado.unlink(missing_ok=True)
+                continue
+            with self._lock:
+                _sumar_instantanea(self._valores, instantanea)
+            heredados.append(reclamado)
+        return heredados
+
+    def _quizas_volcar(self) -> None:
+        if self.directorio is not None and time.monotonic() - self._volcado_en >= self.intervalo:
+            self.volcar(esperar=False)
+
+    def combinadas(self) -> Dict[str, Dict[Tuple[str, ...], object]]:
+        """Valores sumados de todos los procesos (o solo de este, sin ``directorio``)."""
+        if self.directorio is None:
+            instantaneas = [self.instantanea()]
+        else:
+            self.volcar()
+            instantaneas = []
+            for ruta in self.directorio.glob("*.json"):
+                try:
+                    instantaneas.append(json.loads(ruta.read_text(encoding="utf-8")))
+                except (OSError, ValueError):
+                    # Archivo a medio reemplazar o de un proceso que se está cerrando.
+                    continue
+        combinadas: Dict[str, Dict[Tuple[str, ...], object]] = {}
+        for instantanea in instantaneas:
+            _sumar_instantanea(combinadas, instantanea)
+        return combinadas
+
+    def exponer(self) -> str:
+        """Todas las métricas en el formato de texto de Prometheus."""
+        valores = self.combinadas()
+        lineas: List[str] = []
+        for metrica in METRICAS.values():
+            lineas.append(f"# HELP {metrica.nombre} {metrica.ayuda}")
+            lineas.append(f"# TYPE {metrica.nombre} {metrica.tipo}")
+            for clave, valor in sorted(valores.get(metrica.nombre, {}).items()):
+                etiquetas = list(zip(metrica.etiquetas, clave))
+                if metrica.tipo == CONTADOR:
+                    lineas.append(f"{metrica.nombre}{_etiquetas(etiquetas)} {_numero(valor)}")
+                    continue
+                acumulado = 0
+                for limite, cantidad in zip(metrica.limites + (float("inf"),), valor):
+                    acumulado += cantidad
+                    le = "+Inf" if limite == float("inf") else _numero(limite)
+                    lineas.append(f"{metrica.nombre}_bucket{_etiquetas(etiquetas + [('le', le)])} {acumulado}")
+                lineas.append(f"{metrica.nombre}_sum{_etiquetas(etiquetas)} {_numero(valor[-2])}")
+                lineas.append(f"{metrica.nombre}_count{_etiquetas(etiquetas)} {valor[-1]}")
+        lineas.extend(_proporcion_aciertos(valores.get(CACHE_CONSULTAS.nombre, {})))
+        return "\n".join(lineas) + "\n"
+
+
+def _sumar_instantanea(destino: Dict[str, Dict[Tuple[str, ...], object]], instantanea: Dict[str, List[list]]) -> None:
+    for nombre, serie in instantanea.items():
+        valores = destino.setdefault(nombre, {})
+        for clave, valor in serie:
+            clave = tuple(clave)
+            previo = valores.get(clave)
+            if previo is None:
+                valores[clave] = valor
+            elif isinstance(valor, list):
+                valores[clave] = [a + b for a, b in zip(previo, valor)]
+            else:
+                valores[clave] = previo + valor
+
+
+def _proceso_vivo(nombre: str) -> bool:
+    """Si el proceso que escribe el archivo ``<pid>-<id>.json`` sigue corriendo en esta máquina."""
+    pid, _, resto = nombre.partition("-")
+    if not pid.isdigit():
+        return True
+    if int(pid) == os.getpid():
+        # Con el pid propio y un id que no es de este proceso, es de uno
+        # anterior que tuvo el mismo pid (en un contenedor, tras reiniciar).
+        return f"{pid}-{resto[:8]}" in _IDS_PROPIOS
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _proporcion_aciertos(consultas: Dict[Tuple[str, ...], float]) -> List[str]:
+    nombre = "gerpro_cache_proporcion_aciertos"
+    lineas = [f"# HELP {nombre} Aciertos sobre consultas de cada cache desde el inicio.", f"# TYPE {nombre} gauge"]
+    por_cache: Dict[str, List[float]] = {}
+    for (cache, resultado), cantidad in consultas.items():
+        totales = por_cache.setdefault(cache, [0, 0])
+        totales[0] += cantidad if resultado == "acierto" else 0
+        totales[1] += cantidad
+    for cache, (aciertos, total) in sorted(por_cache.items()):
+        lineas.append(f"{nombre}{_etiquetas([('cache', cache)])} {_numero(aciertos / total)}")
+    return lineas
+
+
+def _escapar(valor: str) -> str:
+    return valor.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _etiquetas(pares: List[Tuple[str, str]]) -> str:
+    if not pares:
+        return ""
+    return "{" + ",".join(f'{nombre}="{_escapar(valor)}"' for nombre, valor in pares) + "}"
+
+
+def _numero(valor: float) -> str:
+    return repr(float(valor)) if not float(valor).is_integer() else str(int(valor))
+
+
+_registro: Optional[Registro] = None
+_lock_registro = threading.Lock()
+
+
+def obtener_registro() -> Registro:
+    global _registro
+    if _registro is None:
+        with _lock_registro:
+            if _registro is None:
+                _registro = Registro.desde_settings()
+                os.register_at_fork(after_in_child=_registro._reiniciar)
+                # Lo medido desde el último volcado no se pierde al terminar el proceso.
+                atexit.register(_registro.volcar)
+    return _registro
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:37
+
+import django.core.serializers.json
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('PruebaTecnica', '0002_remove_subetapa_fecha_fin_construccion_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrabajoCronograma',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('proyecto', models.CharField(max_length=100)),
+                ('parametros', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder, help_text='Datos validados del formulario (URL del dataset y parámetros del crédito).')),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('en_proceso', 'En proceso'), ('completado', 'Completado'), ('fallido', 'Fallido')], default='pendiente', max_length=10)),
+                ('etapa', models.CharField(blank=True, max_length=20)),
+                ('progreso', models.PositiveSmallIntegerField(default=0, help_text='Porcentaje de avance (0 a 100).')),
+                ('error', models.TextField(blank=True)),
+                ('filas', models.JSONField(blank=True, encoder=django.core.serializers.json.DjangoJSONEncoder, null=True)),
+                ('creado', models.DateTimeField(auto_now_add=True)),
+                ('actualizado', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-creado'],
+                'indexes': [models.Index(fields=['estado', 'creado'], name='PruebaTecni_estado_f2f992_idx')],
+            },
+        ),
+    ]
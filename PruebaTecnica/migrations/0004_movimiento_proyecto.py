@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def copiar_proyecto(apps, schema_editor):
+    MovimientoFinanciero = apps.get_model("PruebaTecnica", "MovimientoFinanciero")
+    Subetapa = apps.get_model("PruebaTecnica", "Subetapa")
+    MovimientoFinanciero.objects.update(
+        proyecto_id=models.Subquery(
+            Subetapa.objects.filter(pk=models.OuterRef("subetapa_id")).values("proyecto_id")[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('PruebaTecnica', '0003_trabajocronograma'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='movimientofinanciero',
+            options={'ordering': ['proyecto_id', 'periodo', 'concepto', 'subetapa_id']},
+        ),
+        migrations.AddField(
+            model_name='movimientofinanciero',
+            name='proyecto',
+            field=models.ForeignKey(db_index=False, help_text='Copia de ``subetapa.proyecto`` para leer series del proyecto sin joins.', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='movimientos', to='PruebaTecnica.proyecto'),
+        ),
+        migrations.RunPython(copiar_proyecto, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='movimientofinanciero',
+            name='proyecto',
+            field=models.ForeignKey(db_index=False, help_text='Copia de ``subetapa.proyecto`` para leer series del proyecto sin joins.', on_delete=django.db.models.deletion.CASCADE, related_name='movimientos', to='PruebaTecnica.proyecto'),
+        ),
+        migrations.AlterField(
+            model_name='movimientofinanciero',
+            name='subetapa',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='movimientos', to='PruebaTecnica.subetapa'),
+        ),
+        migrations.AddIndex(
+            model_name='movimientofinanciero',
+            index=models.Index(fields=['proyecto', 'periodo', 'concepto', 'subetapa', 'valor'], name='movimiento_proyecto_periodo'),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:49
+
+from decimal import Decimal
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Q, Sum
+from django.db.models.functions import Coalesce
+
+
+def poblar_resumen(apps, schema_editor):
+    MovimientoFinanciero = apps.get_model("PruebaTecnica", "MovimientoFinanciero")
+    ResumenPeriodo = apps.get_model("PruebaTecnica", "ResumenPeriodo")
+    cero = Decimal("0")
+    totales = (
+        MovimientoFinanciero.objects.order_by()
+        .values("proyecto_id", "periodo")
+        .annotate(
+            ingresos=Coalesce(Sum("valor", filter=Q(concepto="ingresos")), cero),
+            costos=Coalesce(Sum("valor", filter=Q(concepto="costos")), cero),
+        )
+    )
+    ResumenPeriodo.objects.bulk_create(
+        [
+            ResumenPeriodo(
+                proyecto_id=fila["proyecto_id"],
+                periodo=fila["periodo"],
+                ingresos=fila["ingresos"],
+                costos=fila["costos"],
+                fco=fila["ingresos"] - fila["costos"],
+            )
+            for fila in totales.iterator()
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('PruebaTecnica', '0004_movimiento_proyecto'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenPeriodo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('periodo', models.PositiveIntegerField()),
+                ('ingresos', models.DecimalField(decimal_places=2, max_digits=16)),
+                ('costos', models.DecimalField(decimal_places=2, max_digits=16)),
+                ('fco', models.DecimalField(decimal_places=2, help_text='Flujo de caja operativo: ingresos menos costos.', max_digits=16)),
+                ('proyecto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumen_periodos', to='PruebaTecnica.proyecto')),
+            ],
+            options={
+                'ordering': ['proyecto_id', 'periodo'],
+                'unique_together': {('proyecto', 'periodo')},
+            },
+        ),
+        migrations.RunPython(poblar_resumen, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('PruebaTecnica', '0005_resumenperiodo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aportecapital',
+            name='flujo_acumulado',
+            field=models.DecimalField(decimal_places=2, help_text='Excedente acumulado al cierre del periodo. Vacío en cronogramas guardados antes de existir el campo.', max_digits=14, null=True),
+        ),
+        migrations.AddField(
+            model_name='desembolsocredito',
+            name='flujo_caja_neto',
+            field=models.DecimalField(decimal_places=2, help_text='FCN del periodo. Vacío en cronogramas guardados antes de existir el campo.', max_digits=14, null=True),
+        ),
+    ]
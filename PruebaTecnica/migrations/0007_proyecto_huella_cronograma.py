@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 13:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('PruebaTecnica', '0006_cronograma_flujos'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='proyecto',
+            name='huella_cronograma',
+            field=models.CharField(blank=True, help_text='Huella del dataset, los parámetros y el motor del cronograma guardado; vacía si se escribió por otro camino (recálculo, streaming).', max_length=64),
+        ),
+    ]
@@ -1,4 +1,11 @@
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+from typing import Dict, Optional
+
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.utils import timezone
 
 
 class Proyecto(models.Model):
@@ -6,6 +13,12 @@ class Proyecto(models.Model):
 
     nombre = models.CharField(max_length=100, unique=True)
     descripcion = models.TextField(blank=True)
+    huella_cronograma = models.CharField(
+        max_length=64,
+        blank=True,
+        help_text="Huella del dataset, los parámetros y el motor del cronograma guardado; "
+                  "vacía si se escribió por otro camino (recálculo, streaming).",
+    )
 
     class Meta:
         ordering = ["nombre"]
@@ -52,6 +65,41 @@ class Subetapa(models.Model):
         return f"{self.proyecto} · {self.nombre}"
 
 
+class MovimientoQuerySet(models.QuerySet):
+    """Consultas de series de tiempo por proyecto sobre ``MovimientoFinanciero``."""
+
+    def del_proyecto(self, proyecto) -> "MovimientoQuerySet":
+        """Movimientos de ``proyecto`` (instancia o id) sin pasar por ``Subetapa``."""
+        return self.filter(proyecto=proyecto)
+
+    def entre_periodos(self, desde: Optional[int] = None, hasta: Optional[int] = None) -> "MovimientoQuerySet":
+        """Restringe a ``desde <= periodo <= hasta``; cualquiera de los extremos puede omitirse."""
+        queryset = self
+        if desde is not None:
+            queryset = queryset.filter(periodo__gte=desde)
+        if hasta is not None:
+            queryset = queryset.filter(periodo__lte=hasta)
+        return queryset
+
+    def totales_por_concepto(self) -> "models.QuerySet":
+        """Una fila ``{periodo, concepto, total}`` por periodo y concepto, sumada en SQL."""
+        return (
+            self.order_by()
+            .values("periodo", "concepto")
+            .annotate(total=models.Sum("valor"))
+            .order_by("periodo", "concepto")
+        )
+
+    def totales_por_periodo(self) -> Dict[int, Dict[str, Decimal]]:
+        """Ingresos y costos por periodo, en el formato de
+        :func:`~PruebaTecnica.calculos.calcular_cronograma_por_periodo`."""
+        totales: Dict[int, Dict[str, Decimal]] = {}
+        for fila in self.totales_por_concepto():
+            periodo = totales.setdefault(fila["periodo"], {"ingresos": Decimal("0"), "costos": Decimal("0")})
+            periodo[fila["concepto"]] = fila["total"]
+        return totales
+
+
 class MovimientoFinanciero(models.Model):
     """Registra ingresos o costos mensuales por subetapa."""
 
@@ -59,10 +107,20 @@ class MovimientoFinanciero(models.Model):
         INGRESO = "ingresos", "Ingresos"
         COSTO = "costos", "Costos"
 
+    proyecto = models.ForeignKey(
+        Proyecto,
+        on_delete=models.CASCADE,
+        related_name="movimientos",
+        # El índice compuesto de Meta.indexes empieza por proyecto y lo reemplaza.
+        db_index=False,
+        help_text="Copia de ``subetapa.proyecto`` para leer series del proyecto sin joins.",
+    )
     subetapa = models.ForeignKey(
         Subetapa,
         on_delete=models.CASCADE,
         related_name="movimientos",
+        # Cubierto por el índice único (subetapa, periodo, concepto).
+        db_index=False,
     )
     periodo = models.PositiveIntegerField(help_text="Número consecutivo del mes dentro del proyecto.")
     concepto = models.CharField(
@@ -71,14 +129,67 @@ class MovimientoFinanciero(models.Model):
     )
     valor = models.DecimalField(max_digits=14, decimal_places=2)
 
+    objects = MovimientoQuerySet.as_manager()
+
     class Meta:
-        ordering = ["subetapa__proyecto__nombre", "subetapa__nombre", "periodo", "concepto"]
+        # Por columnas propias, en el orden del índice por proyecto: sin joins ni ordenamiento adicional.
+        ordering = ["proyecto_id", "periodo", "concepto", "subetapa_id"]
         unique_together = ("subetapa", "periodo", "concepto")
+        indexes = [
+            # Rangos de periodos de un proyecto, agrupados por concepto o en el
+            # orden por defecto. ``valor`` va en la clave para que las lecturas
+            # se resuelvan solo con el índice (SQLite no admite columnas INCLUDE).
+            models.Index(
+                fields=["proyecto", "periodo", "concepto", "subetapa", "valor"],
+                name="movimiento_proyecto_periodo",
+            ),
+        ]
 
     def __str__(self) -> str:
         return f"{self.subetapa} · P{self.periodo} · {self.get_concepto_display()}"
 
 
+class ResumenPeriodoQuerySet(models.QuerySet):
+    def totales_por_periodo(self) -> Dict[int, Dict[str, Decimal]]:
+        """Ingresos y costos por periodo, en el mismo formato que
+        :meth:`MovimientoQuerySet.totales_por_periodo`."""
+        return {
+            periodo: {"ingresos": ingresos, "costos": costos}
+            for periodo, ingresos, costos in self.order_by("periodo").values_list("periodo", "ingresos", "costos")
+        }
+
+
+class ResumenPeriodo(models.Model):
+    """Totales por periodo de los movimientos de un proyecto.
+
+    Se mantiene al guardar movimientos (ver :mod:`PruebaTecnica.persistencia`)
+    para que las lecturas por periodo no recorran todos los movimientos.
+    """
+
+    proyecto = models.ForeignKey(
+        Proyecto,
+        on_delete=models.CASCADE,
+        related_name="resumen_periodos",
+    )
+    periodo = models.PositiveIntegerField()
+    ingresos = models.DecimalField(max_digits=16, decimal_places=2)
+    costos = models.DecimalField(max_digits=16, decimal_places=2)
+    fco = models.DecimalField(
+        max_digits=16,
+        decimal_places=2,
+        help_text="Flujo de caja operativo: ingresos menos costos.",
+    )
+
+    objects = ResumenPeriodoQuerySet.as_manager()
+
+    class Meta:
+        ordering = ["proyecto_id", "periodo"]
+        unique_together = ("proyecto", "periodo")
+
+    def __str__(self) -> str:
+        return f"{self.proyecto} · P{self.periodo} · FCO {self.fco}"
+
+
 class CreditoConstructor(models.Model):
     """Parámetros contractuales del crédito constructor asignado a un proyecto."""
 
@@ -122,6 +233,12 @@ class DesembolsoCredito(models.Model):
     interes_generado = models.DecimalField(max_digits=14, decimal_places=2)
     interes_pagado = models.DecimalField(max_digits=14, decimal_places=2)
     pago_capital = models.DecimalField(max_digits=14, decimal_places=2)
+    flujo_caja_neto = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        null=True,
+        help_text="FCN del periodo. Vacío en cronogramas guardados antes de existir el campo.",
+    )
 
     class Meta:
         ordering = ["periodo"]
@@ -146,6 +263,12 @@ class AporteCapital(models.Model):
         decimal_places=2,
         help_text="Flujo neto después de considerar el aporte del periodo.",
     )
+    flujo_acumulado = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        null=True,
+        help_text="Excedente acumulado al cierre del periodo. Vacío en cronogramas guardados antes de existir el campo.",
+    )
 
     class Meta:
         ordering = ["periodo"]
@@ -153,3 +276,45 @@ class AporteCapital(models.Model):
 
     def __str__(self) -> str:
         return f"{self.proyecto} · P{self.periodo} · Aporte {self.monto}"
+
+
+class TrabajoCronogramaQuerySet(models.QuerySet):
+    def disponibles(self, vencimiento: timedelta) -> "TrabajoCronogramaQuerySet":
+        """Trabajos pendientes y en proceso sin avance desde hace más de ``vencimiento``."""
+        abandonados = models.Q(
+            estado=TrabajoCronograma.Estado.EN_PROCESO, actualizado__lt=timezone.now() - vencimiento
+        )
+        return self.filter(models.Q(estado=TrabajoCronograma.Estado.PENDIENTE) | abandonados)
+
+
+class TrabajoCronograma(models.Model):
+    """Cálculo de cronograma encolado para ejecutarse fuera de la petición HTTP."""
+
+    class Estado(models.TextChoices):
+        PENDIENTE = "pendiente", "Pendiente"
+        EN_PROCESO = "en_proceso", "En proceso"
+        COMPLETADO = "completado", "Completado"
+        FALLIDO = "fallido", "Fallido"
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    proyecto = models.CharField(max_length=100)
+    parametros = models.JSONField(
+        encoder=DjangoJSONEncoder,
+        help_text="Datos validados del formulario (URL del dataset y parámetros del crédito).",
+    )
+    estado = models.CharField(max_length=10, choices=Estado.choices, default=Estado.PENDIENTE)
+    etapa = models.CharField(max_length=20, blank=True)
+    progreso = models.PositiveSmallIntegerField(default=0, help_text="Porcentaje de avance (0 a 100).")
+    error = models.TextField(blank=True)
+    filas = models.JSONField(encoder=DjangoJSONEncoder, null=True, blank=True)
+    creado = models.DateTimeField(auto_now_add=True)
+    actualizado = models.DateTimeField(auto_now=True)
+
+    objects = TrabajoCronogramaQuerySet.as_manager()
+
+    class Meta:
+        ordering = ["-creado"]
+        indexes = [models.Index(fields=["estado", "creado"])]
+
+    def __str__(self) -> str:
+        return f"Trabajo {self.id} · {self.proyecto} · {self.get_estado_display()}"
@@ -0,0 +1,580 @@
+from __future__ import annotations
+
+import functools
+import threading
+import weakref
+from contextlib import contextmanager
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections, transaction
+
+from .metricas import FILAS_ESCRITAS
+from .models import (
+    AporteCapital,
+    CreditoConstructor,
+    DesembolsoCredito,
+    MovimientoFinanciero,
+    Proyecto,
+    ResumenPeriodo,
+    Subetapa,
+)
+
+# Filas por sentencia INSERT ... ON CONFLICT. Django reduce el lote si supera el
+# máximo de parámetros por consulta del backend (999 en SQLite).
+TAMANO_LOTE = 500
+# Espera por el lock de escritura de SQLite cuando la base no configura ``timeout`` (el default de sqlite3).
+TIMEOUT_SQLITE = 5.0
+
+CAMPOS_DESEMBOLSO = (
+    "monto",
+    "saldo_despues_del_desembolso",
+    "interes_generado",
+    "interes_pagado",
+    "pago_capital",
+    "flujo_caja_neto",
+)
+CAMPOS_APORTE = ("monto", "flujo_caja_apalancado", "flujo_acumulado")
+CAMPOS_RESUMEN = ("ingresos", "costos", "fco")
+
+
+_locks_escritura: Dict[str, threading.Lock] = {}
+# Un lock por proyecto mientras alguien lo usa; se liberan solos al dejar de usarse.
+_locks_proyecto: "weakref.WeakValueDictionary[str, threading.RLock]" = weakref.WeakValueDictionary()
+_lock_locks = threading.Lock()
+
+
+def cuantizar(value: Decimal) -> Decimal:
+    return value.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+
+
+@contextmanager
+def transaccion_escritura(using: str = DEFAULT_DB_ALIAS) -> Iterator[None]:
+    """``transaction.atomic`` para los caminos que escriben, con los escritores del proceso en fila.
+
+    SQLite admite un solo escritor a la vez. Entre procesos la espera la
+    resuelve ``BEGIN IMMEDIATE`` con el ``timeout`` de la conexión; dentro del
+    proceso los hilos esperan además un lock antes de abrir la transacción, que
+    se entrega apenas se libera en lugar de depender del sondeo con pausas del
+    ``busy_timeout`` de SQLite. La espera por ese lock tiene el mismo límite
+    que la de SQLite, ``OPTIONS["timeout"]`` de la base (5 segundos si no se
+    configura); al vencer se lanza ``OperationalError`` como haría SQLite. Con
+    otros motores, o dentro de una transacción ya abierta, equivale a
+    ``transaction.atomic``.
+    """
+    conexion = connections[using]
+    if conexion.vendor != "sqlite" or conexion.in_atomic_block:
+        with transaction.atomic(using=using):
+            yield
+        return
+    with _lock_locks:
+        lock = _locks_escritura.setdefault(using, threading.Lock())
+    espera = conexion.settings_dict["OPTIONS"].get("timeout", TIMEOUT_SQLITE)
+    if not lock.acquire(timeout=espera):
+        raise OperationalError(f"database is locked: otro hilo escribe en {using!r} hace más de {espera} s")
+    try:
+        with transaction.atomic(using=using):
+            yield
+    finally:
+        lock.release()
+
+
+@contextmanager
+def bloqueo_proyecto(nombre: str) -> Iterator[None]:
+    """Pone en fila a los hilos del proceso que escriben el proyecto ``nombre``.
+
+    Lo toman las funciones que escriben un proyecto, siempre antes de
+    :func:`transaccion_escritura`. Es reentrante: quien llama puede tomarlo
+    antes para abarcar también la decisión de escribir, de modo que quien
+    espera compruebe (por ejemplo en la cache de resultados) que otro ya
+    guardó lo mismo y no repita la escritura. Entre procesos la exclusión la
+    da la transacción.
+    """
+    with _lock_locks:
+        lock = _locks_proyecto.get(nombre)
+        if lock is None:
+            lock = _locks_proyecto[nombre] = threading.RLock()
+    with lock:
+        yield
+
+
+def _upsert(modelo, objetos: List, unique_fields: Sequence[str], update_fields: Sequence[str]) -> None:
+    """Inserta o actualiza ``objetos`` por lotes con ``INSERT ... ON CONFLICT``."""
+    if not objetos:
+        return
+    modelo.objects.bulk_create(
+        objetos,
+        batch_size=TAMANO_LOTE,
+        update_conflicts=True,
+        unique_fields=list(unique_fields),
+        update_fields=list(update_fields),
+    )
+    _contar_filas(modelo, len(objetos))
+
+
+def _contar_filas(modelo, cantidad: int) -> None:
+    # Solo cuentan las filas de transacciones confirmadas; fuera de una transacción se cuenta de inmediato.
+    transaction.on_commit(functools.partial(FILAS_ESCRITAS.incrementar, cantidad, modelo=modelo.__name__))
+
+
+def _filas_cambiadas(existentes: Dict, nuevas: Dict) -> List:
+    """Claves de ``nuevas`` que no existen o cuyos valores difieren de lo almacenado."""
+    return [clave for clave, valores in nuevas.items() if existentes.get(clave) != valores]
+
+
+def guardar_en_base(
+        movimientos: Iterable[dict],
+        resultados: dict,
+        nombre_proyecto: str,
+        parametros: dict,
+        dataset_url: str,
+        desde_periodo: Optional[int] = None,
+        huella: str = "",
+        huella_base: str = "",
+) -> bool:
+    """Persiste movimientos y cronogramas comparando contra lo ya almacenado.
+
+    Solo se escriben las filas nuevas o modificadas mediante ``bulk_create``
+    con ``update_conflicts``, de modo que el número de consultas depende del
+    número de lotes y no del número de filas.
+
+    ``huella`` identifica el cálculo (ver :meth:`~PruebaTecnica.cache.CacheResultados.huella`)
+    y queda guardada en el proyecto. Si el proyecto ya tiene esa misma huella,
+    la descripción de ``dataset_url`` y los mismos valores del crédito, no se
+    compara ni se escribe nada y se retorna ``False``. La comprobación ocurre
+    dentro de la transacción, así que vale entre procesos.
+
+    Con ``desde_periodo`` (ver :func:`~PruebaTecnica.calculos.recalcular_cronograma`)
+    solo se leen y escriben desembolsos y aportes de ese periodo en adelante;
+    los anteriores se dan por vigentes siempre que el proyecto siga guardado
+    con ``huella_base``, la huella del cálculo del que se retomó. Si otro
+    proceso lo cambió entretanto, se compara y se escribe el cronograma completo.
+
+    Las filas se redondean y agrupan antes de abrir la transacción, así que el
+    lock de escritura solo se retiene mientras se compara y se escribe.
+    """
+    with bloqueo_proyecto(nombre_proyecto):
+        # Dentro del lock del proyecto los hilos que guardan el mismo cálculo no
+        # consultan mientras otro escribe. La primera consulta evita preparar
+        # las filas; la segunda, dentro de la transacción, es la que decide.
+        if _guardado_al_dia(nombre_proyecto, huella, parametros, dataset_url):
+            return False
+        valores, rangos = _preparar_movimientos(movimientos)
+        desembolsos = _filas_desembolsos(resultados.get("creditos", []), desde_periodo)
+        aportes = _filas_aportes(resultados.get("aportes", []), desde_periodo)
+        with transaccion_escritura():
+            if _guardado_al_dia(nombre_proyecto, huella, parametros, dataset_url):
+                return False
+            if desde_periodo is not None and not _tiene_huella(nombre_proyecto, huella_base):
+                # Lo guardado no es el cronograma del que partió el recálculo: los
+                # periodos anteriores a ``desde_periodo`` tampoco están al día.
+                desde_periodo = None
+                desembolsos = _filas_desembolsos(resultados.get("creditos", []))
+                aportes = _filas_aportes(resultados.get("aportes", []))
+            proyecto, credito = guardar_proyecto(nombre_proyecto, parametros, dataset_url)
+            _guardar_movimientos(proyecto, valores, rangos)
+            _guardar_desembolsos(credito, desembolsos, desde_periodo)
+            _guardar_aportes(proyecto, aportes, desde_periodo)
+            marcar_huella(proyecto, huella)
+    return True
+
+
+def guardar_proyecto(
+        nombre_proyecto: str,
+        parametros: dict,
+        dataset_url: str,
+) -> Tuple[Proyecto, CreditoConstructor]:
+    """Crea o actualiza el proyecto y los parámetros de su crédito constructor."""
+    importado, actualizado = _descripciones(dataset_url)
+    proyecto, creado = Proyecto.objects.get_or_create(nombre=nombre_proyecto, defaults={"descripcion": importado})
+    if not creado and proyecto.descripcion != actualizado:
+        proyecto.descripcion = actualizado
+        proyecto.save(update_fields=["descripcion"])
+    return proyecto, _guardar_credito(proyecto, parametros)
+
+
+def _descripciones(dataset_url: str) -> Tuple[str, str]:
+    """Descripción del proyecto al crearlo y al actualizarlo desde ``dataset_url``."""
+    return f"Escenario importado desde {dataset_url}", f"Escenario actualizado desde {dataset_url}"
+
+
+def _tiene_huella(nombre_proyecto: str, huella: str) -> bool:
+    return bool(huella) and Proyecto.objects.filter(nombre=nombre_proyecto, huella_cronograma=huella).exists()
+
+
+def _guardado_al_dia(nombre_proyecto: str, huella: str, parametros: dict, dataset_url: str) -> bool:
+    # La huella identifica el cronograma, no lo que se escribe en el proyecto:
+    # otra URL con el mismo dataset, o un porcentaje de 8 en lugar de 0.08,
+    # dan la misma huella pero otra descripción u otro crédito guardado.
+    if not huella:
+        return False
+    credito = {f"credito_constructor__{campo}": valor for campo, valor in _valores_credito(parametros).items()}
+    return Proyecto.objects.filter(
+        nombre=nombre_proyecto,
+        huella_cronograma=huella,
+        descripcion__in=_descripciones(dataset_url),
+        **credito,
+    ).exists()
+
+
+def marcar_huella(proyecto: Proyecto, huella: str = "") -> None:
+    """Registra en el proyecto la huella del cronograma que se acaba de escribir.
+
+    Los caminos que escriben sin una huella (recálculos, streaming) la dejan
+    vacía, de modo que el próximo :func:`guardar_en_base` no se salte nada.
+    """
+    filas = Proyecto.objects.filter(pk=proyecto.pk)
+    if filas.values_list("huella_cronograma", flat=True).first() != huella:
+        filas.update(huella_cronograma=huella)
+        _contar_filas(Proyecto, 1)
+    proyecto.huella_cronograma = huella
+
+
+def guardar_cronograma(
+        proyecto: Proyecto,
+        credito: CreditoConstructor,
+        resultados: dict,
+        desde_periodo: Optional[int] = None,
+) -> None:
+    """Sincroniza desembolsos y aportes con ``resultados`` (ver :func:`guardar_en_base`)."""
+    _guardar_desembolsos(credito, _filas_desembolsos(resultados.get("creditos", []), desde_periodo), desde_periodo)
+    _guardar_aportes(proyecto, _filas_aportes(resultados.get("aportes", []), desde_periodo), desde_periodo)
+
+
+def guardar_recalculo(proyecto: Proyecto, parametros: dict, resultados: dict) -> None:
+    """Guarda parámetros y cronograma recalculados sin tocar los movimientos del proyecto."""
+    desembolsos = _filas_desembolsos(resultados.get("creditos", []))
+    aportes = _filas_aportes(resultados.get("aportes", []))
+    with bloqueo_proyecto(proyecto.nombre), transaccion_escritura():
+        credito = _guardar_credito(proyecto, parametros)
+        _guardar_desembolsos(credito, desembolsos)
+        _guardar_aportes(proyecto, aportes)
+        marcar_huella(proyecto)
+
+
+def _valores_credito(parametros: dict) -> dict:
+    """Campos de :class:`~PruebaTecnica.models.CreditoConstructor` tal como se guardan."""
+    return {
+        "cupo_total": cuantizar(Decimal(str(parametros["cupo_credito"]))),
+        "porcentaje_maximo_mensual": cuantizar(Decimal(str(parametros["porcentaje_maximo_mensual"]))),
+        "periodo_inicial": parametros["periodo_inicial_credito"],
+        "periodo_final": parametros["periodo_final_credito"],
+        "tasa_interes_anual": cuantizar(Decimal(str(parametros["tasa_interes_anual"]))),
+    }
+
+
+def _guardar_credito(proyecto: Proyecto, parametros: dict) -> CreditoConstructor:
+    valores = _valores_credito(parametros)
+    credito, creado = CreditoConstructor.objects.get_or_create(proyecto=proyecto, defaults=valores)
+    if not creado and any(getattr(credito, campo) != valor for campo, valor in valores.items()):
+        for campo, valor in valores.items():
+            setattr(credito, campo, valor)
+        credito.save(update_fields=list(valores))
+    return credito
+
+
+def _registrar_periodo(rangos: Dict[str, Dict[str, Optional[Tuple[int, int]]]], movimiento: dict) -> None:
+    """Extiende el rango de periodos de ventas o construcción de la subetapa del movimiento."""
+    periodo = int(movimiento["periodo"])
+    info = rangos.setdefault(movimiento["subetapa"], {"ventas": None, "costos": None})
+    clave = "ventas" if movimiento["concepto"] == "ingresos" else "costos"
+    rango = info[clave]
+    info[clave] = (periodo, periodo) if rango is None else (min(rango[0], periodo), max(rango[1], periodo))
+
+
+def _preparar_movimientos(
+        movimientos: Iterable[dict],
+) -> Tuple[Dict[Tuple[str, int, str], Decimal], Dict[str, Dict[str, Optional[Tuple[int, int]]]]]:
+    """Valores al centavo por (subetapa, periodo, concepto) y rangos de periodos por subetapa."""
+    # Se agregan por clave única; igual que con update_or_create, la última fila gana.
+    valores: Dict[Tuple[str, int, str], Decimal] = {}
+    rangos: Dict[str, Dict[str, Optional[Tuple[int, int]]]] = {}
+    for movimiento in movimientos:
+        clave = (movimiento["subetapa"], int(movimiento["periodo"]), movimiento["concepto"])
+        valores[clave] = cuantizar(Decimal(str(movimiento["valor"])))
+        _registrar_periodo(rangos, movimiento)
+    return valores, rangos
+
+
+def _guardar_movimientos(
+        proyecto: Proyecto,
+        valores: Dict[Tuple[str, int, str], Decimal],
+        rangos: Dict[str, Dict[str, Optional[Tuple[int, int]]]],
+) -> None:
+    subetapas: Dict[str, Subetapa] = {}
+    _resolver_subetapas(proyecto, rangos, subetapas)
+    _actualizar_rangos(subetapas, rangos)
+
+    nuevas = {
+        (subetapas[nombre].pk, periodo, concepto): valor
+        for (nombre, periodo, concepto), valor in valores.items()
+    }
+    almacenados = MovimientoFinanciero.objects.del_proyecto(proyecto).order_by()
+    existentes = {
+        (subetapa_id, periodo, concepto): valor
+        for subetapa_id, periodo, concepto, valor in almacenados.values_list(
+            "subetapa_id", "periodo", "concepto", "valor"
+        ).iterator(chunk_size=2000)
+    }
+    cambiadas = _filas_cambiadas(existentes, nuevas)
+    _upsert(
+        MovimientoFinanciero,
+        [
+            MovimientoFinanciero(
+                proyecto=proyecto, subetapa_id=clave[0], periodo=clave[1], concepto=clave[2], valor=nuevas[clave]
+            )
+            for clave in cambiadas
+        ],
+        unique_fields=("subetapa", "periodo", "concepto"),
+        update_fields=("valor",),
+    )
+
+    diferencias: Dict[Tuple[int, str], Decimal] = {}
+    for clave in cambiadas:
+        _, periodo, concepto = clave
+        diferencia = nuevas[clave] - existentes.get(clave, Decimal("0"))
+        diferencias[periodo, concepto] = diferencias.get((periodo, concepto), Decimal("0")) + diferencia
+    _actualizar_resumen(proyecto, diferencias)
+
+
+def _actualizar_resumen(proyecto: Proyecto, diferencias: Dict[Tuple[int, str], Decimal]) -> None:
+    """Suma ``diferencias`` (por periodo y concepto) a los totales de :class:`ResumenPeriodo`.
+
+    Solo se leen y escriben los periodos afectados.
+    """
+    if not diferencias:
+        return
+    periodos = {periodo for periodo, _ in diferencias}
+    totales = {
+        periodo: {"ingresos": ingresos, "costos": costos}
+        for periodo, ingresos, costos in ResumenPeriodo.objects.filter(
+            proyecto=proyecto, periodo__gte=min(periodos), periodo__lte=max(periodos)
+        ).order_by().values_list("periodo", "ingresos", "costos")
+    }
+    for (periodo, concepto), diferencia in diferencias.items():
+        total = totales.setdefault(periodo, {"ingresos": Decimal("0"), "costos": Decimal("0")})
+        total[concepto] += diferencia
+    _upsert(
+        ResumenPeriodo,
+        [_fila_resumen(proyecto, periodo, totales[periodo]) for periodo in periodos],
+        unique_fields=("proyecto", "periodo"),
+        update_fields=CAMPOS_RESUMEN,
+    )
+
+
+def _fila_resumen(proyecto: Proyecto, periodo: int, total: Dict[str, Decimal]) -> ResumenPeriodo:
+    return ResumenPeriodo(
+        proyecto=proyecto,
+        periodo=periodo,
+        ingresos=total["ingresos"],
+        costos=total["costos"],
+        fco=total["ingresos"] - total["costos"],
+    )
+
+
+@transaccion_escritura()
+def reconstruir_resumen(proyecto: Proyecto) -> int:
+    """Recalcula desde cero el :class:`ResumenPeriodo` de ``proyecto``. Retorna los periodos escritos."""
+    totales = MovimientoFinanciero.objects.del_proyecto(proyecto).totales_por_periodo()
+    ResumenPeriodo.objects.filter(proyecto=proyecto).delete()
+    ResumenPeriodo.objects.bulk_create(
+        [_fila_resumen(proyecto, periodo, total) for periodo, total in totales.items()],
+        batch_size=TAMANO_LOTE,
+    )
+    _contar_filas(ResumenPeriodo, len(totales))
+    return len(totales)
+
+
+def verificar_resumen(proyecto: Proyecto) -> List[Tuple[int, Optional[tuple], Optional[tuple]]]:
+    """Periodos cuyo resumen no coincide con los movimientos: ``(periodo, esperado, almacenado)``.
+
+    ``esperado`` y ``almacenado`` son ``(ingresos, costos, fco)`` o ``None`` si falta la fila.
+    """
+    esperados = {
+        periodo: (total["ingresos"], total["costos"], total["ingresos"] - total["costos"])
+        for periodo, total in MovimientoFinanciero.objects.del_proyecto(proyecto).totales_por_periodo().items()
+    }
+    almacenados = {
+        periodo: tuple(valores)
+        for periodo, *valores in ResumenPeriodo.objects.filter(proyecto=proyecto)
+        .order_by()
+        .values_list("periodo", *CAMPOS_RESUMEN)
+    }
+    return [
+        (periodo, esperados.get(periodo), almacenados.get(periodo))
+        for periodo in sorted(esperados.keys() | almacenados.keys())
+        if esperados.get(periodo) != almacenados.get(periodo)
+    ]
+
+
+def _resolver_subetapas(proyecto: Proyecto, nombres: Iterable[str], subetapas: Dict[str, Subetapa]) -> None:
+    """Completa ``subetapas`` con las de ``nombres`` que falten, creándolas si no existen."""
+    pendientes = [nombre for nombre in nombres if nombre not in subetapas]
+    if not pendientes:
+        return
+    subetapas.update(
+        (subetapa.nombre, subetapa)
+        for subetapa in Subetapa.objects.filter(proyecto=proyecto, nombre__in=pendientes).order_by()
+    )
+    faltantes = [nombre for nombre in pendientes if nombre not in subetapas]
+    if faltantes:
+        creadas = Subetapa.objects.bulk_create(
+            [Subetapa(proyecto=proyecto, nombre=nombre) for nombre in faltantes],
+            batch_size=TAMANO_LOTE,
+        )
+        if not all(subetapa.pk for subetapa in creadas):
+            # Backends sin RETURNING en inserciones masivas: se recuperan los ids.
+            creadas = Subetapa.objects.filter(proyecto=proyecto, nombre__in=faltantes).order_by()
+        subetapas.update((subetapa.nombre, subetapa) for subetapa in creadas)
+
+
+def _actualizar_rangos(
+        subetapas: Dict[str, Subetapa],
+        rangos: Dict[str, Dict[str, Optional[Tuple[int, int]]]],
+) -> None:
+    """Actualiza los periodos de ventas y construcción detectados por subetapa."""
+    campos = ("periodo_inicio_ventas", "periodo_fin_ventas", "periodo_inicio_construccion", "periodo_fin_construccion")
+    modificadas = []
+    for nombre, info in rangos.items():
+        ventas = info["ventas"] or (None, None)
+        costos = info["costos"] or (None, None)
+        subetapa = subetapas[nombre]
+        nuevos = (*ventas, *costos)
+        if tuple(getattr(subetapa, campo) for campo in campos) != nuevos:
+            for campo, valor in zip(campos, nuevos):
+                setattr(subetapa, campo, valor)
+            modificadas.append(subetapa)
+    if modificadas:
+        Subetapa.objects.bulk_update(modificadas, campos, batch_size=TAMANO_LOTE)
+
+
+class EscritorMovimientos:
+    """Persiste movimientos por lotes a medida que llegan, sin retenerlos todos en memoria.
+
+    A diferencia de :func:`guardar_en_base` no compara con lo almacenado: cada
+    lote se escribe con ``INSERT ... ON CONFLICT DO UPDATE``. Solo conserva el
+    lote en curso y los rangos de periodos por subetapa. Debe usarse dentro de
+    una transacción y llamar a :meth:`cerrar` al terminar.
+    """
+
+    def __init__(self, proyecto: Proyecto, tamano_lote: int = TAMANO_LOTE):
+        self.proyecto = proyecto
+        self.tamano_lote = tamano_lote
+        self.escritos = 0
+        self._lote: Dict[Tuple[str, int, str], Decimal] = {}
+        self._rangos: Dict[str, Dict[str, Optional[Tuple[int, int]]]] = {}
+        self._subetapas: Dict[str, Subetapa] = {}
+
+    def agregar(self, movimiento: dict) -> None:
+        clave = (movimiento["subetapa"], int(movimiento["periodo"]), movimiento["concepto"])
+        self._lote[clave] = cuantizar(Decimal(str(movimiento["valor"])))
+        _registrar_periodo(self._rangos, movimiento)
+        if len(self._lote) >= self.tamano_lote:
+            self._vaciar()
+
+    def cerrar(self) -> None:
+        self._vaciar()
+        _resolver_subetapas(self.proyecto, self._rangos, self._subetapas)
+        _actualizar_rangos(self._subetapas, self._rangos)
+        # Sin los valores anteriores de cada fila no hay diferencias que sumar:
+        # el resumen se recalcula en la base al terminar.
+        reconstruir_resumen(self.proyecto)
+
+    def _vaciar(self) -> None:
+        if not self._lote:
+            return
+        _resolver_subetapas(self.proyecto, {nombre for nombre, _, _ in self._lote}, self._subetapas)
+        _upsert(
+            MovimientoFinanciero,
+            [
+                MovimientoFinanciero(
+                    proyecto=self.proyecto,
+                    subetapa=self._subetapas[nombre],
+                    periodo=periodo,
+                    concepto=concepto,
+                    valor=valor,
+                )
+                for (nombre, periodo, concepto), valor in self._lote.items()
+            ],
+            unique_fields=("subetapa", "periodo", "concepto"),
+            update_fields=("valor",),
+        )
+        self.escritos += len(self._lote)
+        self._lote = {}
+
+
+def _filas_desembolsos(creditos: Iterable[dict], desde_periodo: Optional[int] = None) -> Dict[int, tuple]:
+    desde_periodo = desde_periodo or 0
+    return {
+        int(registro["periodo"]): (
+            cuantizar(registro["desembolso"]),
+            cuantizar(registro["saldo"]),
+            cuantizar(registro["interes_generado"]),
+            cuantizar(registro["interes_pagado"]),
+            cuantizar(registro["pago_credito"]),
+            cuantizar(registro["fcn"]),
+        )
+        for registro in creditos
+        if registro["periodo"] >= desde_periodo
+    }
+
+
+def _filas_aportes(aportes: Iterable[dict], desde_periodo: Optional[int] = None) -> Dict[int, tuple]:
+    desde_periodo = desde_periodo or 0
+    return {
+        int(registro["periodo"]): (
+            cuantizar(registro["aporte_capital"]),
+            cuantizar(registro["flujo_apalancado"]),
+            cuantizar(registro["flujo_acumulado"]),
+        )
+        for registro in aportes
+        if registro["periodo"] >= desde_periodo
+    }
+
+
+def _guardar_desembolsos(
+        credito: CreditoConstructor,
+        nuevas: Dict[int, tuple],
+        desde_periodo: Optional[int] = None,
+) -> None:
+    desde_periodo = desde_periodo or 0
+    almacenados = DesembolsoCredito.objects.filter(credito=credito, periodo__gte=desde_periodo)
+    existentes = {
+        periodo: tuple(valores)
+        for periodo, *valores in almacenados.order_by().values_list("periodo", *CAMPOS_DESEMBOLSO)
+    }
+    _upsert(
+        DesembolsoCredito,
+        [
+            DesembolsoCredito(credito=credito, periodo=periodo, **dict(zip(CAMPOS_DESEMBOLSO, nuevas[periodo])))
+            for periodo in _filas_cambiadas(existentes, nuevas)
+        ],
+        unique_fields=("credito", "periodo"),
+        update_fields=CAMPOS_DESEMBOLSO,
+    )
+    if existentes.keys() - nuevas.keys():
+        almacenados.exclude(periodo__in=list(nuevas)).delete()
+
+
+def _guardar_aportes(
+        proyecto: Proyecto,
+        nuevas: Dict[int, tuple],
+        desde_periodo: Optional[int] = None,
+) -> None:
+    desde_periodo = desde_periodo or 0
+    almacenados = AporteCapital.objects.filter(proyecto=proyecto, periodo__gte=desde_periodo)
+    existentes = {
+        periodo: tuple(valores)
+        for periodo, *valores in almacenados.order_by().values_list("periodo", *CAMPOS_APORTE)
+    }
+    _upsert(
+        AporteCapital,
+        [
+            AporteCapital(proyecto=proyecto, periodo=periodo, **dict(zip(CAMPOS_APORTE, nuevas[periodo])))
+            for periodo in _filas_cambiadas(existentes, nuevas)
+        ],
+        unique_fields=("proyecto", "periodo"),
+        update_fields=CAMPOS_APORTE,
+    )
+    if existentes.keys() - nuevas.keys():
+        almacenados.exclude(periodo__in=list(nuevas)).delete()
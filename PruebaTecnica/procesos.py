@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+from typing import Dict, Optional, Sequence, Tuple
+
+from .calculos import calcular_cronograma, calcular_cronograma_por_periodo, recalcular_cronograma
+
+# Las funciones que se envían a un pool de procesos viven aquí porque este
+# módulo no importa Django (ni modelos, ni settings, ni la cache): un proceso
+# iniciado con ``spawn`` solo importa el módulo de la función que ejecuta y
+# fallaría con AppRegistryNotReady si ese módulo cargara los modelos.
+
+Totales = Dict[int, Dict[str, Decimal]]
+
+
+def crear_pool_procesos(max_workers: int) -> ProcessPoolExecutor:
+    """``ProcessPoolExecutor`` cuyos procesos se inician con ``spawn``.
+
+    Con ``fork`` el hijo hereda los locks y las conexiones del proceso que lo
+    crea, lo que no es seguro si ese proceso ya tiene hilos (un servidor ASGI
+    o WSGI con hilos). Los procesos nuevos solo pueden ejecutar funciones de
+    este módulo.
+    """
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+def calcular_proyecto(proyecto_id: int, totales: Totales, parametros: dict) -> Tuple[int, Optional[dict], float, str]:
+    """Cronograma de un proyecto de la cartera a partir de sus totales por periodo.
+
+    Retorna ``(proyecto_id, resultados, segundos, error)``; un ``ValueError``
+    del cálculo queda en ``error`` con ``resultados`` en ``None``.
+    """
+    inicio = time.perf_counter()
+    try:
+        resultados = calcular_cronograma_por_periodo(totales, **parametros)
+    except ValueError as exc:
+        return proyecto_id, None, time.perf_counter() - inicio, str(exc)
+    return proyecto_id, resultados, time.perf_counter() - inicio, ""
+
+
+def calcular_movimientos(movimientos: Sequence[dict], anterior: Optional[Tuple[str, dict]], parametros: dict) -> dict:
+    """Cronograma de un dataset descargado.
+
+    Si hay un cronograma ``anterior`` (huella y resultado persistidos con los
+    mismos parámetros) se retoma desde el primer periodo que cambió.
+    """
+    if anterior is not None:
+        return recalcular_cronograma(movimientos, anterior[1], **parametros)
+    return calcular_cronograma(movimientos=movimientos, **parametros)
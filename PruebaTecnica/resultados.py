@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+from array import array
+from decimal import ROUND_HALF_UP, Context, Decimal
+from typing import Any, Dict, Iterator, List, Mapping, Sequence, Union
+
+CAMPOS_CREDITO = (
+    "periodo",
+    "ingresos",
+    "costos",
+    "fco",
+    "desembolso",
+    "saldo",
+    "interes_generado",
+    "interes_pagado",
+    "pago_credito",
+    "fcn",
+)
+CAMPOS_APORTE = ("periodo", "aporte_capital", "flujo_apalancado", "flujo_acumulado")
+# Columnas de la tabla de resultados: las del crédito seguidas de las del aporte.
+CAMPOS_TABLA = CAMPOS_CREDITO + CAMPOS_APORTE[1:]
+
+CENTAVO = Decimal("0.01")
+# Contexto con dígitos de sobra para cualquier entero de un ``array('q')``: así
+# leer una columna escalada es exacto sin importar el contexto del hilo.
+_CONTEXTO_ESCALA = Context(prec=28)
+
+
+def _decimal_desde_float(valor: float) -> Decimal:
+    # Sumar 0.0 normaliza los -0.0 para que no se muestren como "-0.00".
+    return Decimal(repr(valor + 0.0))
+
+
+class ResultadoCronograma(Mapping):
+    """Cronograma guardado por columnas en lugar de un diccionario por periodo.
+
+    Cada campo de :data:`CAMPOS_CREDITO` y :data:`CAMPOS_APORTE` (salvo
+    ``periodo``) es una columna con un valor por periodo: una lista de
+    ``Decimal`` (motor ``"decimal"``), un ``array('d')`` (motor ``"numpy"``) o
+    un ``array('q')`` de enteros en unidades de ``10 ** -escala`` (motor
+    ``"centavos"``); las dos últimas se convierten a ``Decimal`` solo al leer
+    cada valor.
+
+    Conserva la forma anterior como adaptador: ``resultado["creditos"]`` y
+    ``resultado["aportes"]`` son secuencias de vistas por fila que se leen como
+    los diccionarios de antes, y los datos adicionales (``estados``,
+    ``subetapas``, ``desde``) son claves más del mapeo.
+    """
+
+    __slots__ = ("periodos", "_columnas", "_flotante", "_escala", "_extras")
+
+    def __init__(
+            self,
+            periodos: Sequence[int],
+            columnas: Dict[str, Union[List[Decimal], array]],
+            flotante: bool = False,
+            escala: int = 0,
+            **extras: Any,
+    ):
+        self.periodos = array("l", periodos)
+        self._columnas = columnas
+        self._flotante = flotante
+        self._escala = escala
+        self._extras = extras
+
+    @classmethod
+    def vacio(cls, **extras: Any) -> "ResultadoCronograma":
+        campos = CAMPOS_TABLA[1:]
+        return cls((), {campo: [] for campo in campos}, **extras)
+
+    def __getitem__(self, clave: str):
+        if clave == "creditos":
+            return VistaFilas(self, CAMPOS_CREDITO)
+        if clave == "aportes":
+            return VistaFilas(self, CAMPOS_APORTE)
+        return self._extras[clave]
+
+    def __iter__(self) -> Iterator[str]:
+        yield "creditos"
+        yield "aportes"
+        yield from self._extras
+
+    def __len__(self) -> int:
+        return 2 + len(self._extras)
+
+    def __reduce__(self):
+        return _reconstruir, (self.periodos, self._columnas, self._flotante, self._escala, self._extras)
+
+    def _a_decimal(self, valor) -> Decimal:
+        if self._flotante:
+            return _decimal_desde_float(valor)
+        if self._escala:
+            return Decimal(valor).scaleb(-self._escala, _CONTEXTO_ESCALA)
+        return valor
+
+    def valor(self, campo: str, indice: int) -> Decimal:
+        if campo == "periodo":
+            return Decimal(self.periodos[indice])
+        return self._a_decimal(self._columnas[campo][indice])
+
+    def columna(self, campo: str) -> List[Decimal]:
+        """Valores de ``campo`` en todos los periodos, como ``Decimal``."""
+        if campo == "periodo":
+            return [Decimal(periodo) for periodo in self.periodos]
+        valores = self._columnas[campo]
+        if not self._flotante and not self._escala:
+            return list(valores)
+        return [self._a_decimal(valor) for valor in valores]
+
+    def con(self, **extras: Any) -> "ResultadoCronograma":
+        """Mismo cronograma (sin copiar las columnas) con ``extras`` agregados o reemplazados."""
+        return ResultadoCronograma(
+            self.periodos, self._columnas, self._flotante, self._escala, **{**self._extras, **extras}
+        )
+
+    def antes_de(self, periodo: int) -> int:
+        """Cantidad de filas con periodo menor que ``periodo``."""
+        return sum(1 for valor in self.periodos if valor < periodo)
+
+    def concatenar(self, cola: "ResultadoCronograma", hasta: int, **extras: Any) -> "ResultadoCronograma":
+        """Primeras ``hasta`` filas de este cronograma seguidas de todas las de ``cola``."""
+        columnas = {campo: self.columna(campo)[:hasta] + cola.columna(campo) for campo in self._columnas}
+        return ResultadoCronograma(list(self.periodos[:hasta]) + list(cola.periodos), columnas, **extras)
+
+    def filas_tabla(self) -> "VistaFilas":
+        """Filas de la tabla (:data:`CAMPOS_TABLA`), redondeadas al centavo a medida que se leen."""
+        return VistaFilas(self, CAMPOS_TABLA, cuantizadas=True)
+
+    def como_diccionario(self) -> Dict[str, Any]:
+        """La forma anterior del resultado: listas de diccionarios por periodo."""
+        return {
+            "creditos": [dict(fila) for fila in self["creditos"]],
+            "aportes": [dict(fila) for fila in self["aportes"]],
+            **self._extras,
+        }
+
+
+def _reconstruir(periodos, columnas, flotante, escala, extras) -> ResultadoCronograma:
+    return ResultadoCronograma(periodos, columnas, flotante, escala, **extras)
+
+
+class VistaFilas(Sequence):
+    """Secuencia de filas de un :class:`ResultadoCronograma` que no copia las columnas."""
+
+    __slots__ = ("_resultado", "_campos", "_cuantizadas")
+
+    def __init__(self, resultado: ResultadoCronograma, campos: Sequence[str], cuantizadas: bool = False):
+        self._resultado = resultado
+        self._campos = campos
+        self._cuantizadas = cuantizadas
+
+    def __len__(self) -> int:
+        return len(self._resultado.periodos)
+
+    def __getitem__(self, indice):
+        if isinstance(indice, slice):
+            return [self[i] for i in range(*indice.indices(len(self)))]
+        if indice < 0:
+            indice += len(self)
+        if not 0 <= indice < len(self):
+            raise IndexError(indice)
+        return FilaCronograma(self._resultado, self._campos, indice, self._cuantizadas)
+
+    def __eq__(self, otra) -> bool:
+        if not isinstance(otra, Sequence) or isinstance(otra, str):
+            return NotImplemented
+        return len(self) == len(otra) and all(fila == otra_fila for fila, otra_fila in zip(self, otra))
+
+    def __repr__(self) -> str:
+        return f"VistaFilas({list(self)!r})"
+
+
+class FilaCronograma(Mapping):
+    """Un periodo del cronograma leído como diccionario; los valores se obtienen al consultarlos."""
+
+    __slots__ = ("_resultado", "_campos", "_indice", "_cuantizada")
+
+    def __init__(self, resultado: ResultadoCronograma, campos: Sequence[str], indice: int, cuantizada: bool):
+        self._resultado = resultado
+        self._campos = campos
+        self._indice = indice
+        self._cuantizada = cuantizada
+
+    def __getitem__(self, campo: str):
+        if campo not in self._campos:
+            raise KeyError(campo)
+        if self._cuantizada:
+            if campo == "periodo":
+                return self._resultado.periodos[self._indice]
+            return self._resultado.valor(campo, self._indice).quantize(CENTAVO, rounding=ROUND_HALF_UP)
+        return self._resultado.valor(campo, self._indice)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._campos)
+
+    def __len__(self) -> int:
+        return len(self._campos)
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
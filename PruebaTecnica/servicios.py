@@ -0,0 +1,378 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterator, List, Optional, Tuple
+
+import requests
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from .cache import (
+    ERRORES_DESCARGA,
+    Dataset,
+    obtener_cache_resultados,
+    obtener_dataset,
+    obtener_dataset_async,
+)
+from .calculos import calcular_cronograma_por_periodo
+from .coalescencia import Coalescedor
+from .ingesta import importar_en_streaming
+from .instrumentacion import etapa
+from .metricas import CRONOGRAMA_SEGUNDOS, observar_dataset
+from .models import AporteCapital, DesembolsoCredito, Proyecto, ResumenPeriodo
+from .persistencia import guardar_en_base, guardar_recalculo
+from .procesos import calcular_movimientos, crear_pool_procesos
+from .resultados import ResultadoCronograma
+
+ETAPA_DESCARGA = "descarga"
+ETAPA_CALCULO = "calculo"
+ETAPA_GUARDADO = "guardado"
+ETAPA_COMPLETADO = "completado"
+# Solo para la instrumentación: el modo streaming descarga, calcula y guarda en una misma etapa.
+ETAPA_INGESTA = "ingesta"
+
+# Valores de la etiqueta ``modo`` de la métrica ``gerpro_cronograma_segundos``.
+MODO_SINCRONO = "sincrono"
+MODO_STREAMING = "streaming"
+MODO_ASYNC = "async"
+
+# Filas del cronograma por página en la API de resultados y en la primera carga de la tabla.
+FILAS_POR_PAGINA = 100
+
+# Porcentaje de avance con el que inicia cada etapa.
+AVANCE_ETAPAS = {
+    ETAPA_DESCARGA: 10,
+    ETAPA_CALCULO: 40,
+    ETAPA_GUARDADO: 70,
+    ETAPA_COMPLETADO: 100,
+}
+
+
+class ErrorDescarga(Exception):
+    """No se pudo obtener o decodificar el dataset remoto."""
+
+
+# Peticiones idénticas simultáneas (por ejemplo, varios analistas al cierre de
+# mes) esperan el cálculo o la ingesta en curso en lugar de repetirlos.
+_calculos_en_curso = Coalescedor("calculo")
+_ingestas_en_curso = Coalescedor("ingesta")
+
+
+def parametros_credito(cleaned: dict) -> dict:
+    """Parámetros del crédito en el formato que espera :func:`~PruebaTecnica.calculos.calcular_cronograma`."""
+    return {
+        "cupo_credito": float(cleaned["cupo_credito"]),
+        "porcentaje_maximo_mensual": float(cleaned["porcentaje_maximo_mensual"]),
+        "periodo_inicial_credito": cleaned["periodo_inicial_credito"],
+        "periodo_final_credito": cleaned["periodo_final_credito"],
+        "tasa_interes_anual": float(cleaned["tasa_interes_anual"]),
+    }
+
+
+def procesar_cronograma(
+        cleaned: dict,
+        al_avanzar: Optional[Callable[[str], None]] = None,
+) -> dict:
+    """Descarga el dataset, calcula el cronograma y lo guarda para el proyecto.
+
+    ``cleaned`` son los datos validados de :class:`~PruebaTecnica.forms.CronogramaForm`.
+    ``al_avanzar`` recibe el nombre de cada etapa a medida que comienza.
+    Lanza :class:`ErrorDescarga` si el dataset no se pudo obtener; cualquier
+    otro error proviene del cálculo o de la persistencia.
+    """
+    avisar = al_avanzar or (lambda etapa: None)
+    with CRONOGRAMA_SEGUNDOS.medir(modo=MODO_STREAMING if cleaned.get("streaming") else MODO_SINCRONO):
+        return _procesar_cronograma(cleaned, avisar)
+
+
+def _procesar_cronograma(cleaned: dict, avisar: Callable[[str], None]) -> dict:
+    url = cleaned["dataset_url"]
+    avisar(ETAPA_DESCARGA)
+
+    if cleaned.get("streaming"):
+        try:
+            with etapa(ETAPA_INGESTA):
+                proyecto = cleaned["proyecto"]
+                clave = (url, proyecto, tuple(parametros_credito(cleaned).items()))
+                resultados = _ingestas_en_curso.ejecutar(clave, importar_en_streaming, url, proyecto, cleaned)
+        except (requests.RequestException, ValueError) as exc:
+            raise ErrorDescarga(exc) from exc
+        # La base cambió sin pasar por la cache de resultados.
+        obtener_cache_resultados().invalidar(cleaned["proyecto"])
+        avisar(ETAPA_COMPLETADO)
+        return resultados
+
+    try:
+        with etapa(ETAPA_DESCARGA):
+            dataset = obtener_dataset(url)
+    except ERRORES_DESCARGA as exc:
+        raise ErrorDescarga(exc) from exc
+
+    avisar(ETAPA_CALCULO)
+    with etapa(ETAPA_CALCULO):
+        clave, resultados, anterior = _buscar_en_cache(dataset, cleaned)
+        desde = None
+        if resultados is None:
+            resultados, desde = _calculos_en_curso.ejecutar(
+                _clave_en_curso(clave, anterior, cleaned),
+                _calcular_y_registrar,
+                clave,
+                dataset.movimientos,
+                anterior,
+                parametros_credito(cleaned),
+            )
+    observar_dataset(len(dataset.movimientos), len(resultados["creditos"]))
+
+    avisar(ETAPA_GUARDADO)
+    with etapa(ETAPA_GUARDADO):
+        _persistir(dataset.movimientos, resultados, cleaned, clave, desde)
+    avisar(ETAPA_COMPLETADO)
+    return resultados
+
+
+def recalcular_desde_base(proyecto: Proyecto, parametros: dict, guardar: bool = True) -> dict:
+    """Calcula el cronograma de ``proyecto`` con sus movimientos almacenados.
+
+    Los totales por periodo se leen de :class:`~PruebaTecnica.models.ResumenPeriodo`
+    con una sola consulta, así que no se descarga ni se recorre el JSON. Con
+    ``guardar`` se reemplazan los parámetros del crédito y el cronograma persistidos.
+    """
+    with etapa(ETAPA_CALCULO):
+        totales = ResumenPeriodo.objects.filter(proyecto=proyecto).totales_por_periodo()
+        if not totales:
+            raise ValueError(f"El proyecto {proyecto} no tiene movimientos almacenados.")
+        resultados = calcular_cronograma_por_periodo(totales, **parametros_credito(parametros))
+    if guardar:
+        with etapa(ETAPA_GUARDADO):
+            guardar_recalculo(proyecto, parametros, resultados)
+        # El cronograma persistido ya no corresponde al que recuerda la cache.
+        obtener_cache_resultados().invalidar(proyecto.nombre)
+    return resultados
+
+
+async def procesar_cronograma_async(cleaned: dict) -> dict:
+    """Versión para vistas asíncronas de :func:`procesar_cronograma`.
+
+    La descarga no bloquea el event loop, el cálculo corre en el pool de
+    :func:`ejecutar_calculo` y la escritura en la base, que es una sola
+    transacción, pasa por ``sync_to_async``. El modo streaming se ejecuta
+    completo en un hilo.
+    """
+    if cleaned.get("streaming"):
+        return await sync_to_async(procesar_cronograma)(cleaned)
+    with CRONOGRAMA_SEGUNDOS.medir(modo=MODO_ASYNC):
+        return await _procesar_cronograma_async(cleaned)
+
+
+async def _procesar_cronograma_async(cleaned: dict) -> dict:
+    try:
+        with etapa(ETAPA_DESCARGA):
+            dataset = await obtener_dataset_async(cleaned["dataset_url"])
+    except ERRORES_DESCARGA as exc:
+        raise ErrorDescarga(exc) from exc
+
+    with etapa(ETAPA_CALCULO):
+        clave, resultados, anterior = _buscar_en_cache(dataset, cleaned)
+        desde = None
+        if resultados is None:
+            resultados, desde = await _calculos_en_curso.ejecutar_async(
+                _clave_en_curso(clave, anterior, cleaned),
+                _calcular_y_registrar_async,
+                clave,
+                dataset.movimientos,
+                anterior,
+                parametros_credito(cleaned),
+            )
+    observar_dataset(len(dataset.movimientos), len(resultados["creditos"]))
+
+    with etapa(ETAPA_GUARDADO):
+        await sync_to_async(_persistir)(dataset.movimientos, resultados, cleaned, clave, desde)
+    return resultados
+
+
+async def ejecutar_calculo(funcion: Callable, *args):
+    """Ejecuta ``funcion`` fuera del event loop.
+
+    Por defecto usa el pool de hilos del loop; con
+    ``GERPRO_CALCULO_ASYNC['PROCESOS'] > 0`` usa un pool de procesos, de modo
+    que los cálculos no compiten por el GIL con el servidor. Los procesos se
+    inician con ``spawn`` (el servidor ya tiene hilos cuando se crea el pool)
+    y no cargan Django, así que ``funcion`` debe ser de
+    :mod:`PruebaTecnica.procesos`.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_obtener_pool_procesos(), functools.partial(funcion, *args))
+
+
+_pool_procesos: Optional[ProcessPoolExecutor] = None
+_lock_pool = threading.Lock()
+
+
+def _obtener_pool_procesos() -> Optional[ProcessPoolExecutor]:
+    global _pool_procesos
+    procesos = settings.GERPRO_CALCULO_ASYNC["PROCESOS"]
+    if not procesos:
+        return None
+    with _lock_pool:
+        if _pool_procesos is None:
+            _pool_procesos = crear_pool_procesos(procesos)
+        return _pool_procesos
+
+
+def _buscar_en_cache(dataset: Dataset, cleaned: dict) -> Tuple[tuple, Optional[dict], Optional[Tuple[str, dict]]]:
+    """Clave del cálculo, resultado memorizado y, si no lo hay, el persistido (con su huella) del que se puede retomar."""
+    cache_resultados = obtener_cache_resultados()
+    clave = cache_resultados.clave(dataset.hash, cleaned)
+    resultados = cache_resultados.obtener(clave)
+    anterior = None
+    if resultados is None:
+        anterior = cache_resultados.anterior_persistido(cleaned["proyecto"], clave)
+    return clave, resultados, anterior
+
+
+def _registrar_calculo(
+        clave: tuple,
+        resultados: dict,
+        anterior: Optional[Tuple[str, dict]],
+) -> Optional[Tuple[int, str]]:
+    """Memoriza el resultado y retorna el periodo desde el que hay que persistir y la huella de la que partió."""
+    obtener_cache_resultados().guardar(clave, resultados)
+    return (resultados["desde"], anterior[0]) if anterior is not None else None
+
+
+def _clave_en_curso(clave: tuple, anterior: Optional[Tuple[str, dict]], cleaned: dict) -> tuple:
+    # Un cálculo completo sirve a cualquier proyecto; uno incremental retoma el
+    # cronograma persistido de un proyecto y su ``desde`` solo vale para ese.
+    return clave, cleaned["proyecto"] if anterior is not None else None
+
+
+def _calcular_y_registrar(
+        clave: tuple,
+        movimientos: list,
+        anterior: Optional[Tuple[str, dict]],
+        parametros: dict,
+) -> tuple:
+    resultados = calcular_movimientos(movimientos, anterior, parametros)
+    return resultados, _registrar_calculo(clave, resultados, anterior)
+
+
+async def _calcular_y_registrar_async(
+        clave: tuple,
+        movimientos: list,
+        anterior: Optional[Tuple[str, dict]],
+        parametros: dict,
+) -> tuple:
+    resultados = await ejecutar_calculo(calcular_movimientos, movimientos, anterior, parametros)
+    return resultados, _registrar_calculo(clave, resultados, anterior)
+
+
+def _persistir(
+        movimientos: list,
+        resultados: dict,
+        cleaned: dict,
+        clave: tuple,
+        desde: Optional[Tuple[int, str]],
+) -> None:
+    cache_resultados = obtener_cache_resultados()
+    url = cleaned["dataset_url"]
+    # Si el proyecto ya tiene guardado este mismo cálculo, guardar_en_base no
+    # escribe: lo comprueba contra la huella persistida, dentro del lock del
+    # proyecto y de la transacción, así que vale entre hilos y procesos. Lo
+    # mismo vale para ``desde``: si la base ya no tiene el cronograma del que
+    # partió el recálculo, se guarda completo.
+    desde_periodo, huella_base = desde if desde is not None else (None, "")
+    guardar_en_base(
+        movimientos,
+        resultados,
+        cleaned["proyecto"],
+        cleaned,
+        url,
+        desde_periodo=desde_periodo,
+        huella=cache_resultados.huella(clave),
+        huella_base=huella_base,
+    )
+    cache_resultados.marcar_persistido(cleaned["proyecto"], url, clave)
+
+
+def preparar_filas(resultados: ResultadoCronograma) -> List[dict]:
+    """Filas de la tabla como diccionarios con valores al centavo, por ejemplo para guardarlas en JSON.
+
+    Las vistas usan directamente ``resultados.filas_tabla()``, que redondea
+    solo las filas que se llegan a pintar.
+    """
+    return [dict(fila) for fila in resultados.filas_tabla()]
+
+
+def filas_almacenadas(proyecto: Proyecto, despues_de: int = 0, limite: int = FILAS_POR_PAGINA) -> List[dict]:
+    """Hasta ``limite`` filas del cronograma guardado con periodo mayor que ``despues_de``.
+
+    Las filas tienen el formato de :func:`preparar_filas`. Se leen con tres
+    consultas por rango de periodo sobre índices únicos (aportes, desembolsos y
+    ``ResumenPeriodo``), así que el costo de una página no depende de su
+    posición en el cronograma.
+    """
+    aportes = list(
+        AporteCapital.objects.filter(proyecto=proyecto, periodo__gt=despues_de)
+        .order_by("periodo")
+        .values_list("periodo", "monto", "flujo_caja_apalancado", "flujo_acumulado")[:limite]
+    )
+    if not aportes:
+        return []
+    rango = (aportes[0][0], aportes[-1][0])
+    desembolsos = {
+        periodo: valores
+        for periodo, *valores in DesembolsoCredito.objects.filter(
+            credito__proyecto=proyecto, periodo__range=rango
+        ).order_by().values_list(
+            "periodo",
+            "monto",
+            "saldo_despues_del_desembolso",
+            "interes_generado",
+            "interes_pagado",
+            "pago_capital",
+            "flujo_caja_neto",
+        )
+    }
+    totales = {
+        periodo: valores
+        for periodo, *valores in ResumenPeriodo.objects.filter(proyecto=proyecto, periodo__range=rango)
+        .order_by()
+        .values_list("periodo", "ingresos", "costos", "fco")
+    }
+
+    filas: List[dict] = []
+    for periodo, aporte, flujo_apalancado, flujo_acumulado in aportes:
+        # Un periodo sin movimientos (o con el resumen aún sin reconstruir) no tiene fila en ResumenPeriodo.
+        ingresos, costos, fco = totales.get(periodo, (0, 0, 0))
+        desembolso, saldo, interes_generado, interes_pagado, pago_credito, fcn = desembolsos[periodo]
+        filas.append(
+            {
+                "periodo": periodo,
+                "ingresos": ingresos,
+                "costos": costos,
+                "fco": fco,
+                "desembolso": desembolso,
+                "saldo": saldo,
+                "interes_generado": interes_generado,
+                "interes_pagado": interes_pagado,
+                "pago_credito": pago_credito,
+                "fcn": fcn,
+                "aporte_capital": aporte,
+                "flujo_apalancado": flujo_apalancado,
+                "flujo_acumulado": flujo_acumulado,
+            }
+        )
+    return filas
+
+
+def iterar_filas_almacenadas(proyecto: Proyecto, despues_de: int = 0, tamano_pagina: int = 500) -> Iterator[dict]:
+    """Todas las filas del cronograma guardado a partir de ``despues_de``, leídas página por página."""
+    while True:
+        pagina = filas_almacenadas(proyecto, despues_de, tamano_pagina)
+        yield from pagina
+        if len(pagina) < tamano_pagina:
+            return
+        despues_de = pagina[-1]["periodo"]
@@ -1,3 +1,1816 @@
-from django.test import TestCase
+import asyncio
+import csv
+import gzip
+import json
+import os
+import pickle
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from datetime import timedelta
+from decimal import Decimal, getcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest import mock, skipIf
 
-# Create your tests here.
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import OperationalError, connection
+from django.db.models import F
+from django.test import Client, SimpleTestCase, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from benchmarks.generadores import generar_movimientos
+
+from . import persistencia, servicios
+from .cache import (
+    ORIGEN_DISCO,
+    ORIGEN_MEMORIA,
+    ORIGEN_RED,
+    ORIGEN_REVALIDADO,
+    CacheDatasets,
+    CacheLRU,
+    CacheResultados,
+)
+from .calculos import (
+    MOTOR_CENTAVOS,
+    MOTOR_NUMPY,
+    PARAMETROS_CREDITO,
+    _a_unidades,
+    _agregar_decimal,
+    _agregar_unidades,
+    calcular_cronograma,
+    calcular_escenarios,
+    np,
+    recalcular_cronograma,
+)
+from .cartera import recalcular_cartera
+from .coalescencia import Coalescedor
+from .descargas import ClienteDatasets, RespuestaDemasiadoGrande
+from .exportacion import openpyxl
+from .models import (
+    AporteCapital,
+    CreditoConstructor,
+    DesembolsoCredito,
+    MovimientoFinanciero,
+    Proyecto,
+    ResumenPeriodo,
+    Subetapa,
+    TrabajoCronograma,
+)
+from .ingesta import importar_en_streaming, iterar_movimientos
+from .metricas import CACHE_CONSULTAS, DATASET_PERIODOS, FILAS_ESCRITAS, Registro
+from .persistencia import cuantizar, guardar_en_base, guardar_recalculo, verificar_resumen
+from .servicios import preparar_filas, recalcular_desde_base
+from .trabajos import ejecutar_trabajo
+from .validacion import DatasetInvalido, ValidadorMovimientos, iterar_validados, validar_movimientos
+
+RUTA_DATOS = Path(settings.BASE_DIR) / "datos_gerpro_prueba.json"
+
+PARAMETROS = {
+    "cupo_credito": Decimal("7000.00"),
+    "porcentaje_maximo_mensual": Decimal("8.00"),
+    "periodo_inicial_credito": 7,
+    "periodo_final_credito": 30,
+    "tasa_interes_anual": Decimal("12.00"),
+}
+
+
+def setUpModule():
+    # Las métricas de las pruebas no se mezclan con las de GERPRO_METRICAS["DIR"].
+    directorio = tempfile.TemporaryDirectory()
+    parche = mock.patch("PruebaTecnica.metricas._registro", Registro(Path(directorio.name)))
+    parche.start()
+    unittest.addModuleCleanup(directorio.cleanup)
+    unittest.addModuleCleanup(parche.stop)
+
+
+def cargar_movimientos():
+    with open(RUTA_DATOS, encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def calcular(movimientos, motor="decimal", **kwargs):
+    parametros = {**PARAMETROS, **kwargs}
+    return calcular_cronograma(
+        movimientos=movimientos,
+        cupo_credito=float(parametros["cupo_credito"]),
+        porcentaje_maximo_mensual=float(parametros["porcentaje_maximo_mensual"]),
+        periodo_inicial_credito=parametros["periodo_inicial_credito"],
+        periodo_final_credito=parametros["periodo_final_credito"],
+        tasa_interes_anual=float(parametros["tasa_interes_anual"]),
+        motor=motor,
+    )
+
+
+def datasets_aleatorios(cantidad=200, semilla=11):
+    """``(movimientos, parametros)`` con montos de 0, 1 o 2 decimales, huecos entre periodos y parámetros variados."""
+    aleatorio = random.Random(semilla)
+    for _ in range(cantidad):
+        periodos = aleatorio.randint(12, 60)
+        movimientos = []
+        for subetapa in range(aleatorio.randint(1, 5)):
+            for periodo in range(1, periodos + 1):
+                for concepto, desde, hasta, maximo in (
+                        ("costos", 1, periodos * 2 // 3, 2000),
+                        ("ingresos", periodos // 3, periodos, 2500),
+                ):
+                    if desde <= periodo <= hasta and aleatorio.random() < 0.8:
+                        movimientos.append({
+                            "subetapa": f"Torre {subetapa + 1}",
+                            "periodo": periodo,
+                            "concepto": concepto,
+                            "valor": round(aleatorio.uniform(0, maximo), aleatorio.choice((0, 1, 2))),
+                        })
+        parametros = {
+            "cupo_credito": Decimal(aleatorio.choice(("3000", "7000", "12345.67", "20000"))),
+            "porcentaje_maximo_mensual": Decimal(aleatorio.choice(("0.05", "8", "20", "33.3", "50"))),
+            "periodo_inicial_credito": aleatorio.randint(1, 10),
+            "periodo_final_credito": aleatorio.randint(15, 50),
+            "tasa_interes_anual": Decimal(aleatorio.choice(("0", "7.25", "12", "13", "24.5"))),
+        }
+        yield movimientos, parametros
+
+
+ESCENARIOS = [
+    {},
+    {"porcentaje_maximo_mensual": Decimal("20"), "periodo_inicial_credito": 9, "periodo_final_credito": 23},
+    {"cupo_credito": Decimal("3000"), "porcentaje_maximo_mensual": Decimal("50"), "periodo_inicial_credito": 1,
+     "periodo_final_credito": 37, "tasa_interes_anual": Decimal("0")},
+    {"cupo_credito": Decimal("20000"), "porcentaje_maximo_mensual": Decimal("0.05"), "periodo_inicial_credito": 1,
+     "periodo_final_credito": 40, "tasa_interes_anual": Decimal("24.5")},
+]
+
+
+def filas_cuantizadas(resultados):
+    return [
+        {clave: cuantizar(valor) for clave, valor in {**credito, **aporte}.items()}
+        for credito, aporte in zip(resultados["creditos"], resultados["aportes"])
+    ]
+
+
+class ServidorDatos:
+    """Servidor HTTP/1.1 local que sirve datasets JSON con ``ETag`` y cuenta las peticiones.
+
+    ``fallas[ruta]`` son códigos de error a responder antes del cuerpo, y las
+    rutas en ``comprimidas`` se envían con gzip si el cliente lo acepta.
+    ``conexiones`` guarda el puerto de origen de cada conexión aceptada y
+    ``demora`` son segundos de espera antes de cada respuesta.
+    """
+
+    def __init__(self):
+        self.cuerpos = {}
+        self.peticiones = []
+        self.demora = 0
+        self.fallas = {}
+        self.comprimidas = set()
+        self.conexiones = []
+        servidor = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                servidor.conexiones.append(self.client_address[1])
+
+            def do_GET(self):
+                servidor.peticiones.append((self.path, dict(self.headers)))
+                time.sleep(servidor.demora)
+                if servidor.fallas.get(self.path):
+                    self.send_error(servidor.fallas[self.path].pop(0))
+                    return
+                cuerpo = servidor.cuerpos.get(self.path)
+                if cuerpo is None:
+                    self.send_error(404)
+                    return
+                etag = f'"{hash(cuerpo)}"'
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                if self.path in servidor.comprimidas and "gzip" in self.headers.get("Accept-Encoding", ""):
+                    cuerpo = gzip.compress(cuerpo)
+                    self.send_header("Content-Encoding", "gzip")
+                self.send_header("Content-Length", str(len(cuerpo)))
+                self.send_header("ETag", etag)
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Manejador)
+        self.hilo = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.hilo.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def publicar(self, ruta, movimientos, cuerpo=None):
+        self.cuerpos[ruta] = cuerpo if cuerpo is not None else json.dumps(movimientos).encode("utf-8")
+        return f"http://127.0.0.1:{self.httpd.server_port}{ruta}"
+
+
+def replicar_torres(movimientos, copias):
+    """Multiplica el dataset creando ``copias`` juegos de torres con otros nombres."""
+    return [
+        {**mov, "subetapa": f"{mov['subetapa']} · {copia}"}
+        for copia in range(copias)
+        for mov in movimientos
+    ]
+
+
+class GuardarEnBaseTests(TestCase):
+    def setUp(self):
+        self.movimientos = cargar_movimientos()
+        self.resultados = calcular(self.movimientos)
+
+    def guardar(self, movimientos, resultados=None, nombre="Central Park"):
+        with CaptureQueriesContext(connection) as consultas:
+            guardar_en_base(movimientos, resultados or self.resultados, nombre, PARAMETROS, "http://datos.local/")
+        return len(consultas)
+
+    def test_persiste_movimientos_y_cronogramas(self):
+        self.guardar(self.movimientos)
+
+        self.assertEqual(MovimientoFinanciero.objects.count(), len(self.movimientos))
+        self.assertEqual(Subetapa.objects.count(), 2)
+        self.assertEqual(DesembolsoCredito.objects.count(), len(self.resultados["creditos"]))
+        self.assertEqual(AporteCapital.objects.count(), len(self.resultados["aportes"]))
+        torre = Subetapa.objects.get(nombre="Torre 1")
+        self.assertIsNotNone(torre.periodo_inicio_ventas)
+        self.assertIsNotNone(torre.periodo_fin_construccion)
+
+    def test_numero_de_consultas_no_depende_del_tamano(self):
+        pequeno = self.guardar(self.movimientos, nombre="Pequeño")
+        mediano = self.guardar(replicar_torres(self.movimientos, 3), nombre="Mediano")
+        grande = replicar_torres(self.movimientos, 50)
+        consultas_grande = self.guardar(grande, nombre="Grande")
+
+        self.assertEqual(pequeno, mediano)
+        # Incluye la lectura y escritura del resumen por periodo.
+        self.assertLessEqual(pequeno, 22)
+        # Solo crecen los lotes de INSERT: nunca una consulta por fila.
+        self.assertLess(consultas_grande, pequeno + len(grande) // 100)
+        self.assertEqual(MovimientoFinanciero.objects.filter(subetapa__proyecto__nombre="Grande").count(), len(grande))
+
+    def test_reguardar_sin_cambios_no_escribe(self):
+        self.guardar(self.movimientos)
+        self.guardar(self.movimientos)
+        with CaptureQueriesContext(connection) as consultas:
+            guardar_en_base(self.movimientos, self.resultados, "Central Park", PARAMETROS, "http://datos.local/")
+
+        escrituras = [q["sql"] for q in consultas if q["sql"].startswith(("INSERT", "UPDATE", "DELETE"))]
+        self.assertEqual(escrituras, [])
+
+    def test_misma_huella_con_otra_url_o_porcentaje_actualiza_el_proyecto(self):
+        def guardar(url, **parametros):
+            return guardar_en_base(
+                self.movimientos, self.resultados, "Central Park", {**PARAMETROS, **parametros}, url, huella="calculo"
+            )
+
+        self.assertTrue(guardar("http://datos.local/"))
+        self.assertFalse(guardar("http://datos.local/"))
+
+        self.assertTrue(guardar("http://espejo.local/"))
+        proyecto = Proyecto.objects.get(nombre="Central Park")
+        self.assertEqual(proyecto.descripcion, "Escenario actualizado desde http://espejo.local/")
+
+        # 0.08 y 8 se normalizan igual (misma huella), pero el crédito guarda lo ingresado.
+        self.assertTrue(guardar("http://espejo.local/", porcentaje_maximo_mensual=Decimal("0.08")))
+        credito = CreditoConstructor.objects.get(proyecto=proyecto)
+        self.assertEqual(credito.porcentaje_maximo_mensual, Decimal("0.08"))
+        self.assertFalse(guardar("http://espejo.local/", porcentaje_maximo_mensual=Decimal("0.08")))
+
+    def test_actualiza_valores_modificados_y_elimina_periodos_sobrantes(self):
+        self.guardar(self.movimientos)
+        modificados = [dict(mov) for mov in self.movimientos if mov["periodo"] <= 30]
+        modificados[0]["valor"] = 1234.5
+        resultados = calcular(modificados)
+        self.guardar(modificados, resultados)
+
+        primero = modificados[0]
+        movimiento = MovimientoFinanciero.objects.get(
+            subetapa__nombre=primero["subetapa"], periodo=primero["periodo"], concepto=primero["concepto"]
+        )
+        self.assertEqual(movimiento.valor, Decimal("1234.50"))
+        self.assertEqual(DesembolsoCredito.objects.count(), len(resultados["creditos"]))
+        self.assertFalse(AporteCapital.objects.filter(periodo__gt=30).exists())
+
+
+class EscrituraConcurrenteTests(TransactionTestCase):
+    def test_perfil_sqlite_de_la_conexion(self):
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA synchronous")
+            synchronous = cursor.fetchone()[0]
+            cursor.execute("PRAGMA temp_store")
+            temp_store = cursor.fetchone()[0]
+
+        self.assertEqual(connection.transaction_mode, "IMMEDIATE")
+        # 1 = NORMAL, 2 = MEMORY.
+        self.assertEqual((synchronous, temp_store), (1, 2))
+
+    def test_espera_por_el_lock_de_escritura_limitada_por_el_timeout(self):
+        lock = persistencia._locks_escritura.setdefault(connection.alias, threading.Lock())
+        lock.acquire()
+        self.addCleanup(lock.release)
+
+        inicio = time.monotonic()
+        with mock.patch.dict(connection.settings_dict["OPTIONS"], {"timeout": 0.1}):
+            with self.assertRaisesMessage(OperationalError, "database is locked"):
+                with persistencia.transaccion_escritura():
+                    pass
+
+        self.assertLess(time.monotonic() - inicio, 5)
+
+    def test_escritores_en_paralelo_no_chocan(self):
+        movimientos = cargar_movimientos()
+        resultados = calcular(movimientos)
+        errores = []
+
+        def guardar(numero):
+            try:
+                guardar_en_base(movimientos, resultados, f"Proyecto {numero}", PARAMETROS, "http://datos.local/")
+            except Exception as exc:
+                errores.append(exc)
+            finally:
+                connection.close()
+
+        hilos = [threading.Thread(target=guardar, args=(numero,)) for numero in range(4)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        self.assertEqual(errores, [])
+        self.assertEqual(AporteCapital.objects.count(), 4 * len(resultados["aportes"]))
+
+    def test_peticiones_identicas_comparten_descarga_calculo_y_escritura(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        escrituras = []
+
+        def guardar(*args, **kwargs):
+            escrituras.append(guardar_en_base(*args, **kwargs))
+        with ServidorDatos() as servidor, \
+                mock.patch("PruebaTecnica.cache._cache_datasets", CacheDatasets(Path(directorio.name))), \
+                mock.patch("PruebaTecnica.cache._cache_resultados", CacheResultados()), \
+                mock.patch("PruebaTecnica.procesos.calcular_cronograma", wraps=calcular_cronograma) as calculo, \
+                mock.patch("PruebaTecnica.servicios.guardar_en_base", side_effect=guardar) as guardado:
+            # La demora asegura que todas las peticiones lleguen mientras la primera descarga.
+            servidor.demora = 0.3
+            datos = {"proyecto": "Central Park", "dataset_url": servidor.publicar("/datos.json", cargar_movimientos())}
+            estados = []
+
+            def enviar():
+                try:
+                    estados.append(Client().post("/", {**datos, **PARAMETROS}).status_code)
+                finally:
+                    connection.close()
+
+            hilos = [threading.Thread(target=enviar) for _ in range(4)]
+            for hilo in hilos:
+                hilo.start()
+            for hilo in hilos:
+                hilo.join()
+
+            self.assertEqual(estados, [200] * 4)
+            self.assertEqual(len(servidor.peticiones), 1)
+        self.assertEqual(calculo.call_count, 1)
+        # Cada petición llama a guardar_en_base, pero solo la primera escribe.
+        self.assertEqual(guardado.call_count, 4)
+        self.assertEqual(sorted(escrituras), [False, False, False, True])
+        self.assertEqual(Proyecto.objects.count(), 1)
+
+
+class MovimientoQuerySetTests(TestCase):
+    def setUp(self):
+        self.movimientos = replicar_torres(cargar_movimientos(), 2)
+        guardar_en_base(self.movimientos, calcular(self.movimientos), "Central Park", PARAMETROS, "http://datos.local/")
+        guardar_en_base(self.movimientos[:10], calcular(self.movimientos[:10]), "Otro", PARAMETROS, "http://datos.local/")
+        self.proyecto = Proyecto.objects.get(nombre="Central Park")
+
+    def test_proyecto_denormalizado(self):
+        self.assertFalse(MovimientoFinanciero.objects.exclude(proyecto=F("subetapa__proyecto")).exists())
+
+    def test_totales_por_periodo_en_rango(self):
+        totales = MovimientoFinanciero.objects.del_proyecto(self.proyecto).entre_periodos(10, 20).totales_por_periodo()
+
+        esperado = {}
+        for mov in self.movimientos:
+            if 10 <= mov["periodo"] <= 20:
+                periodo = esperado.setdefault(mov["periodo"], {"ingresos": Decimal("0"), "costos": Decimal("0")})
+                periodo[mov["concepto"]] += Decimal(str(mov["valor"]))
+        self.assertEqual(totales, esperado)
+
+    def test_agregacion_sin_joins_y_con_indice(self):
+        queryset = MovimientoFinanciero.objects.del_proyecto(self.proyecto).entre_periodos(10, 20).totales_por_concepto()
+        sql, parametros = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", parametros)
+            plan = " ".join(str(fila[-1]) for fila in cursor.fetchall())
+
+        self.assertNotIn("JOIN", sql.upper())
+        self.assertIn("COVERING INDEX movimiento_proyecto_periodo", plan)
+
+
+class ResumenPeriodoTests(TestCase):
+    def setUp(self):
+        self.movimientos = cargar_movimientos()
+
+    def guardar(self, movimientos, nombre="Central Park"):
+        guardar_en_base(movimientos, calcular(movimientos), nombre, PARAMETROS, "http://datos.local/")
+        return Proyecto.objects.get(nombre=nombre)
+
+    def assertResumenConsistente(self, proyecto):
+        self.assertEqual(verificar_resumen(proyecto), [])
+        self.assertEqual(
+            ResumenPeriodo.objects.filter(proyecto=proyecto).totales_por_periodo(),
+            MovimientoFinanciero.objects.del_proyecto(proyecto).totales_por_periodo(),
+        )
+
+    def test_se_mantiene_al_guardar_y_modificar(self):
+        proyecto = self.guardar(self.movimientos)
+        self.assertResumenConsistente(proyecto)
+
+        modificados = [dict(mov) for mov in self.movimientos]
+        modificados[3]["valor"] += 250.75
+        modificados.append({"subetapa": "Torre 9", "periodo": 99, "concepto": "ingresos", "valor": 10})
+        self.guardar(modificados)
+
+        self.assertResumenConsistente(proyecto)
+        self.assertEqual(ResumenPeriodo.objects.get(proyecto=proyecto, periodo=99).fco, Decimal("10.00"))
+
+    def test_solo_escribe_los_periodos_afectados(self):
+        self.guardar(self.movimientos)
+        modificados = [dict(mov) for mov in self.movimientos]
+        modificados[0]["valor"] += 1
+        with CaptureQueriesContext(connection) as consultas:
+            self.guardar(modificados)
+
+        escrituras = [q["sql"] for q in consultas if "resumenperiodo" in q["sql"] and q["sql"].startswith("INSERT")]
+        self.assertEqual(len(escrituras), 1)
+        self.assertEqual(escrituras[0].count("VALUES ("), 1)
+
+    def test_ingesta_en_streaming_reconstruye_el_resumen(self):
+        self.guardar(self.movimientos)
+        revisados = [{**mov, "valor": mov["valor"] * 2} for mov in self.movimientos]
+        with ServidorDatos() as servidor:
+            importar_en_streaming(servidor.publicar("/datos.json", revisados), "Central Park", PARAMETROS)
+
+        self.assertResumenConsistente(Proyecto.objects.get(nombre="Central Park"))
+
+    def test_verificar_y_reparar(self):
+        proyecto = self.guardar(self.movimientos)
+        ResumenPeriodo.objects.filter(proyecto=proyecto, periodo=5).update(ingresos=Decimal("1"))
+        ResumenPeriodo.objects.filter(proyecto=proyecto, periodo=6).delete()
+
+        self.assertEqual([fila[0] for fila in verificar_resumen(proyecto)], [5, 6])
+        with self.assertRaises(CommandError):
+            call_command("verificar_resumen", stdout=StringIO())
+        call_command("verificar_resumen", "--reparar", stdout=StringIO())
+        self.assertResumenConsistente(proyecto)
+
+
+class RecalculoDesdeBaseTests(TestCase):
+    def setUp(self):
+        self.movimientos = cargar_movimientos()
+        guardar_en_base(self.movimientos, calcular(self.movimientos), "Central Park", PARAMETROS, "http://datos.local/")
+        self.proyecto = Proyecto.objects.get(nombre="Central Park")
+
+    def test_coincide_con_el_calculo_desde_el_json(self):
+        for escenario in ESCENARIOS:
+            with self.subTest(**escenario):
+                parametros = {**PARAMETROS, **escenario}
+                resultados = recalcular_desde_base(self.proyecto, parametros, guardar=False)
+
+                self.assertEqual(filas_cuantizadas(resultados), filas_cuantizadas(calcular(self.movimientos, **escenario)))
+
+    def test_vista_recalcula_y_guarda_con_nuevos_parametros(self):
+        datos = {"proyecto": "Central Park", **PARAMETROS, "tasa_interes_anual": "24", "guardar": "on"}
+        with mock.patch.object(ClienteDatasets, "obtener") as descarga:
+            respuesta = self.client.post("/recalcular/", datos)
+
+        descarga.assert_not_called()
+        esperado = calcular(self.movimientos, tasa_interes_anual=Decimal("24"))
+        self.assertEqual(len(respuesta.context["rows"]), len(esperado["creditos"]))
+        self.assertEqual(self.proyecto.credito_constructor.tasa_interes_anual, Decimal("24.00"))
+        almacenados = {d.periodo: d.interes_pagado for d in DesembolsoCredito.objects.all()}
+        self.assertEqual(almacenados, {int(c["periodo"]): cuantizar(c["interes_pagado"]) for c in esperado["creditos"]})
+
+    def test_sin_guardar_no_modifica_la_base(self):
+        with CaptureQueriesContext(connection) as consultas:
+            self.client.post("/recalcular/", {"proyecto": "Central Park", **PARAMETROS, "tasa_interes_anual": "24"})
+
+        self.assertFalse([q for q in consultas if q["sql"].startswith(("INSERT", "UPDATE", "DELETE"))])
+
+    def test_comando_usa_los_parametros_guardados_por_defecto(self):
+        salida = StringIO()
+        call_command("recalcular_proyecto", "Central Park", "--cupo", "9000", stdout=salida)
+
+        credito = CreditoConstructor.objects.get(proyecto=self.proyecto)
+        self.assertEqual((credito.cupo_total, credito.tasa_interes_anual), (Decimal("9000.00"), Decimal("12.00")))
+        self.assertIn("Cronograma almacenado", salida.getvalue())
+
+
+class RecalculoCarteraTests(TestCase):
+    def setUp(self):
+        self.movimientos = cargar_movimientos()
+        for nombre in ("Central Park", "Torres del Río"):
+            guardar_en_base(self.movimientos, calcular(self.movimientos), nombre, PARAMETROS, "http://datos.local/")
+        Proyecto.objects.create(nombre="Sin movimientos")
+        CreditoConstructor.objects.create(
+            proyecto=Proyecto.objects.get(nombre="Sin movimientos"),
+            cupo_total=1, porcentaje_maximo_mensual=8, periodo_inicial=1, periodo_final=2, tasa_interes_anual=12,
+        )
+
+    def assertCronogramaAlmacenado(self, nombre, **escenario):
+        esperado = calcular(self.movimientos, **escenario)
+        almacenados = {
+            d.periodo: d.interes_pagado for d in DesembolsoCredito.objects.filter(credito__proyecto__nombre=nombre)
+        }
+        self.assertEqual(almacenados, {int(c["periodo"]): cuantizar(c["interes_pagado"]) for c in esperado["creditos"]})
+
+    def test_serial_y_en_paralelo_guardan_lo_mismo_que_el_calculo_desde_el_json(self):
+        for workers in (1, 2):
+            with self.subTest(workers=workers):
+                tasa = Decimal(14 + workers)
+                reporte = recalcular_cartera(cambios={"tasa_interes_anual": tasa}, max_workers=workers)
+
+                self.assertEqual(sorted(r.proyecto for r in reporte if not r.error), ["Central Park", "Torres del Río"])
+                self.assertEqual([r.error for r in reporte if r.proyecto == "Sin movimientos"], ["sin movimientos almacenados"])
+                for nombre in ("Central Park", "Torres del Río"):
+                    self.assertCronogramaAlmacenado(nombre, tasa_interes_anual=tasa)
+                    self.assertEqual(CreditoConstructor.objects.get(proyecto__nombre=nombre).tasa_interes_anual, tasa)
+
+    def test_comando_filtra_proyectos_y_reporta_throughput(self):
+        salida = StringIO()
+        call_command("recalcular_cartera", "Central Park", "--workers", "1", "--sin-guardar", stdout=salida)
+
+        self.assertIn("Central Park:", salida.getvalue())
+        self.assertNotIn("Torres del Río", salida.getvalue())
+        self.assertIn("1 proyectos recalculados", salida.getvalue())
+
+    def test_rechaza_parametros_desconocidos(self):
+        with self.assertRaises(ValueError):
+            recalcular_cartera(cambios={"plazo": 12})
+
+    def test_las_tareas_de_los_procesos_no_importan_django(self):
+        # Un proceso iniciado con spawn solo importa el módulo de la tarea; si
+        # ese módulo cargara los modelos fallaría con AppRegistryNotReady.
+        salida = subprocess.run(
+            [sys.executable, "-c", "import sys, PruebaTecnica.procesos; print('django' in sys.modules)"],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        )
+        self.assertEqual(salida.stdout.strip(), "False")
+
+
+class ExportacionTests(TestCase):
+    def setUp(self):
+        self.movimientos = cargar_movimientos()
+        guardar_en_base(self.movimientos, calcular(self.movimientos), "Central Park", PARAMETROS, "http://datos.local/")
+
+    def descargar_csv(self, tipo):
+        respuesta = self.client.get(f"/proyectos/Central Park/exportar/{tipo}.csv")
+        self.assertEqual(respuesta["Content-Type"], "text/csv; charset=utf-8")
+        self.assertIn("attachment", respuesta["Content-Disposition"])
+        return list(csv.reader(b"".join(respuesta.streaming_content).decode().splitlines()))
+
+    def test_csv_de_desembolsos_y_aportes(self):
+        esperado = calcular(self.movimientos)
+
+        desembolsos = self.descargar_csv("desembolsos")
+        self.assertEqual(desembolsos[0][:2], ["periodo", "desembolso"])
+        self.assertEqual(
+            {int(fila[0]): Decimal(fila[1]) for fila in desembolsos[1:]},
+            {int(c["periodo"]): cuantizar(c["desembolso"]) for c in esperado["creditos"]},
+        )
+        aportes = self.descargar_csv("aportes")
+        self.assertEqual(
+            [Decimal(fila[3]) for fila in aportes[1:]],
+            [cuantizar(a["flujo_acumulado"]) for a in esperado["aportes"]],
+        )
+
+    def test_csv_de_movimientos_incluye_la_subetapa(self):
+        filas = self.descargar_csv("movimientos")
+
+        self.assertEqual(filas[0], ["periodo", "concepto", "subetapa", "valor"])
+        self.assertEqual(len(filas) - 1, len(self.movimientos))
+        self.assertEqual(
+            sorted((int(p), c, s) for p, c, s, _ in filas[1:]),
+            sorted((m["periodo"], m["concepto"], m["subetapa"]) for m in self.movimientos),
+        )
+
+    def test_exportacion_desconocida(self):
+        self.assertEqual(self.client.get("/proyectos/Central Park/exportar/otros.csv").status_code, 404)
+        self.assertEqual(self.client.get("/proyectos/Otro/exportar/aportes.csv").status_code, 404)
+
+    @skipIf(openpyxl is None, "openpyxl no está instalado")
+    def test_xlsx_con_una_hoja_por_exportacion(self):
+        respuesta = self.client.get("/proyectos/Central Park/exportar.xlsx")
+        libro = openpyxl.load_workbook(BytesIO(b"".join(respuesta.streaming_content)), read_only=True)
+
+        self.assertEqual(libro.sheetnames, ["Desembolsos", "Aportes", "Movimientos"])
+        self.assertEqual(len(list(libro["Aportes"].values)), 38)
+        self.assertEqual(len(list(libro["Movimientos"].values)), len(self.movimientos) + 1)
+
+    def test_xlsx_sin_openpyxl(self):
+        with mock.patch("PruebaTecnica.exportacion.openpyxl", None):
+            respuesta = self.client.get("/proyectos/Central Park/exportar.xlsx")
+
+        self.assertEqual(respuesta.status_code, 501)
+
+
+class ResultadoCronogramaTests(SimpleTestCase):
+    def test_adaptador_conserva_la_forma_por_periodo(self):
+        resultados = calcular(cargar_movimientos())
+        diccionario = resultados.como_diccionario()
+
+        self.assertEqual(set(diccionario), {"creditos", "aportes", "estados"})
+        self.assertEqual(len(diccionario["creditos"]), 37)
+        self.assertEqual(diccionario["creditos"][0]["periodo"], Decimal(1))
+        self.assertEqual(diccionario["creditos"], resultados["creditos"])
+        self.assertEqual(dict(resultados["aportes"][-1]), diccionario["aportes"][-1])
+
+    def test_filas_tabla_redondea_al_leer(self):
+        resultados = calcular(generar_movimientos())
+        fila = resultados.filas_tabla()[10]
+
+        self.assertEqual(fila["periodo"], 11)
+        self.assertEqual(fila["saldo"], cuantizar(resultados["creditos"][10]["saldo"]))
+        self.assertEqual(preparar_filas(resultados)[10], fila)
+
+    def test_sobrevive_a_pickle(self):
+        resultados = calcular(generar_movimientos())
+
+        self.assertEqual(pickle.loads(pickle.dumps(resultados)), resultados)
+
+
+@skipIf(np is None, "numpy no está instalado")
+class MotorNumpyTests(SimpleTestCase):
+    def assertParidad(self, movimientos, **parametros):
+        referencia = filas_cuantizadas(calcular(movimientos, **parametros))
+        vectorizado = filas_cuantizadas(calcular(movimientos, motor=MOTOR_NUMPY, **parametros))
+        self.assertEqual(len(referencia), len(vectorizado))
+        for esperado, obtenido in zip(referencia, vectorizado):
+            self.assertEqual(esperado, obtenido, f"Diferencia en el periodo {esperado['periodo']}")
+
+    def test_paridad_con_datos_de_prueba(self):
+        movimientos = cargar_movimientos()
+        for escenario in ESCENARIOS:
+            with self.subTest(**escenario):
+                self.assertParidad(movimientos, **escenario)
+
+    def test_paridad_con_datos_sinteticos(self):
+        movimientos = generar_movimientos()
+        for escenario in ESCENARIOS:
+            with self.subTest(**escenario):
+                self.assertParidad(movimientos, **escenario)
+
+    def test_paridad_con_datasets_aleatorios(self):
+        for numero, (movimientos, parametros) in enumerate(datasets_aleatorios()):
+            with self.subTest(dataset=numero, **parametros):
+                self.assertParidad(movimientos, **parametros)
+
+    def test_cuotas_en_medio_centavo(self):
+        # Un saldo de 5895.47 en dos cuotas deja 2947.735, que en float64 es
+        # 2947.7349999… y se redondeaba a 2947.73 en lugar de 2947.74.
+        movimientos = [
+            {"subetapa": "T", "periodo": 1, "concepto": "ingresos", "valor": 1},
+            {"subetapa": "T", "periodo": 1, "concepto": "costos", "valor": 5896.47},
+            {"subetapa": "T", "periodo": 2, "concepto": "ingresos", "valor": 3000},
+            {"subetapa": "T", "periodo": 3, "concepto": "ingresos", "valor": 3000},
+        ]
+        parametros = {"cupo_credito": Decimal("10000"), "porcentaje_maximo_mensual": Decimal("100"),
+                      "periodo_inicial_credito": 1, "periodo_final_credito": 3, "tasa_interes_anual": Decimal("0")}
+        self.assertParidad(movimientos, **parametros)
+        filas = filas_cuantizadas(calcular(movimientos, motor=MOTOR_NUMPY, **parametros))
+        self.assertEqual([fila["pago_credito"] for fila in filas], [Decimal("0.00"), Decimal("2947.74"), Decimal("2947.74")])
+        self.assertEqual(filas[1]["saldo"], Decimal("2947.74"))
+
+    def test_sin_movimientos(self):
+        self.assertEqual(calcular([], motor=MOTOR_NUMPY), {"creditos": [], "aportes": []})
+
+    def test_concepto_desconocido(self):
+        with self.assertRaisesMessage(ValueError, "Concepto desconocido: otros"):
+            calcular([{"subetapa": "T", "periodo": 1, "concepto": "otros", "valor": 1}], motor=MOTOR_NUMPY)
+
+    def test_motor_desconocido(self):
+        with self.assertRaises(ValueError):
+            calcular(cargar_movimientos(), motor="fortran")
+
+
+class MotorCentavosTests(SimpleTestCase):
+    def assertParidad(self, movimientos, **parametros):
+        referencia = filas_cuantizadas(calcular(movimientos, **parametros))
+        enteros = filas_cuantizadas(calcular(movimientos, motor=MOTOR_CENTAVOS, **parametros))
+        self.assertEqual(len(referencia), len(enteros))
+        for esperado, obtenido in zip(referencia, enteros):
+            self.assertEqual(esperado, obtenido, f"Diferencia en el periodo {esperado['periodo']}")
+
+    def test_paridad_con_datos_de_prueba(self):
+        movimientos = cargar_movimientos()
+        for escenario in ESCENARIOS:
+            with self.subTest(**escenario):
+                self.assertParidad(movimientos, **escenario)
+
+    def test_paridad_con_datos_sinteticos(self):
+        movimientos = generar_movimientos()
+        for escenario in ESCENARIOS:
+            with self.subTest(**escenario):
+                self.assertParidad(movimientos, **escenario)
+
+    def test_paridad_con_datasets_aleatorios(self):
+        # Tasas como 13 % o 7.25 % dan intereses periódicos que, sin redondear
+        # a la millonésima en ambos motores, difieren en el centavo del acumulado.
+        for numero, (movimientos, parametros) in enumerate(datasets_aleatorios()):
+            with self.subTest(dataset=numero, **parametros):
+                self.assertParidad(movimientos, **parametros)
+
+    def test_el_credito_termina_en_cero(self):
+        creditos = calcular(cargar_movimientos(), motor=MOTOR_CENTAVOS)["creditos"]
+
+        self.assertEqual(creditos[-1]["saldo"], 0)
+        self.assertEqual(
+            sum(fila["desembolso"] for fila in creditos), sum(fila["pago_credito"] for fila in creditos)
+        )
+
+    def test_sin_movimientos(self):
+        self.assertEqual(calcular([], motor=MOTOR_CENTAVOS), {"creditos": [], "aportes": []})
+
+    def test_montos_en_float_decimal_y_texto_se_suman_igual(self):
+        flotantes = generar_movimientos(subetapas=2, periodos=24)
+        mezclados = [
+            {**mov, "valor": (Decimal(str(mov["valor"])), str(mov["valor"]), mov["valor"])[numero % 3]}
+            for numero, mov in enumerate(flotantes)
+        ]
+        grandes = [{**mov, "valor": mov["valor"] + 5e9} for mov in flotantes]
+
+        self.assertEqual(_agregar_unidades(mezclados), _agregar_unidades(flotantes))
+        for movimientos in (flotantes, grandes):
+            with self.subTest(movimientos=len(movimientos)):
+                esperado = {
+                    periodo: {concepto: _a_unidades(total) for concepto, total in conceptos.items()}
+                    for periodo, conceptos in _agregar_decimal(movimientos).items()
+                }
+                self.assertEqual(_agregar_unidades(movimientos), esperado)
+
+    def test_no_depende_ni_altera_la_precision_del_hilo(self):
+        esperado = filas_cuantizadas(calcular(cargar_movimientos()))
+        contexto = getcontext()
+        precision = contexto.prec
+        for motor in ("decimal", MOTOR_CENTAVOS):
+            with self.subTest(motor=motor):
+                contexto.prec = 5
+                try:
+                    resultados = calcular(cargar_movimientos(), motor=motor).como_diccionario()
+                    self.assertEqual(getcontext().prec, 5)
+                finally:
+                    contexto.prec = precision
+                self.assertEqual(filas_cuantizadas(resultados), esperado)
+
+
+class CalcularEscenariosTests(SimpleTestCase):
+    grid = {
+        "cupo_credito": [3000, 7000],
+        "porcentaje_maximo_mensual": [8, 20],
+        "periodo_inicial_credito": [7, 9, 40],
+        "periodo_final_credito": [23, 30],
+        "tasa_interes_anual": [0, 12],
+    }
+
+    def test_coincide_con_calcular_cronograma(self):
+        movimientos = cargar_movimientos()
+        escenarios = calcular_escenarios(movimientos, self.grid)
+
+        self.assertEqual(len(escenarios), 2 * 2 * 2 * 2 * 2)
+        for escenario in escenarios:
+            resultados = calcular(
+                movimientos,
+                cupo_credito=Decimal(escenario["cupo_credito"]),
+                porcentaje_maximo_mensual=Decimal(escenario["porcentaje_maximo_mensual"]),
+                periodo_inicial_credito=escenario["periodo_inicial_credito"],
+                periodo_final_credito=escenario["periodo_final_credito"],
+                tasa_interes_anual=Decimal(escenario["tasa_interes_anual"]),
+            )
+            creditos, aportes = resultados["creditos"], resultados["aportes"]
+            esperado = {
+                "total_desembolso": cuantizar(sum(c["desembolso"] for c in creditos)),
+                "total_aporte": cuantizar(sum(a["aporte_capital"] for a in aportes)),
+                "saldo_maximo": cuantizar(max(c["saldo"] for c in creditos)),
+                "total_interes": cuantizar(sum(c["interes_generado"] for c in creditos)),
+            }
+            obtenido = {clave: cuantizar(Decimal(repr(escenario[clave]))) for clave in esperado}
+            self.assertEqual(esperado, obtenido, escenario)
+
+    def test_pool_de_procesos_da_el_mismo_resultado(self):
+        movimientos = generar_movimientos()
+        secuencial = calcular_escenarios(movimientos, self.grid)
+        paralelo = calcular_escenarios(movimientos, self.grid, max_workers=2, tamano_lote=5)
+        self.assertEqual(secuencial, paralelo)
+
+    def test_grilla_incompleta(self):
+        with self.assertRaisesMessage(ValueError, "tasa_interes_anual"):
+            calcular_escenarios([], {clave: valor for clave, valor in self.grid.items() if clave != "tasa_interes_anual"})
+
+
+class AtribucionSubetapasTests(SimpleTestCase):
+    def atribuir(self, movimientos, **kwargs):
+        parametros = {**PARAMETROS, **kwargs}
+        return calcular_cronograma(
+            movimientos,
+            **{nombre: parametros[nombre] for nombre in PARAMETROS_CREDITO},
+            por_subetapa=True,
+        )
+
+    def test_suma_de_subetapas_coincide_con_el_consolidado(self):
+        movimientos = generar_movimientos()
+        for escenario in ESCENARIOS:
+            with self.subTest(**escenario):
+                resultados = self.atribuir(movimientos, **escenario)
+                atribucion = resultados["subetapas"]
+                consolidado = {
+                    "fco": [c["fco"] for c in resultados["creditos"]],
+                    "desembolso": [c["desembolso"] for c in resultados["creditos"]],
+                    "aporte_capital": [a["aporte_capital"] for a in resultados["aportes"]],
+                }
+
+                self.assertEqual(atribucion.subetapas, ("Torre 1", "Torre 2", "Torre 3", "Torre 4"))
+                self.assertTrue(any(consolidado["aporte_capital"]))
+                for campo, esperado in consolidado.items():
+                    series = [atribucion.serie(subetapa, campo) for subetapa in atribucion.subetapas]
+                    for j, total in enumerate(esperado):
+                        self.assertAlmostEqual(sum(serie[j] for serie in series), float(total), places=6)
+
+    def test_subetapa_sin_deficit_no_recibe_desembolso(self):
+        movimientos = cargar_movimientos() + [
+            {"subetapa": "Locales", "periodo": periodo, "concepto": "ingresos", "valor": 10}
+            for periodo in range(1, 38)
+        ]
+        totales = self.atribuir(movimientos)["subetapas"].totales()
+
+        self.assertEqual(totales["Locales"], {"fco": 370.0, "desembolso": 0.0, "aporte_capital": 0.0})
+        self.assertGreater(totales["Torre 2"]["desembolso"], 0)
+
+    def test_no_altera_el_cronograma_consolidado(self):
+        movimientos = generar_movimientos()
+        resultados = self.atribuir(movimientos)
+
+        self.assertEqual(filas_cuantizadas(resultados), filas_cuantizadas(calcular(movimientos)))
+
+    def test_requiere_motor_decimal(self):
+        parametros = {nombre: PARAMETROS[nombre] for nombre in PARAMETROS_CREDITO}
+        with self.assertRaises(ValueError):
+            calcular_cronograma(cargar_movimientos(), **parametros, motor=MOTOR_NUMPY, por_subetapa=True)
+
+
+class CacheDatasetsTests(SimpleTestCase):
+    def setUp(self):
+        self.servidor = ServidorDatos().__enter__()
+        self.addCleanup(self.servidor.__exit__)
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.directorio = Path(directorio.name)
+        self.movimientos = cargar_movimientos()
+
+    def test_reenvio_no_usa_la_red_ni_reparsea(self):
+        cache = CacheDatasets(self.directorio)
+        url = self.servidor.publicar("/datos.json", self.movimientos)
+
+        primero = cache.obtener(url)
+        segundo = cache.obtener(url)
+
+        self.assertEqual(primero.origen, ORIGEN_RED)
+        self.assertEqual(segundo.origen, ORIGEN_MEMORIA)
+        self.assertIs(primero.movimientos, segundo.movimientos)
+        self.assertEqual(primero.hash, segundo.hash)
+        self.assertEqual(len(self.servidor.peticiones), 1)
+        self.assertEqual(cache.estadisticas()["aciertos"], 1)
+        self.assertEqual(cache.estadisticas()["fallos"], 1)
+
+    def test_revalida_con_etag_al_vencer_la_frescura(self):
+        cache = CacheDatasets(self.directorio, frescura=0)
+        url = self.servidor.publicar("/datos.json", self.movimientos)
+        cache.obtener(url)
+
+        dataset = cache.obtener(url)
+
+        self.assertEqual(dataset.origen, ORIGEN_REVALIDADO)
+        self.assertIn("If-None-Match", self.servidor.peticiones[-1][1])
+        self.assertEqual(cache.estadisticas()["revalidaciones"], 1)
+
+        self.servidor.publicar("/datos.json", self.movimientos[:10])
+        cambiado = cache.obtener(url)
+        self.assertEqual(cambiado.origen, ORIGEN_RED)
+        self.assertNotEqual(cambiado.hash, dataset.hash)
+        self.assertEqual(len(cambiado.movimientos), 10)
+
+    def test_dataset_invalido_no_se_guarda_en_cache(self):
+        cache = CacheDatasets(self.directorio)
+        url = self.servidor.publicar("/datos.json", self.movimientos[:3] + [{"subetapa": "Torre 1"}])
+
+        with self.assertRaises(DatasetInvalido):
+            cache.obtener(url)
+
+        self.assertEqual(list(self.directorio.glob("*.json")), [])
+
+    def test_sobrevive_al_reinicio_desde_disco(self):
+        url = self.servidor.publicar("/datos.json", self.movimientos)
+        CacheDatasets(self.directorio).obtener(url)
+
+        dataset = CacheDatasets(self.directorio).obtener(url)
+
+        self.assertEqual(dataset.origen, ORIGEN_DISCO)
+        self.assertEqual(dataset.movimientos, self.movimientos)
+        self.assertEqual(len(self.servidor.peticiones), 1)
+
+    def test_desaloja_la_url_menos_usada_al_superar_el_tamano(self):
+        url_a = self.servidor.publicar("/a.json", self.movimientos)
+        url_b = self.servidor.publicar("/b.json", self.movimientos[:32])
+        cache = CacheDatasets(self.directorio, max_bytes=len(self.servidor.cuerpos["/a.json"]))
+
+        hash_a = cache.obtener(url_a).hash
+        cache.obtener(url_b)
+
+        self.assertFalse((self.directorio / f"{hash_a}.json").exists())
+        self.assertEqual(cache.estadisticas()["entradas"], 1)
+        self.assertLessEqual(cache.estadisticas()["bytes"], cache.max_bytes)
+
+
+class ClienteDatasetsTests(SimpleTestCase):
+    def setUp(self):
+        self.servidor = ServidorDatos().__enter__()
+        self.addCleanup(self.servidor.__exit__)
+        self.cliente = ClienteDatasets(espera_reintento=0)
+        self.addCleanup(self.cliente.cerrar)
+        self.movimientos = cargar_movimientos()
+
+    def test_reutiliza_la_conexion_entre_descargas(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        cache = CacheDatasets(Path(directorio.name), frescura=0, cliente=self.cliente)
+        url = self.servidor.publicar("/datos.json", self.movimientos)
+
+        origenes = [cache.obtener(url).origen for _ in range(5)]
+
+        self.assertEqual(origenes, [ORIGEN_RED] + [ORIGEN_REVALIDADO] * 4)
+        self.assertEqual(len(self.servidor.peticiones), 5)
+        self.assertEqual(len(self.servidor.conexiones), 1)
+
+    def test_reintenta_errores_transitorios(self):
+        url = self.servidor.publicar("/datos.json", self.movimientos)
+        self.servidor.fallas["/datos.json"] = [503, 502]
+
+        respuesta = self.cliente.obtener(url)
+
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(json.loads(respuesta.content), self.movimientos)
+        self.assertEqual(len(self.servidor.peticiones), 3)
+
+        self.servidor.fallas["/datos.json"] = [503] * 4
+        self.assertEqual(self.cliente.obtener(url).status_code, 503)
+        self.servidor.fallas["/datos.json"] = [404]
+        self.assertEqual(self.cliente.obtener(url).status_code, 404)
+        self.assertEqual(len(self.servidor.peticiones), 3 + 4 + 1)
+
+    def test_descomprime_gzip(self):
+        url = self.servidor.publicar("/datos.json", self.movimientos)
+        self.servidor.comprimidas.add("/datos.json")
+
+        respuesta = self.cliente.obtener(url)
+
+        self.assertEqual(respuesta.headers["Content-Encoding"], "gzip")
+        self.assertEqual(respuesta.content, self.servidor.cuerpos["/datos.json"])
+
+    def test_corta_cuerpos_demasiado_grandes(self):
+        url = self.servidor.publicar("/datos.json", self.movimientos)
+        self.cliente.max_bytes = len(self.servidor.cuerpos["/datos.json"]) - 1
+
+        with self.assertRaises(RespuestaDemasiadoGrande):
+            self.cliente.obtener(url)
+
+        # Comprimido el cuerpo es más chico que el máximo; se corta al descomprimirlo.
+        self.servidor.comprimidas.add("/datos.json")
+        self.assertLess(len(gzip.compress(self.servidor.cuerpos["/datos.json"])), self.cliente.max_bytes)
+        with self.assertRaises(RespuestaDemasiadoGrande):
+            self.cliente.obtener(url)
+
+
+class CronogramaViewTests(TestCase):
+    def setUp(self):
+        self.servidor = ServidorDatos().__enter__()
+        self.addCleanup(self.servidor.__exit__)
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        for nombre, cache in (
+                ("_cache_datasets", CacheDatasets(Path(directorio.name))),
+                ("_cache_resultados", CacheResultados()),
+        ):
+            parche = mock.patch(f"PruebaTecnica.cache.{nombre}", cache)
+            parche.start()
+            self.addCleanup(parche.stop)
+        self.url = self.servidor.publicar("/datos.json", cargar_movimientos())
+
+    def enviar(self, **kwargs):
+        datos = {"proyecto": "Central Park", "dataset_url": self.url, **PARAMETROS, **kwargs}
+        return self.client.post("/", datos)
+
+    def test_calcula_y_guarda(self):
+        respuesta = self.enviar()
+
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(len(respuesta.context["rows"]), 37)
+        self.assertEqual(AporteCapital.objects.filter(proyecto__nombre="Central Park").count(), 37)
+
+    def test_reenvio_con_otra_tasa_no_descarga_de_nuevo(self):
+        self.enviar()
+        self.enviar(tasa_interes_anual="15")
+
+        self.assertEqual(len(self.servidor.peticiones), 1)
+
+    def test_reenvio_identico_no_recalcula_ni_reescribe(self):
+        self.enviar()
+        with mock.patch("PruebaTecnica.procesos.calcular_cronograma") as calcular_mock:
+            with CaptureQueriesContext(connection) as consultas:
+                respuesta = self.enviar()
+
+        calcular_mock.assert_not_called()
+        self.assertEqual(len(respuesta.context["rows"]), 37)
+        self.assertFalse([q for q in consultas if q["sql"].startswith(("INSERT", "UPDATE", "DELETE"))])
+
+    def test_reenvio_con_porcentaje_equivalente_no_recalcula_pero_guarda_el_credito(self):
+        self.enviar()
+        with mock.patch("PruebaTecnica.procesos.calcular_cronograma") as calcular_mock:
+            with CaptureQueriesContext(connection) as consultas:
+                self.enviar(porcentaje_maximo_mensual="0.08")
+
+        calcular_mock.assert_not_called()
+        escrituras = [q["sql"] for q in consultas if q["sql"].startswith(("INSERT", "UPDATE", "DELETE"))]
+        self.assertFalse([sql for sql in escrituras if "aportecapital" in sql or "desembolsocredito" in sql])
+        credito = CreditoConstructor.objects.get(proyecto__nombre="Central Park")
+        self.assertEqual(credito.porcentaje_maximo_mensual, Decimal("0.08"))
+
+    def test_reenvio_identico_reescribe_si_otro_proceso_cambio_el_cronograma(self):
+        self.enviar()
+        proyecto = Proyecto.objects.get(nombre="Central Park")
+        # Otro worker recalcula con otra tasa sin pasar por la cache de este proceso.
+        recalculo = calcular(cargar_movimientos(), tasa_interes_anual=24)
+        guardar_recalculo(proyecto, {**PARAMETROS, "tasa_interes_anual": 24}, recalculo)
+
+        self.enviar()
+
+        esperado = calcular(cargar_movimientos())
+        almacenados = {d.periodo: d.interes_pagado for d in DesembolsoCredito.objects.all()}
+        self.assertEqual(almacenados, {int(c["periodo"]): cuantizar(c["interes_pagado"]) for c in esperado["creditos"]})
+        self.assertEqual(CreditoConstructor.objects.get(proyecto=proyecto).tasa_interes_anual, Decimal("12.00"))
+
+    def test_dataset_revisado_retoma_desde_el_periodo_cambiado(self):
+        self.enviar()
+        revisados = [
+            {**mov, "valor": mov["valor"] * 2} if mov["periodo"] >= 35 else mov
+            for mov in cargar_movimientos()
+        ]
+        url_revisada = self.servidor.publicar("/datos_v2.json", revisados)
+
+        with mock.patch("PruebaTecnica.procesos.calcular_cronograma") as calcular_mock:
+            self.enviar(dataset_url=url_revisada)
+
+        calcular_mock.assert_not_called()
+        esperado = calcular(revisados)
+        almacenados = {a.periodo: a.monto for a in AporteCapital.objects.all()}
+        self.assertEqual(
+            almacenados,
+            {int(a["periodo"]): cuantizar(a["aporte_capital"]) for a in esperado["aportes"]},
+        )
+
+    def test_api_pagina_las_filas_guardadas_por_cursor(self):
+        self.enviar()
+        esperado = json.loads(json.dumps(preparar_filas(calcular(cargar_movimientos())), cls=DjangoJSONEncoder))
+
+        filas, url, paginas = [], "/proyectos/Central Park/cronograma/?limite=10", 0
+        while url:
+            with self.assertNumQueries(4):
+                pagina = self.client.get(url).json()
+            filas += pagina["filas"]
+            url = pagina["siguiente"]
+            paginas += 1
+
+        self.assertEqual(paginas, 4)
+        self.assertEqual(filas, esperado)
+        respuesta = self.client.get("/proyectos/Central Park/cronograma/", {"formato": "ndjson", "cursor": 30})
+        transmitidas = [json.loads(linea) for linea in b"".join(respuesta.streaming_content).splitlines()]
+        self.assertEqual(transmitidas, [fila for fila in esperado if fila["periodo"] > 30])
+        self.assertEqual(self.client.get("/proyectos/Central Park/cronograma/", {"limite": 0}).status_code, 400)
+        self.assertEqual(self.client.get("/proyectos/Otro/cronograma/").status_code, 404)
+
+    def test_filas_guardadas_sin_resumen_del_periodo(self):
+        self.enviar()
+        ResumenPeriodo.objects.filter(periodo=2).delete()
+
+        fila = self.client.get("/proyectos/Central Park/cronograma/", {"limite": 2}).json()["filas"][1]
+
+        self.assertEqual((fila["periodo"], fila["ingresos"], fila["costos"], fila["fco"]), (2, 0, 0, 0))
+
+    def test_pinta_la_primera_pagina_y_enlaza_el_resto(self):
+        with mock.patch("PruebaTecnica.views.FILAS_POR_PAGINA", 20):
+            respuesta = self.enviar()
+
+        self.assertEqual(len(respuesta.context["pagina"]), 20)
+        self.assertEqual(respuesta.content.count(b"<tr>"), 21)
+        siguiente = self.client.get(respuesta.context["siguiente"]).json()
+        self.assertEqual(siguiente["filas"][0]["periodo"], respuesta.context["rows"][20]["periodo"])
+
+    def test_en_segundo_plano_encola_y_publica_resultados(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            respuesta = self.enviar(en_segundo_plano="on")
+        trabajo = respuesta.context["trabajo"]
+
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(trabajo.estado, TrabajoCronograma.Estado.PENDIENTE)
+        self.assertEqual(self.client.get(f"/trabajos/{trabajo.id}/resultados/").status_code, 409)
+
+        self.assertTrue(ejecutar_trabajo(trabajo.id))
+        self.assertFalse(ejecutar_trabajo(trabajo.id))
+
+        estado = self.client.get(f"/trabajos/{trabajo.id}/").json()
+        self.assertEqual((estado["estado"], estado["progreso"]), ("completado", 100))
+        respuesta = self.client.get(estado["resultados"])
+        filas = [json.loads(linea) for linea in b"".join(respuesta.streaming_content).splitlines()]
+        self.assertEqual(respuesta["Content-Type"], "application/x-ndjson")
+        esperado = json.dumps(preparar_filas(calcular(cargar_movimientos())), cls=DjangoJSONEncoder)
+        self.assertEqual(filas, json.loads(esperado))
+        self.assertEqual(AporteCapital.objects.filter(proyecto__nombre="Central Park").count(), 37)
+
+    def test_trabajo_fallido_registra_el_error(self):
+        with self.captureOnCommitCallbacks():
+            trabajo = self.enviar(dataset_url=self.url + ".no", en_segundo_plano="on").context["trabajo"]
+
+        ejecutar_trabajo(trabajo.id)
+
+        trabajo.refresh_from_db()
+        self.assertEqual(trabajo.estado, TrabajoCronograma.Estado.FALLIDO)
+        self.assertIn("No se pudo cargar el JSON", trabajo.error)
+
+    def test_trabajo_con_parametros_invalidos_queda_fallido(self):
+        with self.captureOnCommitCallbacks():
+            trabajo = self.enviar(en_segundo_plano="on").context["trabajo"]
+        TrabajoCronograma.objects.filter(pk=trabajo.id).update(parametros={**trabajo.parametros, "cupo_credito": "mucho"})
+
+        with self.assertLogs("PruebaTecnica.trabajos", "ERROR"):
+            self.assertTrue(ejecutar_trabajo(trabajo.id))
+
+        trabajo.refresh_from_db()
+        self.assertEqual(trabajo.estado, TrabajoCronograma.Estado.FALLIDO)
+        self.assertIn("Parámetros del trabajo inválidos", trabajo.error)
+
+    def test_trabajo_en_proceso_abandonado_se_vuelve_a_tomar(self):
+        with self.captureOnCommitCallbacks():
+            trabajo = self.enviar(en_segundo_plano="on").context["trabajo"]
+        en_proceso = TrabajoCronograma.objects.filter(pk=trabajo.id)
+        en_proceso.update(estado=TrabajoCronograma.Estado.EN_PROCESO, actualizado=timezone.now())
+
+        self.assertFalse(ejecutar_trabajo(trabajo.id))
+
+        # El worker que lo tomó se cayó y no volvió a registrar avance.
+        en_proceso.update(actualizado=timezone.now() - timedelta(seconds=settings.GERPRO_TRABAJOS["VENCIMIENTO"] + 1))
+        salida = StringIO()
+        call_command("procesar_trabajos", stdout=salida)
+
+        self.assertIn(f"{trabajo.id}: Completado", salida.getvalue())
+        self.assertFalse(ejecutar_trabajo(trabajo.id))
+
+    async def test_vista_async_calcula_y_guarda(self):
+        respuesta = await self.async_client.post("/async/", {
+            "proyecto": "Central Park", "dataset_url": self.url, **PARAMETROS,
+        })
+
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(len(respuesta.context["rows"]), 37)
+        self.assertEqual(await AporteCapital.objects.filter(proyecto__nombre="Central Park").acount(), 37)
+
+    async def test_vista_async_reporta_error_de_descarga(self):
+        respuesta = await self.async_client.post("/async/", {
+            "proyecto": "Central Park", "dataset_url": self.url + ".no", **PARAMETROS,
+        })
+
+        self.assertIn("No se pudo cargar el JSON", respuesta.context["form"].errors["dataset_url"][0])
+        self.assertFalse(await AporteCapital.objects.aexists())
+
+    async def test_vista_async_calcula_en_el_pool_de_procesos(self):
+        self.addCleanup(self.cerrar_pool_procesos)
+        with self.settings(GERPRO_CALCULO_ASYNC={"PROCESOS": 1}):
+            respuesta = await self.async_client.post("/async/", {
+                "proyecto": "Central Park", "dataset_url": self.url, **{**PARAMETROS, "tasa_interes_anual": "17"},
+            })
+
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(servicios._pool_procesos._mp_context.get_start_method(), "spawn")
+        esperado = calcular(cargar_movimientos(), tasa_interes_anual=Decimal("17"))
+        self.assertEqual([dict(fila) for fila in respuesta.context["rows"]], preparar_filas(esperado))
+
+    @staticmethod
+    def cerrar_pool_procesos():
+        servicios._pool_procesos.shutdown()
+        servicios._pool_procesos = None
+
+
+    def test_server_timing_desglosa_etapas_y_consultas(self):
+        with self.assertLogs("PruebaTecnica.instrumentacion", "INFO") as registros:
+            respuesta = self.enviar()
+
+        etapas = {entrada.split(";")[0] for entrada in respuesta["Server-Timing"].split(", ")}
+        self.assertTrue(
+            {"descarga", "decodificacion", "validacion", "calculo", "guardado", "render", "db", "total"} <= etapas
+        )
+        registro = json.loads(registros.records[-1].getMessage())
+        self.assertEqual((registro["metodo"], registro["ruta"], registro["estado"]), ("POST", "/", 200))
+        self.assertGreater(registro["etapas"]["guardado"]["consultas"], 0)
+        self.assertEqual(registro, registros.records[-1].medicion)
+
+    async def test_server_timing_en_la_vista_async(self):
+        respuesta = await self.async_client.post("/async/", {
+            "proyecto": "Central Park", "dataset_url": self.url, **PARAMETROS,
+        })
+
+        self.assertIn("calculo;dur=", respuesta["Server-Timing"])
+        self.assertRegex(respuesta["Server-Timing"], r'guardado;dur=[\d.]+;desc="[1-9]\d* consultas"')
+
+    def test_perfila_con_la_cabecera_y_el_token(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        configuracion = {**settings.GERPRO_INSTRUMENTACION, "TOKEN_PERFIL": "secreto", "DIR_PERFILES": directorio.name}
+        with self.settings(GERPRO_INSTRUMENTACION=configuracion):
+            sin_token = self.client.get("/", headers={"X-Gerpro-Perfil": "otro"})
+            perfilada = self.client.get("/", headers={"X-Gerpro-Perfil": "secreto"})
+
+        self.assertNotIn("X-Gerpro-Perfil", sin_token)
+        self.assertTrue((Path(directorio.name) / perfilada["X-Gerpro-Perfil"]).exists())
+
+
+    def test_metricas_publica_latencias_tamanos_y_filas_escritas(self):
+        parche = mock.patch("PruebaTecnica.metricas._registro", Registro())
+        parche.start()
+        self.addCleanup(parche.stop)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.enviar()
+        self.enviar(tasa_interes_anual="15")
+
+        respuesta = self.client.get("/metrics")
+
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertTrue(respuesta["Content-Type"].startswith("text/plain; version=0.0.4"))
+        texto = respuesta.content.decode()
+        self.assertIn('gerpro_cronograma_segundos_count{modo="sincrono"} 2', texto)
+        self.assertIn('gerpro_etapa_segundos_bucket{etapa="calculo",le="+Inf"} 2', texto)
+        self.assertIn('gerpro_dataset_periodos_bucket{le="48"} 2', texto)
+        self.assertIn('gerpro_filas_escritas_total{modelo="AporteCapital"} 37', texto)
+        self.assertIn('gerpro_cache_consultas_total{cache="datasets",resultado="acierto"} 1', texto)
+        self.assertIn('gerpro_cache_proporcion_aciertos{cache="datasets"} 0.5', texto)
+
+
+class CoalescedorTests(SimpleTestCase):
+    def test_llamadas_simultaneas_comparten_una_ejecucion(self):
+        coalescedor = Coalescedor("prueba")
+        liberar = threading.Event()
+        llamadas = []
+        resultados = []
+
+        def trabajo(valor):
+            llamadas.append(valor)
+            liberar.wait(5)
+            return [valor]
+
+        hilos = [
+            threading.Thread(target=lambda: resultados.append(coalescedor.ejecutar("clave", trabajo, 1)))
+            for _ in range(4)
+        ]
+        for hilo in hilos:
+            hilo.start()
+        while coalescedor.en_curso() == 0 or len(llamadas) == 0:
+            time.sleep(0.01)
+        time.sleep(0.05)
+        liberar.set()
+        for hilo in hilos:
+            hilo.join()
+
+        self.assertEqual(llamadas, [1])
+        self.assertEqual(len(resultados), 4)
+        self.assertTrue(all(resultado is resultados[0] for resultado in resultados))
+        # Terminada la ejecución la clave queda libre: no es una cache.
+        self.assertEqual(coalescedor.ejecutar("clave", trabajo, 2), [2])
+        self.assertEqual(coalescedor.en_curso(), 0)
+
+    def test_la_excepcion_llega_a_todos_y_async_espera_al_hilo(self):
+        coalescedor = Coalescedor("prueba")
+        empezo = threading.Event()
+        liberar = threading.Event()
+
+        def falla():
+            empezo.set()
+            liberar.wait(5)
+            raise ValueError("sin datos")
+
+        errores = []
+
+        def en_hilo():
+            try:
+                coalescedor.ejecutar("clave", falla)
+            except ValueError as exc:
+                errores.append(exc)
+
+        hilo = threading.Thread(target=en_hilo)
+        hilo.start()
+        empezo.wait(5)
+
+        async def esperar():
+            async def no_deberia_ejecutarse():
+                raise AssertionError("se ejecutó dos veces")
+
+            tarea = asyncio.ensure_future(coalescedor.ejecutar_async("clave", no_deberia_ejecutarse))
+            await asyncio.sleep(0.05)
+            liberar.set()
+            return await tarea
+
+        with self.assertRaisesMessage(ValueError, "sin datos"):
+            asyncio.run(esperar())
+        hilo.join()
+        self.assertEqual(len(errores), 1)
+
+    def test_si_se_cancela_la_ejecucion_async_otra_llamada_la_repite(self):
+        coalescedor = Coalescedor("prueba")
+        llamadas = []
+
+        async def trabajo(valor):
+            llamadas.append(valor)
+            await asyncio.sleep(0.2)
+            return [valor]
+
+        async def esperar():
+            lider = asyncio.ensure_future(coalescedor.ejecutar_async("clave", trabajo, 1))
+            await asyncio.sleep(0.05)
+            esperando = [asyncio.ensure_future(coalescedor.ejecutar_async("clave", trabajo, 2)) for _ in range(3)]
+            await asyncio.sleep(0.05)
+            # El cliente de la primera petición se desconecta.
+            lider.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await lider
+            return await asyncio.gather(*esperando)
+
+        resultados = asyncio.run(esperar())
+
+        self.assertEqual(llamadas, [1, 2])
+        self.assertEqual(resultados, [[2]] * 3)
+        self.assertEqual(coalescedor.en_curso(), 0)
+
+    def test_si_se_cancela_la_ejecucion_en_un_hilo_otra_llamada_la_repite(self):
+        coalescedor = Coalescedor("prueba")
+        empezo = threading.Event()
+        esperando = threading.Event()
+        llamadas = []
+
+        def trabajo(valor):
+            llamadas.append(valor)
+            if valor == 1:
+                empezo.set()
+                esperando.wait(5)
+                raise asyncio.CancelledError()
+            return [valor]
+
+        cancelaciones = []
+
+        def lider():
+            try:
+                coalescedor.ejecutar("clave", trabajo, 1)
+            except asyncio.CancelledError as exc:
+                cancelaciones.append(exc)
+
+        hilo = threading.Thread(target=lider)
+        hilo.start()
+        empezo.wait(5)
+
+        resultados = []
+        espera = threading.Thread(target=lambda: resultados.append(coalescedor.ejecutar("clave", trabajo, 2)))
+        espera.start()
+        # La segunda llamada queda esperando a la primera.
+        time.sleep(0.05)
+        esperando.set()
+        hilo.join()
+        espera.join()
+
+        self.assertEqual(len(cancelaciones), 1)
+        self.assertEqual(llamadas, [1, 2])
+        self.assertEqual(resultados, [[2]])
+
+    def test_una_espera_cancelada_no_cancela_a_las_demas(self):
+        coalescedor = Coalescedor("prueba")
+
+        async def trabajo():
+            await asyncio.sleep(0.1)
+            return "listo"
+
+        async def esperar():
+            lider = asyncio.ensure_future(coalescedor.ejecutar_async("clave", trabajo))
+            await asyncio.sleep(0.02)
+            impaciente = asyncio.ensure_future(coalescedor.ejecutar_async("clave", trabajo))
+            await asyncio.sleep(0.02)
+            impaciente.cancel()
+            return await lider
+
+        self.assertEqual(asyncio.run(esperar()), "listo")
+
+
+class CacheResultadosTests(SimpleTestCase):
+    def test_clave_normaliza_parametros(self):
+        clave = CacheResultados.clave("abc", PARAMETROS)
+        equivalente = CacheResultados.clave("abc", {
+            **PARAMETROS,
+            "porcentaje_maximo_mensual": 0.08,
+            "cupo_credito": 7000,
+            "tasa_interes_anual": Decimal("0.120"),
+        })
+        self.assertEqual(clave, equivalente)
+        self.assertNotEqual(clave, CacheResultados.clave("abd", PARAMETROS))
+        self.assertNotEqual(clave, CacheResultados.clave("abc", PARAMETROS, motor=MOTOR_NUMPY))
+
+    def test_cambiar_version_del_motor_invalida(self):
+        cache = CacheResultados()
+        cache.guardar(cache.clave("abc", PARAMETROS), {"creditos": [], "aportes": []})
+
+        with mock.patch("PruebaTecnica.cache.VERSION_MOTOR", "otra"):
+            self.assertIsNone(cache.obtener(cache.clave("abc", PARAMETROS)))
+        self.assertIsNotNone(cache.obtener(cache.clave("abc", PARAMETROS)))
+
+    def test_invalidar_proyecto(self):
+        cache = CacheResultados()
+        clave = cache.clave("abc", PARAMETROS)
+        resultados = {"creditos": [], "aportes": []}
+        cache.guardar(clave, resultados)
+        cache.marcar_persistido("Central Park", "http://datos.local/", clave)
+        self.assertEqual(
+            cache.anterior_persistido("Central Park", cache.clave("abd", PARAMETROS)),
+            (CacheResultados.huella(clave), resultados),
+        )
+        self.assertIsNone(cache.anterior_persistido("Otro", cache.clave("abd", PARAMETROS)))
+
+        cache.invalidar("Central Park")
+        self.assertIsNone(cache.anterior_persistido("Central Park", cache.clave("abd", PARAMETROS)))
+
+    def test_huella_estable_entre_procesos(self):
+        clave = CacheResultados.clave("abc", PARAMETROS)
+
+        self.assertEqual(CacheResultados.huella(clave), CacheResultados.huella(pickle.loads(pickle.dumps(clave))))
+        self.assertNotEqual(CacheResultados.huella(clave), CacheResultados.huella(CacheResultados.clave("abd", PARAMETROS)))
+        self.assertEqual(len(CacheResultados.huella(clave)), 64)
+
+    def test_lru_con_expiracion(self):
+        cache = CacheLRU(max_entradas=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), 1)
+
+        with mock.patch("PruebaTecnica.cache.time.monotonic", return_value=float("inf")):
+            self.assertIsNone(cache.get("a"))
+
+
+class RecalculoIncrementalTests(TestCase):
+    parametros = {
+        "cupo_credito": 7000,
+        "porcentaje_maximo_mensual": 8,
+        "periodo_inicial_credito": 7,
+        "periodo_final_credito": 30,
+        "tasa_interes_anual": 12,
+    }
+
+    def setUp(self):
+        self.movimientos = cargar_movimientos()
+
+    def assertIgualAlCalculoCompleto(self, movimientos, anterior):
+        incremental = recalcular_cronograma(movimientos, anterior, **self.parametros)
+        completo = calcular_cronograma(movimientos, **self.parametros)
+        for clave in ("creditos", "aportes", "estados"):
+            self.assertEqual(incremental[clave], completo[clave])
+        return incremental
+
+    def revisar(self, periodo, factor):
+        return [
+            {**mov, "valor": mov["valor"] * factor} if mov["periodo"] == periodo else mov
+            for mov in self.movimientos
+        ]
+
+    def test_periodos_agregados_al_final(self):
+        anterior = calcular_cronograma([m for m in self.movimientos if m["periodo"] <= 30], **self.parametros)
+
+        incremental = self.assertIgualAlCalculoCompleto(self.movimientos, anterior)
+
+        self.assertLessEqual(incremental["desde"], 31)
+
+    def test_revision_de_los_ultimos_periodos(self):
+        anterior = calcular_cronograma(self.movimientos, **self.parametros)
+
+        incremental = self.assertIgualAlCalculoCompleto(self.revisar(33, 2), anterior)
+
+        self.assertEqual(incremental["desde"], 33)
+
+    def test_revision_del_primer_periodo_recalcula_todo(self):
+        anterior = calcular_cronograma(self.movimientos, **self.parametros)
+
+        incremental = self.assertIgualAlCalculoCompleto(self.revisar(1, 3), anterior)
+
+        self.assertEqual(incremental["desde"], 1)
+
+    def test_sin_cambios(self):
+        anterior = calcular_cronograma(self.movimientos, **self.parametros)
+
+        incremental = self.assertIgualAlCalculoCompleto(self.movimientos, anterior)
+
+        self.assertEqual(incremental["desde"], 38)
+
+    def guardar_incremental(self, huella_guardada):
+        anterior = calcular_cronograma(self.movimientos, **self.parametros)
+        guardar_en_base(self.movimientos, anterior, "Central Park", PARAMETROS, "http://datos.local/", huella="base")
+        AporteCapital.objects.filter(periodo=1).update(monto=Decimal("999"))
+        Proyecto.objects.update(huella_cronograma=huella_guardada)
+        revisados = self.revisar(33, 2)
+        incremental = recalcular_cronograma(revisados, anterior, **self.parametros)
+
+        guardar_en_base(
+            revisados,
+            incremental,
+            "Central Park",
+            PARAMETROS,
+            "http://datos.local/",
+            desde_periodo=incremental["desde"],
+            huella="revisado",
+            huella_base="base",
+        )
+        return anterior, incremental
+
+    def test_persistencia_solo_toca_periodos_posteriores(self):
+        _, incremental = self.guardar_incremental("base")
+
+        self.assertEqual(AporteCapital.objects.get(periodo=1).monto, Decimal("999"))
+        esperado = {int(a["periodo"]): cuantizar(a["aporte_capital"]) for a in incremental["aportes"]}
+        for aporte in AporteCapital.objects.filter(periodo__gte=33):
+            self.assertEqual(aporte.monto, esperado[aporte.periodo])
+
+    def test_persistencia_completa_si_la_base_cambio(self):
+        # Otro proceso guardó un cronograma distinto del que se retomó.
+        anterior, _ = self.guardar_incremental("otra")
+
+        self.assertEqual(
+            AporteCapital.objects.get(periodo=1).monto, cuantizar(anterior["aportes"][0]["aporte_capital"])
+        )
+        self.assertEqual(Proyecto.objects.get().huella_cronograma, "revisado")
+
+
+def en_fragmentos(contenido, tamano):
+    return (contenido[i:i + tamano] for i in range(0, len(contenido), tamano))
+
+
+class IngestaStreamingTests(TestCase):
+    def setUp(self):
+        self.movimientos = replicar_torres(cargar_movimientos(), 2)
+
+    def test_arreglo_json_en_fragmentos_pequenos(self):
+        # Fragmentos de 7 bytes cortan a la mitad el carácter multibyte "·" de los nombres.
+        contenido = json.dumps(self.movimientos, ensure_ascii=False, indent=1).encode("utf-8")
+
+        self.assertEqual(list(iterar_movimientos(en_fragmentos(contenido, 7))), self.movimientos)
+
+    def test_ndjson(self):
+        contenido = "\n".join(json.dumps(mov) for mov in self.movimientos).encode("utf-8") + b"\n"
+
+        self.assertEqual(list(iterar_movimientos(en_fragmentos(contenido, 100))), self.movimientos)
+
+    def test_valores_decimales_exactos(self):
+        movimientos = list(iterar_movimientos([b'[{"valor": 0.1, "periodo": 1}]']))
+
+        self.assertEqual(movimientos[0]["valor"], Decimal("0.1"))
+
+    def test_json_invalido(self):
+        for contenido in (b'[{"a": 1} {"b": 2}]', b'[{"a": 1},', b'[{"a": 1}] basura', b'[1, 2]'):
+            with self.subTest(contenido=contenido), self.assertRaises(ValueError):
+                list(iterar_movimientos(en_fragmentos(contenido, 3)))
+
+    def test_importar_calcula_y_persiste_igual_que_el_flujo_completo(self):
+        with ServidorDatos() as servidor:
+            contenido = "\n".join(json.dumps(mov) for mov in self.movimientos).encode("utf-8")
+            url = servidor.publicar("/datos.ndjson", None, cuerpo=contenido)
+
+            resultados = importar_en_streaming(url, "Central Park", PARAMETROS)
+
+        esperado = calcular(self.movimientos)
+        self.assertEqual(filas_cuantizadas(resultados), filas_cuantizadas(esperado))
+        self.assertEqual(MovimientoFinanciero.objects.count(), len(self.movimientos))
+        self.assertEqual(Subetapa.objects.count(), 4)
+        self.assertEqual(AporteCapital.objects.count(), len(esperado["aportes"]))
+        torre = Subetapa.objects.get(nombre="Torre 1 · 0")
+        costos = [m["periodo"] for m in self.movimientos if m["subetapa"] == torre.nombre and m["concepto"] == "costos"]
+        self.assertEqual((torre.periodo_inicio_construccion, torre.periodo_fin_construccion), (min(costos), max(costos)))
+
+    def test_transaccion_empieza_con_el_cuerpo_completo(self):
+        cliente = ClienteDatasets()
+        self.addCleanup(cliente.cerrar)
+        pasos = []
+        fragmentos = cliente.fragmentos
+
+        def leer(*args, **kwargs):
+            yield from fragmentos(*args, **kwargs)
+            pasos.append("cuerpo leído")
+
+        transaccion = persistencia.transaccion_escritura
+
+        def abrir_transaccion(*args, **kwargs):
+            pasos.append("transacción")
+            return transaccion(*args, **kwargs)
+
+        with ServidorDatos() as servidor, \
+                mock.patch.object(cliente, "fragmentos", leer), \
+                mock.patch("PruebaTecnica.ingesta.transaccion_escritura", abrir_transaccion):
+            # Con un límite chico lo apartado pasa a disco.
+            with mock.patch("PruebaTecnica.ingesta.MAX_MEMORIA_APARTADOS", 1024):
+                importar_en_streaming(
+                    servidor.publicar("/datos.json", self.movimientos), "Central Park", PARAMETROS, cliente
+                )
+
+        self.assertEqual(pasos, ["cuerpo leído", "transacción"])
+        self.assertEqual(MovimientoFinanciero.objects.count(), len(self.movimientos))
+
+    def test_json_truncado_no_deja_nada_escrito(self):
+        with ServidorDatos() as servidor:
+            contenido = json.dumps(self.movimientos).encode("utf-8")[:-40]
+            url = servidor.publicar("/datos.json", None, cuerpo=contenido)
+
+            with self.assertRaises(ValueError):
+                importar_en_streaming(url, "Central Park", PARAMETROS)
+
+        self.assertFalse(MovimientoFinanciero.objects.exists())
+
+    def test_movimientos_invalidos_se_reportan_juntos_sin_escribir(self):
+        movimientos = [dict(mov) for mov in self.movimientos]
+        movimientos[3]["concepto"] = "otros"
+        del movimientos[-1]["subetapa"]
+        with ServidorDatos() as servidor:
+            url = servidor.publicar("/datos.json", movimientos)
+
+            with self.assertRaises(DatasetInvalido) as contexto:
+                importar_en_streaming(url, "Central Park", PARAMETROS)
+
+        self.assertEqual([error.indice for error in contexto.exception.errores], [3, len(movimientos) - 1])
+        self.assertFalse(MovimientoFinanciero.objects.exists())
+        self.assertFalse(Proyecto.objects.exists())
+
+
+class ValidacionMovimientosTests(SimpleTestCase):
+    def test_dataset_valido_se_normaliza(self):
+        movimientos = validar_movimientos(
+            [{"subetapa": " Torre 1 ", "periodo": 2.0, "concepto": "Ingresos", "valor": Decimal("10.5")}]
+        )
+
+        self.assertEqual(
+            movimientos, [{"subetapa": "Torre 1", "periodo": 2, "concepto": "ingresos", "valor": Decimal("10.5")}]
+        )
+        self.assertIs(validar_movimientos(cargar_movimientos())[0]["periodo"], 1)
+
+    def test_reporta_todos_los_errores_de_una_vez(self):
+        base = {"subetapa": "Torre 1", "periodo": 1, "concepto": "costos", "valor": 10}
+        movimientos = [
+            base,
+            {**base, "periodo": "3"},
+            {**base, "periodo": 0, "concepto": "otros"},
+            {**base, "valor": None},
+            {**base, "valor": float("nan")},
+            {"periodo": 4, "concepto": "costos", "valor": 1},
+            dict(base),
+            [1, 2],
+        ]
+
+        with self.assertRaises(DatasetInvalido) as contexto:
+            validar_movimientos(movimientos)
+
+        errores = [(error.indice, error.campo) for error in contexto.exception.errores]
+        self.assertEqual(
+            errores,
+            [(1, "periodo"), (2, "periodo"), (2, "concepto"), (3, "valor"), (4, "valor"), (5, "subetapa"), (6, None),
+             (7, None)],
+        )
+        self.assertIn("movimiento 7: repite ('Torre 1', 1, 'costos')", str(contexto.exception))
+
+    def test_acota_los_errores_guardados_pero_los_cuenta_todos(self):
+        validador = ValidadorMovimientos(max_errores=2)
+        for _ in range(5):
+            validador.validar({})
+
+        with self.assertRaises(DatasetInvalido) as contexto:
+            validador.cerrar()
+
+        self.assertEqual(len(contexto.exception.errores), 2)
+        self.assertEqual(contexto.exception.total, 20)
+        self.assertIn("; y 18 más.", str(contexto.exception))
+
+    def test_iterar_validados_deja_de_entregar_desde_el_primer_error(self):
+        movimientos = cargar_movimientos()
+        movimientos[5] = {**movimientos[5], "valor": "mil"}
+
+        entregados = []
+        with self.assertRaises(DatasetInvalido):
+            entregados.extend(iterar_validados(movimientos))
+
+        self.assertEqual(len(entregados), 5)
+
+    def test_dataset_que_no_es_arreglo(self):
+        with self.assertRaisesMessage(DatasetInvalido, "el dataset debe ser un arreglo JSON de movimientos"):
+            validar_movimientos({"movimientos": []})
+
+
+class MetricasTests(SimpleTestCase):
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.directorio = Path(directorio.name)
+
+    def test_formato_de_texto_de_histogramas_y_contadores(self):
+        registro = Registro()
+        with mock.patch("PruebaTecnica.metricas._registro", registro):
+            for periodos in (12, 30, 2000):
+                DATASET_PERIODOS.observar(periodos)
+            FILAS_ESCRITAS.incrementar(3, modelo='Con "comillas"')
+
+        lineas = registro.exponer().splitlines()
+
+        self.assertIn("# TYPE gerpro_dataset_periodos histogram", lineas)
+        self.assertIn('gerpro_dataset_periodos_bucket{le="12"} 1', lineas)
+        self.assertIn('gerpro_dataset_periodos_bucket{le="36"} 2', lineas)
+        self.assertIn('gerpro_dataset_periodos_bucket{le="1200"} 2', lineas)
+        self.assertIn('gerpro_dataset_periodos_bucket{le="+Inf"} 3', lineas)
+        self.assertIn("gerpro_dataset_periodos_sum 2042", lineas)
+        self.assertIn("gerpro_dataset_periodos_count 3", lineas)
+        self.assertIn('gerpro_filas_escritas_total{modelo="Con \\"comillas\\""} 3', lineas)
+
+    def test_suma_los_valores_de_varios_procesos(self):
+        primero = Registro(self.directorio)
+        segundo = Registro(self.directorio)
+        primero.sumar(CACHE_CONSULTAS, ("resultados", "acierto"), 3)
+        segundo.sumar(CACHE_CONSULTAS, ("resultados", "acierto"), 2)
+        segundo.sumar(CACHE_CONSULTAS, ("resultados", "fallo"), 5)
+        primero.volcar()
+
+        texto = segundo.exponer()
+
+        self.assertIn('gerpro_cache_consultas_total{cache="resultados",resultado="acierto"} 5', texto)
+        self.assertIn('gerpro_cache_proporcion_aciertos{cache="resultados"} 0.5', texto)
+        self.assertEqual(len(list(self.directorio.glob("*.json"))), 2)
+
+    def test_contadores_seguros_entre_hilos(self):
+        registro = Registro(self.directorio, intervalo=0)
+
+        def contar():
+            for _ in range(500):
+                FILAS_ESCRITAS.incrementar(modelo="A")
+
+        with mock.patch("PruebaTecnica.metricas._registro", registro):
+            hilos = [threading.Thread(target=contar) for _ in range(8)]
+            for hilo in hilos:
+                hilo.start()
+            for hilo in hilos:
+                hilo.join()
+
+        self.assertEqual(registro.combinadas()[FILAS_ESCRITAS.nombre][("A",)], 4000)
+
+    def test_absorbe_los_archivos_de_procesos_terminados(self):
+        anterior = Registro(self.directorio)
+        anterior.sumar(CACHE_CONSULTAS, ("resultados", "acierto"), 3)
+        anterior.volcar()
+        # Un proceso que ya no existe y otro anterior con el mismo pid que este.
+        (self.directorio / f"{anterior._id}.json").rename(self.directorio / "999999999-terminado.json")
+        (self.directorio / f"{os.getpid()}-anterior.json").write_text(
+            json.dumps({CACHE_CONSULTAS.nombre: [[["resultados", "fallo"], 1]]}), encoding="utf-8"
+        )
+        vivo = Registro(self.directorio)
+        vivo.sumar(CACHE_CONSULTAS, ("resultados", "acierto"), 2)
+        vivo.volcar()
+
+        nuevo = Registro(self.directorio)
+        consultas = nuevo.combinadas()[CACHE_CONSULTAS.nombre]
+
+        self.assertEqual(consultas[("resultados", "acierto")], 5)
+        self.assertEqual(consultas[("resultados", "fallo")], 1)
+        self.assertEqual(sorted(ruta.stem for ruta in self.directorio.glob("*.json")), sorted([vivo._id, nuevo._id]))
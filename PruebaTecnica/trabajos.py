@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Optional
+from uuid import UUID
+
+from django.conf import settings
+from django.db import close_old_connections, connections, transaction
+from django.utils import timezone
+
+from .models import TrabajoCronograma
+from .servicios import AVANCE_ETAPAS, ErrorDescarga, preparar_filas, procesar_cronograma
+
+logger = logging.getLogger(__name__)
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _obtener_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.GERPRO_TRABAJOS["MAX_WORKERS"],
+                thread_name_prefix="cronograma",
+            )
+        return _executor
+
+
+def encolar_trabajo(cleaned: dict) -> TrabajoCronograma:
+    """Registra el cálculo en la base y lo despacha al pool local al confirmar la transacción.
+
+    El pool tiene un número fijo de hilos, así que la ocupación no depende del
+    número de trabajos en cola. Los trabajos que no alcancen a ejecutarse (por
+    ejemplo, si el proceso se reinicia) quedan pendientes y pueden retomarse con
+    ``manage.py procesar_trabajos``.
+    """
+    trabajo = TrabajoCronograma.objects.create(proyecto=cleaned["proyecto"], parametros=cleaned)
+    transaction.on_commit(lambda: _obtener_executor().submit(_ejecutar_en_hilo, trabajo.pk))
+    return trabajo
+
+
+def _ejecutar_en_hilo(trabajo_id: UUID) -> None:
+    try:
+        ejecutar_trabajo(trabajo_id)
+    finally:
+        # Cada hilo del pool abre su propia conexión; se cierra al terminar.
+        connections.close_all()
+
+
+def vencimiento_trabajos() -> timedelta:
+    """Tiempo sin avance tras el cual un trabajo en proceso se puede volver a tomar."""
+    return timedelta(seconds=settings.GERPRO_TRABAJOS["VENCIMIENTO"])
+
+
+def ejecutar_trabajo(trabajo_id: UUID) -> bool:
+    """Ejecuta un trabajo pendiente. Retorna ``False`` si otro proceso ya lo había tomado.
+
+    Tomar un trabajo renueva ``actualizado``, igual que cada etapa que empieza.
+    Si el proceso que lo tomó se cae, el trabajo queda en proceso sin avanzar y,
+    pasado :func:`vencimiento_trabajos`, se puede volver a tomar. El cálculo y
+    el guardado son idempotentes, así que repetirlo no duplica filas.
+    """
+    close_old_connections()
+    # La condición va en el mismo UPDATE: entre dos procesos solo uno lo toma.
+    tomado = TrabajoCronograma.objects.filter(pk=trabajo_id).disponibles(vencimiento_trabajos()).update(
+        estado=TrabajoCronograma.Estado.EN_PROCESO, actualizado=timezone.now()
+    )
+    if not tomado:
+        return False
+
+    trabajo = TrabajoCronograma.objects.get(pk=trabajo_id)
+
+    def al_avanzar(etapa: str) -> None:
+        TrabajoCronograma.objects.filter(pk=trabajo_id).update(
+            etapa=etapa,
+            progreso=AVANCE_ETAPAS[etapa],
+            actualizado=timezone.now(),
+        )
+
+    try:
+        # Dentro del try: si los parámetros guardados ya no son válidos el
+        # trabajo queda fallido en lugar de quedar en proceso.
+        cleaned = _parametros_desde_json(trabajo.parametros)
+        resultados = procesar_cronograma(cleaned, al_avanzar=al_avanzar)
+        filas = preparar_filas(resultados)
+    except ErrorDescarga as exc:
+        _fallar(trabajo_id, f"No se pudo cargar el JSON: {exc}")
+    except Exception as exc:
+        logger.exception("Falló el trabajo de cronograma %s", trabajo_id)
+        _fallar(trabajo_id, f"Error al calcular el cronograma: {exc}")
+    else:
+        TrabajoCronograma.objects.filter(pk=trabajo_id).update(
+            estado=TrabajoCronograma.Estado.COMPLETADO,
+            progreso=100,
+            filas=filas,
+            actualizado=timezone.now(),
+        )
+    return True
+
+
+def _fallar(trabajo_id: UUID, mensaje: str) -> None:
+    TrabajoCronograma.objects.filter(pk=trabajo_id).update(
+        estado=TrabajoCronograma.Estado.FALLIDO,
+        error=mensaje,
+        actualizado=timezone.now(),
+    )
+
+
+def _parametros_desde_json(parametros: dict) -> dict:
+    """Reconstruye los datos del formulario guardados como JSON (los decimales llegan como texto)."""
+    from .forms import CronogramaForm
+
+    form = CronogramaForm(data=parametros)
+    if not form.is_valid():
+        raise ValueError(f"Parámetros del trabajo inválidos: {form.errors.as_text()}")
+    return form.cleaned_data
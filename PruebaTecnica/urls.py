@@ -1,9 +1,26 @@
 from django.urls import path
 
-from .views import cronograma_view
+from .views import (
+    cronograma_async_view,
+    cronograma_filas_view,
+    cronograma_view,
+    exportar_csv_view,
+    exportar_xlsx_view,
+    metricas_view,
+    recalcular_view,
+    trabajo_estado_view,
+    trabajo_resultados_view,
+)
 
 
 urlpatterns = [
     path("", cronograma_view, name="cronograma"),
+    path("async/", cronograma_async_view, name="cronograma_async"),
+    path("recalcular/", recalcular_view, name="recalcular"),
+    path("proyectos/<path:nombre>/cronograma/", cronograma_filas_view, name="cronograma_filas"),
+    path("proyectos/<path:nombre>/exportar/<str:tipo>.csv", exportar_csv_view, name="exportar_csv"),
+    path("proyectos/<path:nombre>/exportar.xlsx", exportar_xlsx_view, name="exportar_xlsx"),
+    path("trabajos/<uuid:trabajo_id>/", trabajo_estado_view, name="trabajo_estado"),
+    path("trabajos/<uuid:trabajo_id>/resultados/", trabajo_resultados_view, name="trabajo_resultados"),
+    path("metrics", metricas_view, name="metricas"),
 ]
-
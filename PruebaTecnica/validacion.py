@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import math
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+CONCEPTOS = ("ingresos", "costos")
+# Límites de las columnas de ``MovimientoFinanciero`` y ``Subetapa``.
+VALOR_MAXIMO = Decimal("1e12")
+LARGO_MAXIMO_SUBETAPA = 100
+# Cien años de periodos mensuales.
+PERIODO_MAXIMO = 1200
+# Errores que se conservan con detalle; del resto solo se lleva la cuenta.
+MAX_ERRORES = 50
+# Errores que se incluyen en el mensaje de la excepción.
+ERRORES_EN_MENSAJE = 10
+
+
+class ErrorMovimiento(NamedTuple):
+    """Problema encontrado en un movimiento; ``indice`` es su posición en el dataset (desde 0).
+
+    ``indice`` es ``None`` cuando el problema es del dataset completo.
+    """
+
+    indice: Optional[int]
+    campo: Optional[str]
+    mensaje: str
+
+    def __str__(self) -> str:
+        if self.indice is None:
+            return self.mensaje
+        return f"movimiento {self.indice + 1}: {self.mensaje}"
+
+
+class DatasetInvalido(ValueError):
+    """El dataset tiene movimientos inválidos; ``errores`` los detalla y ``total`` los cuenta todos."""
+
+    def __init__(self, errores: List[ErrorMovimiento], total: Optional[int] = None):
+        self.errores = errores
+        self.total = len(errores) if total is None else total
+        detalle = "; ".join(str(error) for error in errores[:ERRORES_EN_MENSAJE])
+        restantes = self.total - min(len(errores), ERRORES_EN_MENSAJE)
+        if restantes:
+            detalle += f"; y {restantes} más"
+        super().__init__(f"El dataset tiene {self.total} error(es): {detalle}.")
+
+
+class ValidadorMovimientos:
+    """Valida y normaliza movimientos uno por uno, en la misma pasada en que llegan.
+
+    Revisa que cada movimiento sea un objeto con ``subetapa`` (texto no vacío),
+    ``periodo`` (entero entre 1 y ``periodo_maximo``), ``concepto``
+    (``"ingresos"`` o ``"costos"``) y ``valor`` (número finito dentro del rango
+    de la base), y que no se repita la combinación (subetapa, periodo,
+    concepto). No se detiene en el primer error: :meth:`cerrar` los reporta
+    todos juntos en un :class:`DatasetInvalido`.
+
+    Los movimientos válidos se normalizan en el mismo diccionario: ``periodo``
+    como ``int``, ``concepto`` en minúsculas y ``subetapa`` sin espacios en los
+    extremos. Los periodos vistos se guardan en un mapa de bits por subetapa y
+    concepto, así que la memoria no crece con la cantidad de movimientos.
+    """
+
+    def __init__(self, periodo_maximo: int = PERIODO_MAXIMO, max_errores: int = MAX_ERRORES):
+        self.periodo_maximo = periodo_maximo
+        self.max_errores = max_errores
+        self.errores: List[ErrorMovimiento] = []
+        self.total_errores = 0
+        self.cantidad = 0
+        self._vistos: Dict[Tuple[str, str], bytearray] = {}
+
+    @property
+    def valido(self) -> bool:
+        return not self.total_errores
+
+    def validar(self, movimiento: Any) -> Optional[dict]:
+        """Retorna ``movimiento`` normalizado, o ``None`` (y registra el error) si es inválido."""
+        indice = self.cantidad
+        self.cantidad += 1
+        if not isinstance(movimiento, dict):
+            self._error(indice, None, "debe ser un objeto JSON")
+            return None
+
+        errores_previos = self.total_errores
+        subetapa = movimiento.get("subetapa")
+        if not isinstance(subetapa, str) or not subetapa.strip():
+            self._error(indice, "subetapa", "'subetapa' debe ser un texto no vacío")
+        elif len(subetapa.strip()) > LARGO_MAXIMO_SUBETAPA:
+            self._error(indice, "subetapa", f"'subetapa' supera los {LARGO_MAXIMO_SUBETAPA} caracteres")
+        else:
+            subetapa = subetapa.strip()
+
+        periodo = movimiento.get("periodo")
+        if isinstance(periodo, float) and periodo.is_integer():
+            periodo = int(periodo)
+        if not isinstance(periodo, int) or isinstance(periodo, bool):
+            self._error(indice, "periodo", "'periodo' debe ser un entero")
+        elif not 1 <= periodo <= self.periodo_maximo:
+            self._error(indice, "periodo", f"'periodo' {periodo} fuera del rango 1-{self.periodo_maximo}")
+
+        concepto = movimiento.get("concepto")
+        if isinstance(concepto, str):
+            concepto = concepto.strip().lower()
+        if concepto not in CONCEPTOS:
+            self._error(indice, "concepto", f"concepto desconocido: {movimiento.get('concepto')!r}")
+
+        valor = movimiento.get("valor")
+        if not isinstance(valor, (int, float, Decimal)) or isinstance(valor, bool):
+            self._error(indice, "valor", "'valor' debe ser un número")
+        elif not math.isfinite(valor) or abs(valor) >= VALOR_MAXIMO:
+            self._error(indice, "valor", f"'valor' {valor} no es finito o excede el máximo permitido")
+
+        if self.total_errores > errores_previos:
+            return None
+        if self._repetido(subetapa, periodo, concepto):
+            self._error(indice, None, f"repite ({subetapa!r}, {periodo}, {concepto!r})")
+            return None
+        movimiento["subetapa"] = subetapa
+        movimiento["periodo"] = periodo
+        movimiento["concepto"] = concepto
+        return movimiento
+
+    def cerrar(self) -> None:
+        """Lanza :class:`DatasetInvalido` si algún movimiento validado tenía errores."""
+        if self.total_errores:
+            raise DatasetInvalido(self.errores, self.total_errores)
+
+    def _repetido(self, subetapa: str, periodo: int, concepto: str) -> bool:
+        bits = self._vistos.setdefault((subetapa, concepto), bytearray())
+        byte, bit = divmod(periodo, 8)
+        if byte >= len(bits):
+            bits.extend(bytes(byte + 1 - len(bits)))
+        elif bits[byte] & (1 << bit):
+            return True
+        bits[byte] |= 1 << bit
+        return False
+
+    def _error(self, indice: int, campo: Optional[str], mensaje: str) -> None:
+        self.total_errores += 1
+        if len(self.errores) < self.max_errores:
+            self.errores.append(ErrorMovimiento(indice, campo, mensaje))
+
+
+def iterar_validados(movimientos: Iterable[Any], validador: Optional[ValidadorMovimientos] = None) -> Iterator[dict]:
+    """Entrega los movimientos normalizados mientras no aparezca ningún error.
+
+    Desde el primer movimiento inválido no entrega nada más, pero sigue
+    recorriendo el resto para reunir todos los errores; al final lanza
+    :class:`DatasetInvalido`. Así quien consume (el cálculo o la escritura en
+    la base) no trabaja sobre un dataset que se va a rechazar.
+    """
+    validador = validador or ValidadorMovimientos()
+    for movimiento in movimientos:
+        normalizado = validador.validar(movimiento)
+        if normalizado is not None and validador.valido:
+            yield normalizado
+    validador.cerrar()
+
+
+def validar_movimientos(movimientos: Any) -> list:
+    """Valida un dataset ya decodificado y lo retorna normalizado.
+
+    Lanza :class:`DatasetInvalido` con todos los errores encontrados.
+    """
+    if not isinstance(movimientos, list):
+        raise DatasetInvalido([ErrorMovimiento(None, None, "el dataset debe ser un arreglo JSON de movimientos")])
+    validador = ValidadorMovimientos()
+    for movimiento in movimientos:
+        validador.validar(movimiento)
+    validador.cerrar()
+    return movimientos
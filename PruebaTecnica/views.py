@@ -1,66 +1,122 @@
 import json
-import requests
-from decimal import Decimal, ROUND_HALF_UP
-from typing import List
+import tempfile
+from typing import Mapping, Optional, Sequence
+from urllib.parse import urlencode
 
+from asgiref.sync import sync_to_async
 from django.contrib import messages
-from django.db import transaction
-from django.shortcuts import render
-
-from .calculos import calcular_cronograma
-from .forms import CronogramaForm
-from .models import (
-    AporteCapital,
-    CreditoConstructor,
-    DesembolsoCredito,
-    MovimientoFinanciero,
-    Proyecto,
-    Subetapa,
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404, render
+from django.urls import reverse
+from django.utils.http import content_disposition_header
+
+from .exportacion import EXPORTACIONES, escribir_xlsx, iterar_csv
+from .forms import CronogramaForm, RecalculoForm
+from .instrumentacion import etapa
+from .metricas import obtener_registro
+from .models import Proyecto, TrabajoCronograma
+from .servicios import (
+    FILAS_POR_PAGINA,
+    ErrorDescarga,
+    filas_almacenadas,
+    iterar_filas_almacenadas,
+    procesar_cronograma,
+    procesar_cronograma_async,
+    recalcular_desde_base,
 )
+from .trabajos import encolar_trabajo
+
+# Tope de ``limite`` en la API de filas; para más, el modo NDJSON.
+MAXIMO_FILAS_POR_PAGINA = 1000
+# Etapa de la instrumentación que cubre la plantilla; incluye redondear las filas que se pintan.
+ETAPA_RENDER = "render"
+
+
+def _url_filas(proyecto: str, despues_de: int, limite: int = FILAS_POR_PAGINA) -> str:
+    consulta = urlencode({"cursor": despues_de, "limite": limite})
+    return f"{reverse('cronograma_filas', args=[proyecto])}?{consulta}"
+
 
+def _primera_pagina(rows: Sequence[Mapping], proyecto: Optional[str] = None) -> dict:
+    """Filas que la plantilla pinta de entrada y URL desde donde la página trae el resto.
 
-def _quantize(value: Decimal) -> Decimal:
-    return value.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+    Sin ``proyecto`` (cronograma no guardado) no hay de dónde paginar y se
+    pintan todas.
+    """
+    if proyecto is None or len(rows) <= FILAS_POR_PAGINA:
+        return {"pagina": rows, "siguiente": None}
+    pagina = rows[:FILAS_POR_PAGINA]
+    return {"pagina": pagina, "siguiente": _url_filas(proyecto, pagina[-1]["periodo"])}
 
 
 def cronograma_view(request):
-    resultados = None
     rows = []
+    guardado = None
+    trabajo = None
 
     if request.method == "POST":
         form = CronogramaForm(request.POST)
         if form.is_valid():
             cleaned = form.cleaned_data
-            url = cleaned["dataset_url"]
-            try:
-                respuesta = requests.get(url, timeout=15)
-                respuesta.raise_for_status()
-                movimientos = respuesta.json()
-            except requests.RequestException as exc:
-                form.add_error("dataset_url", f"No se pudo cargar el JSON: {exc}")
-            except ValueError as exc:
-                form.add_error("dataset_url", f"No se pudo cargar el JSON: {exc}")
+            if cleaned["en_segundo_plano"]:
+                trabajo = encolar_trabajo(cleaned)
+                messages.success(request, "Cálculo encolado; el cronograma aparecerá al terminar.")
             else:
                 try:
-                    resultados = calcular_cronograma(
-                        movimientos=movimientos,
-                        cupo_credito=float(cleaned["cupo_credito"]),
-                        porcentaje_maximo_mensual=float(cleaned["porcentaje_maximo_mensual"]),
-                        periodo_inicial_credito=cleaned["periodo_inicial_credito"],
-                        periodo_final_credito=cleaned["periodo_final_credito"],
-                        tasa_interes_anual=float(cleaned["tasa_interes_anual"]),
-                    )
+                    resultados = procesar_cronograma(cleaned)
+                except ErrorDescarga as exc:
+                    form.add_error("dataset_url", f"No se pudo cargar el JSON: {exc}")
                 except Exception as exc:
                     form.add_error(None, f"Error al calcular el cronograma: {exc}")
                 else:
-                    rows = _preparar_filas(resultados)
-                    _guardar_en_base(
-                        movimientos,
-                        resultados,
-                        cleaned["proyecto"],
-                        cleaned,
-                        cleaned["dataset_url"],
+                    rows = resultados.filas_tabla()
+                    guardado = cleaned["proyecto"]
+                    messages.success(
+                        request,
+                        "Cronograma calculado y almacenado correctamente.",
                     )
+    else:
+        form = CronogramaForm()
+
+    context = {
+        "form": form,
+        "rows": rows,
+        **_primera_pagina(rows, guardado),
+        "guardado": guardado,
+        "trabajo": trabajo,
+    }
+    with etapa(ETAPA_RENDER):
+        return render(request, "cronograma.html", context)
+
+
+async def cronograma_async_view(request):
+    """Igual que :func:`cronograma_view`, pero no ocupa un hilo mientras se descarga el dataset.
+
+    Pensada para servirse con un servidor ASGI (``Gerpro.asgi``), donde un solo
+    worker atiende muchas peticiones a la vez.
+    """
+    rows = []
+    guardado = None
+    trabajo = None
+
+    if request.method == "POST":
+        form = CronogramaForm(request.POST)
+        if form.is_valid():
+            cleaned = form.cleaned_data
+            if cleaned["en_segundo_plano"]:
+                trabajo = await sync_to_async(encolar_trabajo)(cleaned)
+                messages.success(request, "Cálculo encolado; el cronograma aparecerá al terminar.")
+            else:
+                try:
+                    resultados = await procesar_cronograma_async(cleaned)
+                except ErrorDescarga as exc:
+                    form.add_error("dataset_url", f"No se pudo cargar el JSON: {exc}")
+                except Exception as exc:
+                    form.add_error(None, f"Error al calcular el cronograma: {exc}")
+                else:
+                    rows = resultados.filas_tabla()
+                    guardado = cleaned["proyecto"]
                     messages.success(
                         request,
                         "Cronograma calculado y almacenado correctamente.",
@@ -71,134 +127,134 @@ def cronograma_view(request):
     context = {
         "form": form,
         "rows": rows,
+        **_primera_pagina(rows, guardado),
+        "guardado": guardado,
+        "trabajo": trabajo,
     }
-    return render(request, "cronograma.html", context)
-
-
-def _preparar_filas(resultados: dict) -> List[dict]:
-    filas: List[dict] = []
-    creditos = resultados.get("creditos", [])
-    aportes = resultados.get("aportes", [])
-
-    for credito, aporte in zip(creditos, aportes):
-        filas.append(
-            {
-                "periodo": int(credito["periodo"]),
-                "ingresos": _quantize(credito["ingresos"]),
-                "costos": _quantize(credito["costos"]),
-                "fco": _quantize(credito["fco"]),
-                "desembolso": _quantize(credito["desembolso"]),
-                "saldo": _quantize(credito["saldo"]),
-                "interes_generado": _quantize(credito["interes_generado"]),
-                "interes_pagado": _quantize(credito["interes_pagado"]),
-                "pago_credito": _quantize(credito["pago_credito"]),
-                "fcn": _quantize(credito["fcn"]),
-                "aporte_capital": _quantize(aporte["aporte_capital"]),
-                "flujo_apalancado": _quantize(aporte["flujo_apalancado"]),
-                "flujo_acumulado": _quantize(aporte['flujo_acumulado']),
-            }
-        )
-    return filas
-
-
-@transaction.atomic
-def _guardar_en_base(
-    movimientos: List[dict],
-    resultados: dict,
-    nombre_proyecto: str,
-    parametros: dict,
-    dataset_url: str,
-) -> None:
-    proyecto, creado = Proyecto.objects.get_or_create(
-        nombre=nombre_proyecto,
-        defaults={"descripcion": f"Escenario importado desde {dataset_url}"},
+    # Los context processors pueden leer la sesión, que vive en la base.
+    with etapa(ETAPA_RENDER):
+        return await sync_to_async(render)(request, "cronograma.html", context)
+
+
+def recalcular_view(request):
+    """Recalcula el cronograma de un proyecto guardado con otros parámetros del crédito."""
+    rows = []
+    guardado = None
+
+    if request.method == "POST":
+        form = RecalculoForm(request.POST)
+        if form.is_valid():
+            cleaned = form.cleaned_data
+            try:
+                resultados = recalcular_desde_base(cleaned["proyecto"], cleaned, guardar=cleaned["guardar"])
+            except Exception as exc:
+                form.add_error(None, f"Error al calcular el cronograma: {exc}")
+            else:
+                rows = resultados.filas_tabla()
+                if cleaned["guardar"]:
+                    guardado = cleaned["proyecto"].nombre
+                    messages.success(request, "Cronograma recalculado y almacenado correctamente.")
+                else:
+                    messages.success(request, "Cronograma recalculado (sin guardar).")
+    else:
+        form = RecalculoForm()
+
+    context = {
+        "form": form,
+        "rows": rows,
+        **_primera_pagina(rows, guardado),
+        "guardado": guardado,
+    }
+    with etapa(ETAPA_RENDER):
+        return render(request, "cronograma.html", context)
+
+
+def trabajo_estado_view(request, trabajo_id):
+    trabajo = get_object_or_404(TrabajoCronograma, pk=trabajo_id)
+    return JsonResponse(
+        {
+            "id": str(trabajo.id),
+            "estado": trabajo.estado,
+            "etapa": trabajo.etapa,
+            "progreso": trabajo.progreso,
+            "error": trabajo.error,
+            "resultados": reverse("trabajo_resultados", args=[trabajo.id]),
+        }
     )
-    if not creado:
-        proyecto.descripcion = f"Escenario actualizado desde {dataset_url}"
-        proyecto.save()
-
-    credito, _ = CreditoConstructor.objects.get_or_create(
-        proyecto=proyecto,
-        defaults={
-            "cupo_total": Decimal("0"),
-            "porcentaje_maximo_mensual": Decimal("0"),
-            "periodo_inicial": parametros["periodo_inicial_credito"],
-            "periodo_final": parametros["periodo_final_credito"],
-            "tasa_interes_anual": Decimal("0"),
-        },
+
+
+def trabajo_resultados_view(request, trabajo_id):
+    """Filas del cronograma como NDJSON, una por periodo, para pintarlas a medida que llegan."""
+    trabajo = get_object_or_404(TrabajoCronograma, pk=trabajo_id)
+    if trabajo.estado != TrabajoCronograma.Estado.COMPLETADO:
+        return JsonResponse({"estado": trabajo.estado, "error": trabajo.error}, status=409)
+    filas = trabajo.filas or []
+    return StreamingHttpResponse(
+        (json.dumps(fila) + "\n" for fila in filas),
+        content_type="application/x-ndjson",
     )
-    credito.cupo_total = _quantize(Decimal(str(parametros["cupo_credito"])))
-    credito.porcentaje_maximo_mensual = _quantize(Decimal(str(parametros["porcentaje_maximo_mensual"])))
-    credito.periodo_inicial = parametros["periodo_inicial_credito"]
-    credito.periodo_final = parametros["periodo_final_credito"]
-    credito.tasa_interes_anual = _quantize(Decimal(str(parametros["tasa_interes_anual"])))
-    credito.save()
-
-    subetapas_cache = {}
-    periodos_por_subetapa = {}
-    for movimiento in movimientos:
-        subetapa_nombre = movimiento["subetapa"]
-        periodo = int(movimiento["periodo"])
-        concepto = movimiento["concepto"]
-
-        subetapa = subetapas_cache.get(subetapa_nombre)
-        if subetapa is None:
-            subetapa, _ = Subetapa.objects.get_or_create(
-                proyecto=proyecto,
-                nombre=subetapa_nombre,
-            )
-            subetapas_cache[subetapa_nombre] = subetapa
-
-        info = periodos_por_subetapa.setdefault(
-            subetapa_nombre,
-            {"ventas": set(), "costos": set(), "instancia": subetapa},
-        )
-        info["ventas" if concepto == "ingresos" else "costos"].add(periodo)
 
-        MovimientoFinanciero.objects.update_or_create(
-            subetapa=subetapa,
-            periodo=periodo,
-            concepto=concepto,
-            defaults={"valor": _quantize(Decimal(str(movimiento["valor"])))},
-        )
 
-    for info in periodos_por_subetapa.values():
-        ventas = sorted(info["ventas"]) or [None]
-        costos = sorted(info["costos"]) or [None]
-        subetapa = info["instancia"]
-        subetapa.periodo_inicio_ventas = ventas[0]
-        subetapa.periodo_fin_ventas = ventas[-1]
-        subetapa.periodo_inicio_construccion = costos[0]
-        subetapa.periodo_fin_construccion = costos[-1]
-        subetapa.save()
-
-    periodos_credito = []
-    for registro in resultados.get("creditos", []):
-        periodo = int(registro["periodo"])
-        periodos_credito.append(periodo)
-        DesembolsoCredito.objects.update_or_create(
-            credito=credito,
-            periodo=periodo,
-            defaults={
-                "monto": _quantize(registro["desembolso"]),
-                "saldo_despues_del_desembolso": _quantize(registro["saldo"]),
-                "interes_generado": _quantize(registro["interes_generado"]),
-                "interes_pagado": _quantize(registro["interes_pagado"]),
-                "pago_capital": _quantize(registro["pago_credito"]),
-            },
-        )
-    DesembolsoCredito.objects.filter(credito=credito).exclude(periodo__in=periodos_credito).delete()
-
-    periodos_aportes = []
-    for registro in resultados.get("aportes", []):
-        periodo = int(registro["periodo"])
-        periodos_aportes.append(periodo)
-        AporteCapital.objects.update_or_create(
-            proyecto=proyecto,
-            periodo=periodo,
-            defaults={
-                "monto": _quantize(registro["aporte_capital"]),
-                "flujo_caja_apalancado": _quantize(registro["flujo_apalancado"]),
-            },
+def cronograma_filas_view(request, nombre):
+    """Filas del cronograma guardado de un proyecto, paginadas por periodo.
+
+    ``cursor`` es el último periodo ya recibido y ``limite`` el tamaño de la
+    página; la respuesta trae en ``siguiente`` la URL de la página que sigue
+    (``null`` al final). Con ``formato=ndjson`` se transmiten todas las filas
+    desde ``cursor``, una por línea, sin armar la respuesta completa en memoria.
+    """
+    proyecto = get_object_or_404(Proyecto, nombre=nombre)
+    try:
+        cursor = int(request.GET.get("cursor", 0))
+        limite = int(request.GET.get("limite", FILAS_POR_PAGINA))
+    except ValueError:
+        return JsonResponse({"error": "cursor y limite deben ser enteros."}, status=400)
+    if not 1 <= limite <= MAXIMO_FILAS_POR_PAGINA:
+        return JsonResponse({"error": f"limite debe estar entre 1 y {MAXIMO_FILAS_POR_PAGINA}."}, status=400)
+
+    if request.GET.get("formato") == "ndjson":
+        return StreamingHttpResponse(
+            (json.dumps(fila, cls=DjangoJSONEncoder) + "\n" for fila in iterar_filas_almacenadas(proyecto, cursor)),
+            content_type="application/x-ndjson",
         )
-    AporteCapital.objects.filter(proyecto=proyecto).exclude(periodo__in=periodos_aportes).delete()
+    filas = filas_almacenadas(proyecto, cursor, limite)
+    siguiente = _url_filas(proyecto.nombre, filas[-1]["periodo"], limite) if len(filas) == limite else None
+    return JsonResponse({"proyecto": proyecto.nombre, "filas": filas, "siguiente": siguiente})
+
+
+def exportar_csv_view(request, nombre, tipo):
+    """Desembolsos, aportes o movimientos del proyecto en CSV, transmitidos fila por fila."""
+    if tipo not in EXPORTACIONES:
+        raise Http404(f"Exportación desconocida: {tipo}")
+    proyecto = get_object_or_404(Proyecto, nombre=nombre)
+    respuesta = StreamingHttpResponse(iterar_csv(proyecto, tipo), content_type="text/csv; charset=utf-8")
+    respuesta["Content-Disposition"] = content_disposition_header(True, f"{proyecto.nombre}-{tipo}.csv")
+    return respuesta
+
+
+def exportar_xlsx_view(request, nombre):
+    """Libro XLSX con una hoja por exportación, escrito en un archivo temporal y servido desde disco.
+
+    El libro se arma completo en la petición: ocupa el worker y el disco
+    temporal en proporción al tamaño del proyecto. Las exportaciones CSV se
+    transmiten a medida que se leen y son las indicadas para proyectos grandes.
+    """
+    proyecto = get_object_or_404(Proyecto, nombre=nombre)
+    archivo = tempfile.TemporaryFile()
+    try:
+        escribir_xlsx(proyecto, archivo)
+    except ValueError as exc:
+        archivo.close()
+        return HttpResponse(str(exc), status=501, content_type="text/plain; charset=utf-8")
+    archivo.seek(0)
+    return FileResponse(
+        archivo,
+        as_attachment=True,
+        filename=f"{proyecto.nombre}.xlsx",
+        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    )
+
+
+def metricas_view(request):
+    """Métricas de todos los procesos de la instancia en el formato de texto de Prometheus."""
+    return HttpResponse(obtener_registro().exponer(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,155 @@
+"""Compara el rendimiento de la vista síncrona (WSGI) y la asíncrona (ASGI) con un upstream lento.
+
+Levanta un servidor HTTP local que sirve ``datos_gerpro_prueba.json`` con una
+latencia fija y envía el mismo formulario a ``/`` mediante el handler WSGI de
+Django (un hilo por petición concurrente, como un worker ``gthread``) y a
+``/async/`` mediante el handler ASGI (todas las peticiones en un solo event
+loop). La cache de datasets se configura sin frescura para que cada petición
+revalide con el upstream, que es el caso que la vista asíncrona busca mejorar.
+
+Uso::
+
+    python benchmarks/carga_wsgi_asgi.py --peticiones 200 --concurrencia 50 --latencia 0.2
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from entorno import RAIZ, configurar_django
+
+
+class ServidorLento(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, cuerpo: bytes, latencia: float):
+        self.cuerpo = cuerpo
+        self.latencia = latencia
+        super().__init__(("127.0.0.1", 0), _Manejador)
+
+
+class _Manejador(BaseHTTPRequestHandler):
+    def do_GET(self):
+        time.sleep(self.server.latencia)
+        if self.headers.get("If-None-Match") == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(self.server.cuerpo)))
+        self.send_header("ETag", '"v1"')
+        self.end_headers()
+        self.wfile.write(self.server.cuerpo)
+
+    def log_message(self, *args):
+        pass
+
+
+def resumir(modo: str, latencias: list, total: float, errores: int) -> dict:
+    ordenadas = sorted(latencias)
+    return {
+        "modo": modo,
+        "peticiones": len(latencias),
+        "errores": errores,
+        "segundos": round(total, 3),
+        "peticiones_por_segundo": round(len(latencias) / total, 1),
+        "p50_ms": round(statistics.median(ordenadas) * 1000, 1),
+        "p95_ms": round(ordenadas[int(len(ordenadas) * 0.95) - 1] * 1000, 1),
+    }
+
+
+def medir_wsgi(datos: dict, peticiones: int, concurrencia: int) -> dict:
+    from django.test import Client
+
+    local = threading.local()
+
+    def enviar(_):
+        if not hasattr(local, "cliente"):
+            local.cliente = Client()
+        inicio = time.perf_counter()
+        respuesta = local.cliente.post("/", datos)
+        return time.perf_counter() - inicio, respuesta.status_code == 200 and b"almacenado" in respuesta.content
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrencia) as pool:
+        medidas = list(pool.map(enviar, range(peticiones)))
+    total = time.perf_counter() - inicio
+    return resumir("wsgi", [m[0] for m in medidas], total, sum(not m[1] for m in medidas))
+
+
+async def _medir_asgi(datos: dict, peticiones: int, concurrencia: int) -> dict:
+    from django.test import AsyncClient
+
+    cliente = AsyncClient()
+    limite = asyncio.Semaphore(concurrencia)
+
+    async def enviar():
+        async with limite:
+            inicio = time.perf_counter()
+            respuesta = await cliente.post("/async/", datos)
+            return time.perf_counter() - inicio, respuesta.status_code == 200 and b"almacenado" in respuesta.content
+
+    inicio = time.perf_counter()
+    medidas = await asyncio.gather(*(enviar() for _ in range(peticiones)))
+    total = time.perf_counter() - inicio
+    return resumir("asgi", [m[0] for m in medidas], total, sum(not m[1] for m in medidas))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--peticiones", type=int, default=200)
+    parser.add_argument("--concurrencia", type=int, default=50)
+    parser.add_argument("--hilos-wsgi", type=int, default=8, help="Hilos del worker WSGI simulado.")
+    parser.add_argument("--latencia", type=float, default=0.2, help="Segundos que tarda el upstream en responder.")
+    parser.add_argument("--salida", type=Path, help="Archivo donde escribir los resultados en JSON.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directorio:
+        from django.conf import settings
+
+        # Sin frescura, cada petición revalida el dataset con el upstream.
+        configurar_django(
+            Path(directorio),
+            GERPRO_CACHE_DATASETS={**settings.GERPRO_CACHE_DATASETS, "FRESCURA": 0},
+            ALLOWED_HOSTS=["*"],
+        )
+        servidor = ServidorLento((RAIZ / "datos_gerpro_prueba.json").read_bytes(), args.latencia)
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+        datos = {
+            "proyecto": "Benchmark",
+            "dataset_url": f"http://127.0.0.1:{servidor.server_address[1]}/datos.json",
+            "cupo_credito": "7000",
+            "porcentaje_maximo_mensual": "8",
+            "periodo_inicial_credito": "7",
+            "periodo_final_credito": "30",
+            "tasa_interes_anual": "12",
+        }
+        try:
+            # Calentamiento: primera descarga, cálculo y persistencia.
+            from django.test import Client
+
+            Client().post("/", datos)
+            resultados = [
+                medir_wsgi(datos, args.peticiones, min(args.hilos_wsgi, args.concurrencia)),
+                asyncio.run(_medir_asgi(datos, args.peticiones, args.concurrencia)),
+            ]
+        finally:
+            servidor.shutdown()
+
+    informe = {"latencia_upstream_s": args.latencia, "concurrencia": args.concurrencia, "resultados": resultados}
+    texto = json.dumps(informe, indent=2)
+    if args.salida:
+        args.salida.write_text(texto, encoding="utf-8")
+    print(texto)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Latencia de descargar un dataset con ``requests.get`` contra el cliente compartido.
+
+Un servidor HTTP/1.1 local sirve un dataset sintético. Para simular el costo
+de abrir una conexión con el almacenamiento real (TCP más TLS) espera
+``--latencia-conexion`` milisegundos al aceptar cada conexión, y
+``--latencia-peticion`` en cada respuesta. Se compara:
+
+- ``requests.get``: una conexión nueva por descarga, como antes.
+- ``ClienteDatasets``: :class:`~PruebaTecnica.descargas.ClienteDatasets`, que
+  reutiliza las conexiones del pool.
+
+Con ``--comprimir`` el servidor responde con gzip.
+
+Uso::
+
+    python benchmarks/descargas.py --descargas 50 --latencia-conexion 30
+"""
+import argparse
+import gzip
+import json
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable
+
+from entorno import RAIZ  # noqa: F401  (agrega la raíz del repositorio a sys.path)
+from generadores import generar_movimientos
+
+
+def crear_servidor(cuerpo: bytes, latencia_conexion: float, latencia_peticion: float) -> ThreadingHTTPServer:
+    comprimido = gzip.compress(cuerpo)
+
+    class Manejador(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Cabeceras y cuerpo salen en escrituras separadas: sin TCP_NODELAY, en
+        # una conexión reutilizada el ACK diferido del cliente agrega ~40 ms.
+        disable_nagle_algorithm = True
+
+        def setup(self):
+            time.sleep(latencia_conexion)
+            super().setup()
+
+        def do_GET(self):
+            time.sleep(latencia_peticion)
+            usar_gzip = self.server.comprimir and "gzip" in self.headers.get("Accept-Encoding", "")
+            contenido = comprimido if usar_gzip else cuerpo
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            if usar_gzip:
+                self.send_header("Content-Encoding", "gzip")
+            self.send_header("Content-Length", str(len(contenido)))
+            self.end_headers()
+            self.wfile.write(contenido)
+
+        def log_message(self, *args):
+            pass
+
+    return ThreadingHTTPServer(("127.0.0.1", 0), Manejador)
+
+
+def medir(descargar: Callable[[str], bytes], url: str, descargas: int, hilos: int) -> dict:
+    def una(_):
+        inicio = time.perf_counter()
+        descargar(url)
+        return time.perf_counter() - inicio
+
+    descargar(url)  # Calentamiento: imports y primera conexión del pool.
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=hilos) as pool:
+        latencias = sorted(pool.map(una, range(descargas)))
+    total = time.perf_counter() - inicio
+    return {
+        "descargas_por_segundo": round(descargas / total, 1),
+        "p50_ms": round(statistics.median(latencias) * 1000, 1),
+        "p95_ms": round(latencias[max(int(len(latencias) * 0.95) - 1, 0)] * 1000, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--descargas", type=int, default=50)
+    parser.add_argument("--hilos", type=int, default=1)
+    parser.add_argument("--subetapas", type=int, default=8)
+    parser.add_argument("--periodos", type=int, default=60)
+    parser.add_argument("--latencia-conexion", type=float, default=30, help="Milisegundos por conexión nueva.")
+    parser.add_argument("--latencia-peticion", type=float, default=5, help="Milisegundos por respuesta.")
+    parser.add_argument("--comprimir", action="store_true")
+    args = parser.parse_args()
+
+    import requests
+    from django.conf import settings
+
+    settings.configure()
+    from PruebaTecnica.descargas import ClienteDatasets
+
+    cuerpo = json.dumps(generar_movimientos(args.subetapas, args.periodos)).encode("utf-8")
+    servidor = crear_servidor(cuerpo, args.latencia_conexion / 1000, args.latencia_peticion / 1000)
+    servidor.comprimir = args.comprimir
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{servidor.server_port}/datos.json"
+
+    cliente = ClienteDatasets(conexiones=max(args.hilos, 1))
+    try:
+        resultados = {
+            "requests.get": medir(lambda u: requests.get(u, timeout=15).content, url, args.descargas, args.hilos),
+            "ClienteDatasets": medir(lambda u: cliente.obtener(u).content, url, args.descargas, args.hilos),
+        }
+    finally:
+        cliente.cerrar()
+        servidor.shutdown()
+        servidor.server_close()
+
+    print(json.dumps({
+        "cuerpo_bytes": len(cuerpo),
+        "comprimido": args.comprimir,
+        "hilos": args.hilos,
+        "latencia_conexion_ms": args.latencia_conexion,
+        "resultados": resultados,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+"""Configuración común de los benchmarks: Django sobre una base SQLite temporal."""
+import os
+import sys
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+if str(RAIZ) not in sys.path:
+    sys.path.insert(0, str(RAIZ))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "Gerpro.settings")
+
+
+def configurar_django(directorio: Path, **ajustes) -> None:
+    """Inicializa Django con la base, la cache de datasets y las métricas dentro de ``directorio`` y migra.
+
+    ``ajustes`` reemplaza settings adicionales antes de ``django.setup()``.
+    """
+    from django.conf import settings
+
+    settings.DATABASES["default"]["NAME"] = directorio / "bench.sqlite3"
+    for nombre, valor in ajustes.items():
+        setattr(settings, nombre, valor)
+    settings.GERPRO_CACHE_DATASETS = {**settings.GERPRO_CACHE_DATASETS, "DIR": directorio / "cache"}
+    settings.GERPRO_METRICAS = {**settings.GERPRO_METRICAS, "DIR": directorio / "metricas"}
+
+    import django
+    from django.core.management import call_command
+
+    django.setup()
+    call_command("migrate", verbosity=0)
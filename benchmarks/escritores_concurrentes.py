@@ -0,0 +1,186 @@
+"""Rendimiento de ``guardar_en_base`` con varios escritores a la vez sobre SQLite.
+
+Cada escritura guarda un dataset sintético distinto en uno de ``--proyectos``
+proyectos (así siempre hay filas que cambiar), desde ``--escritores`` hilos o
+procesos en paralelo. Antes y después de cada escritura se llama a
+``close_old_connections``, como hace Django al empezar y terminar una petición.
+Se comparan dos perfiles, cada uno en un proceso aparte con su propia base:
+
+- ``predeterminado``: SQLite sin opciones (journal ``DELETE``, ``BEGIN``
+  diferido, timeout de 5 s), sin conexiones persistentes y con
+  ``transaction.atomic`` en lugar de :func:`~PruebaTecnica.persistencia.transaccion_escritura`.
+- ``produccion``: ``DATABASES`` tal como está en ``Gerpro/settings.py`` (WAL,
+  ``synchronous=NORMAL``, ``BEGIN IMMEDIATE``, conexiones persistentes) y los
+  escritores del proceso en fila.
+
+Uso::
+
+    python benchmarks/escritores_concurrentes.py --escritores 8 --escrituras 64 --modo hilos
+    python benchmarks/escritores_concurrentes.py --escritores 4 --modo procesos
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+
+from entorno import configurar_django
+from generadores import generar_movimientos
+
+PERFILES = ("predeterminado", "produccion")
+PARAMETROS = {
+    "cupo_credito": 7000.0,
+    "porcentaje_maximo_mensual": 8.0,
+    "periodo_inicial_credito": 4,
+    "periodo_final_credito": 40,
+    "tasa_interes_anual": 12.0,
+}
+
+
+def aplicar_perfil(perfil: str) -> None:
+    """Ajusta ``DATABASES`` (antes de ``django.setup()``) y la persistencia según ``perfil``."""
+    from django.conf import settings
+
+    if perfil == "predeterminado":
+        base = settings.DATABASES["default"]
+        base["OPTIONS"] = {}
+        base["CONN_MAX_AGE"] = 0
+        base["CONN_HEALTH_CHECKS"] = False
+
+
+def desactivar_fila_de_escritores() -> None:
+    from django.db import transaction
+
+    from PruebaTecnica import persistencia
+
+    @contextmanager
+    def solo_atomic(using="default"):
+        with transaction.atomic(using=using):
+            yield
+
+    persistencia.transaccion_escritura = solo_atomic
+
+
+def inicializar_proceso(directorio: str, perfil: str) -> None:
+    """Inicializador de cada proceso escritor: misma base, sin volver a migrar."""
+    import django
+    from django.conf import settings
+
+    aplicar_perfil(perfil)
+    settings.DATABASES["default"]["NAME"] = Path(directorio) / "bench.sqlite3"
+    django.setup()
+    if perfil == "predeterminado":
+        desactivar_fila_de_escritores()
+
+
+def escribir(tarea: tuple) -> tuple:
+    """Guarda el dataset ``semilla`` en el proyecto ``proyecto``; retorna (segundos, error)."""
+    from django.db import OperationalError, close_old_connections
+
+    from PruebaTecnica.calculos import calcular_cronograma
+    from PruebaTecnica.persistencia import guardar_en_base
+
+    proyecto, semilla, subetapas, periodos = tarea
+    movimientos = generar_movimientos(subetapas, periodos, semilla=semilla)
+    resultados = calcular_cronograma(movimientos, **PARAMETROS)
+    close_old_connections()
+    inicio = time.perf_counter()
+    try:
+        guardar_en_base(movimientos, resultados, proyecto, PARAMETROS, f"bench://{semilla}")
+        error = None
+    except OperationalError as exc:
+        error = str(exc)
+    finally:
+        close_old_connections()
+    return time.perf_counter() - inicio, error
+
+
+def medir_perfil(perfil: str, args) -> dict:
+    with tempfile.TemporaryDirectory() as directorio:
+        aplicar_perfil(perfil)
+        configurar_django(Path(directorio))
+        if perfil == "predeterminado":
+            desactivar_fila_de_escritores()
+        from django.db import connection
+
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA journal_mode")
+            journal = cursor.fetchone()[0]
+        connection.close()
+
+        tareas = [
+            (f"Proyecto {numero % args.proyectos}", numero, args.subetapas, args.periodos)
+            for numero in range(args.escrituras)
+        ]
+        if args.modo == "procesos":
+            pool = ProcessPoolExecutor(
+                max_workers=args.escritores,
+                initializer=inicializar_proceso,
+                initargs=(directorio, perfil),
+            )
+        else:
+            pool = ThreadPoolExecutor(max_workers=args.escritores)
+        with pool:
+            # Calentamiento: imports e inicialización de cada worker.
+            list(pool.map(escribir, [(f"Calentamiento {i}", i, 1, 12) for i in range(args.escritores)]))
+            inicio = time.perf_counter()
+            medidas = list(pool.map(escribir, tareas))
+            total = time.perf_counter() - inicio
+
+    latencias = sorted(segundos for segundos, _ in medidas)
+    errores = [error for _, error in medidas if error]
+    return {
+        "perfil": perfil,
+        "journal_mode": journal,
+        "escrituras": len(medidas),
+        "errores": len(errores),
+        "primer_error": errores[0] if errores else None,
+        "segundos": round(total, 3),
+        "escrituras_por_segundo": round((len(medidas) - len(errores)) / total, 1),
+        "p50_ms": round(statistics.median(latencias) * 1000, 1),
+        "p95_ms": round(latencias[max(int(len(latencias) * 0.95) - 1, 0)] * 1000, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--escritores", type=int, default=8)
+    parser.add_argument("--escrituras", type=int, default=64)
+    parser.add_argument("--proyectos", type=int, default=8)
+    parser.add_argument("--subetapas", type=int, default=8)
+    parser.add_argument("--periodos", type=int, default=60)
+    parser.add_argument("--modo", choices=("hilos", "procesos"), default="hilos")
+    parser.add_argument("--perfil", choices=PERFILES, help="Mide solo este perfil (uso interno).")
+    parser.add_argument("--salida", type=Path, help="Archivo donde escribir los resultados en JSON.")
+    args = parser.parse_args()
+
+    if args.perfil:
+        print(json.dumps(medir_perfil(args.perfil, args)))
+        return
+
+    # Cada perfil en su propio intérprete: los settings de la base no cambian después de django.setup().
+    resultados = []
+    for perfil in PERFILES:
+        comando = [sys.executable, __file__, "--perfil", perfil, *sys.argv[1:]]
+        salida = subprocess.run(comando, check=True, capture_output=True, text=True).stdout
+        resultados.append(json.loads(salida.strip().splitlines()[-1]))
+
+    informe = {
+        "modo": args.modo,
+        "escritores": args.escritores,
+        "dataset": {"subetapas": args.subetapas, "periodos": args.periodos},
+        "resultados": resultados,
+    }
+    texto = json.dumps(informe, indent=2)
+    if args.salida:
+        args.salida.write_text(texto, encoding="utf-8")
+    print(texto)
+
+
+if __name__ == "__main__":
+    main()
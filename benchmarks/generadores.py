@@ -0,0 +1,35 @@
+"""Datasets sintéticos con la forma del JSON de Gerpro."""
+import random
+from typing import List
+
+
+def generar_movimientos(subetapas: int = 4, periodos: int = 48, semilla: int = 7) -> List[dict]:
+    """Genera movimientos para ``subetapas`` torres a lo largo de ``periodos`` meses.
+
+    Cada torre tiene costos durante los primeros dos tercios del horizonte y
+    ventas desde el primer tercio, con valores en centavos. El resultado es
+    determinista para una misma ``semilla``; hay un movimiento por
+    (subetapa, periodo, concepto), como exige la base.
+    """
+    aleatorio = random.Random(semilla)
+    movimientos = []
+    for indice in range(subetapas):
+        nombre = f"Torre {indice + 1}"
+        # Desfase por torre para que no todas arranquen en el mismo periodo.
+        desfase = aleatorio.randint(0, max(periodos // 12, 0))
+        for periodo in range(1 + desfase, periodos + 1):
+            if periodo <= periodos * 2 // 3:
+                movimientos.append({
+                    "subetapa": nombre,
+                    "periodo": periodo,
+                    "concepto": "costos",
+                    "valor": round(aleatorio.uniform(50, 900), 2),
+                })
+            if periodo >= periodos // 3:
+                movimientos.append({
+                    "subetapa": nombre,
+                    "periodo": periodo,
+                    "concepto": "ingresos",
+                    "valor": round(aleatorio.uniform(0, 1500), 2),
+                })
+    return movimientos
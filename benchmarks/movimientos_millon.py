@@ -0,0 +1,166 @@
+"""Lecturas de series por proyecto sobre una tabla grande de ``MovimientoFinanciero``.
+
+Llena una base SQLite temporal con ``--filas`` movimientos (por defecto un
+millón, repartidos en varios proyectos) y mide, para un rango de periodos de
+un proyecto:
+
+- ``agregado_join``: suma por periodo y concepto filtrando por
+  ``subetapa__proyecto`` (el camino anterior a la columna ``proyecto``).
+- ``agregado_sin_indice``: la misma suma con ``del_proyecto`` pero sin el
+  índice ``movimiento_proyecto_periodo``.
+- ``agregado``: ``del_proyecto().entre_periodos().totales_por_concepto()``.
+- ``listado_join`` / ``listado``: las filas del rango con el ordenamiento
+  anterior (joins a subetapa y proyecto) y con el actual.
+- ``primeros_join`` / ``primeros``: las primeras 100 filas de la tabla sin
+  filtros, con el ordenamiento anterior y con el actual.
+- ``resumen``: los mismos totales leídos de ``ResumenPeriodo``.
+
+Uso::
+
+    python benchmarks/movimientos_millon.py --filas 1000000 --salida movimientos.json
+"""
+import argparse
+import json
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from entorno import configurar_django
+
+ORDEN_ANTERIOR = ["subetapa__proyecto__nombre", "subetapa__nombre", "periodo", "concepto"]
+SUBETAPAS_POR_PROYECTO = 50
+PERIODOS = 1000
+
+
+def poblar(filas: int) -> list:
+    """Inserta ``filas`` movimientos y retorna los ids de los proyectos creados."""
+    from django.db import connection, transaction
+
+    from PruebaTecnica.models import MovimientoFinanciero, Proyecto, Subetapa
+    from PruebaTecnica.persistencia import reconstruir_resumen
+
+    por_proyecto = SUBETAPAS_POR_PROYECTO * PERIODOS * 2
+    aleatorio = random.Random(7)
+    proyectos = []
+    tabla = MovimientoFinanciero._meta.db_table
+    with transaction.atomic():
+        for numero in range(max(filas // por_proyecto, 1)):
+            proyecto = Proyecto.objects.create(nombre=f"Proyecto {numero:03}")
+            subetapas = Subetapa.objects.bulk_create(
+                [Subetapa(proyecto=proyecto, nombre=f"Torre {i}") for i in range(SUBETAPAS_POR_PROYECTO)]
+            )
+            # Inserción directa: el ORM tardaría más en poblar que en medir.
+            with connection.cursor() as cursor:
+                cursor.executemany(
+                    f"INSERT INTO {tabla} (proyecto_id, subetapa_id, periodo, concepto, valor) VALUES (%s, %s, %s, %s, %s)",
+                    (
+                        (proyecto.pk, subetapa.pk, periodo, concepto, f"{aleatorio.uniform(0, 1500):.2f}")
+                        for subetapa in subetapas
+                        for periodo in range(1, PERIODOS + 1)
+                        for concepto in ("costos", "ingresos")
+                    ),
+                )
+            reconstruir_resumen(proyecto)
+            proyectos.append(proyecto.pk)
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+    return proyectos
+
+
+def plan(queryset) -> str:
+    from django.db import connection
+
+    sql, parametros = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}", parametros)
+        return " | ".join(str(fila[-1]) for fila in cursor.fetchall())
+
+
+def medir(queryset, repeticiones: int) -> dict:
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        filas = len(list(queryset.all()))
+        tiempos.append(time.perf_counter() - inicio)
+    return {"mediana_s": statistics.median(tiempos), "min_s": min(tiempos), "filas": filas, "plan": plan(queryset)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--filas", type=int, default=1_000_000)
+    parser.add_argument("--desde", type=int, default=200)
+    parser.add_argument("--hasta", type=int, default=400)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--salida", type=Path, help="Archivo donde escribir los resultados en JSON.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directorio:
+        configurar_django(Path(directorio))
+        from django.db import connection
+        from django.db.models import Sum
+
+        from PruebaTecnica.models import MovimientoFinanciero, ResumenPeriodo
+
+        inicio = time.perf_counter()
+        proyectos = poblar(args.filas)
+        poblado = time.perf_counter() - inicio
+        proyecto = proyectos[len(proyectos) // 2]
+        movimientos = MovimientoFinanciero.objects
+
+        rango = {"periodo__gte": args.desde, "periodo__lte": args.hasta}
+        resultados = {
+            "agregado_join": medir(
+                movimientos.filter(subetapa__proyecto=proyecto, **rango)
+                .order_by().values("periodo", "concepto").annotate(total=Sum("valor")).order_by("periodo", "concepto"),
+                args.repeticiones,
+            ),
+            "agregado": medir(
+                movimientos.del_proyecto(proyecto).entre_periodos(args.desde, args.hasta).totales_por_concepto(),
+                args.repeticiones,
+            ),
+            "listado_join": medir(
+                movimientos.filter(subetapa__proyecto=proyecto, **rango)
+                .order_by(*ORDEN_ANTERIOR).values_list("periodo", "concepto", "valor"),
+                args.repeticiones,
+            ),
+            "listado": medir(
+                movimientos.del_proyecto(proyecto).entre_periodos(args.desde, args.hasta)
+                .values_list("periodo", "concepto", "valor"),
+                args.repeticiones,
+            ),
+            "primeros_join": medir(
+                movimientos.order_by(*ORDEN_ANTERIOR).values_list("periodo", "concepto", "valor")[:100],
+                args.repeticiones,
+            ),
+            "primeros": medir(movimientos.values_list("periodo", "concepto", "valor")[:100], args.repeticiones),
+            "resumen": medir(
+                ResumenPeriodo.objects.filter(proyecto=proyecto, **rango).values_list("periodo", "ingresos", "costos"),
+                args.repeticiones,
+            ),
+        }
+        with connection.cursor() as cursor:
+            cursor.execute("DROP INDEX movimiento_proyecto_periodo")
+        # Una conexión nueva descarta las sentencias preparadas con el índice.
+        connection.close()
+        resultados["agregado_sin_indice"] = medir(
+            movimientos.del_proyecto(proyecto).entre_periodos(args.desde, args.hasta).totales_por_concepto(),
+            args.repeticiones,
+        )
+
+    informe = {
+        "filas": args.filas,
+        "proyectos": len(proyectos),
+        "rango": [args.desde, args.hasta],
+        "poblado_s": round(poblado, 1),
+        "resultados": resultados,
+    }
+    texto = json.dumps(informe, indent=2, ensure_ascii=False)
+    if args.salida:
+        args.salida.write_text(texto, encoding="utf-8")
+    print(texto)
+
+
+if __name__ == "__main__":
+    main()
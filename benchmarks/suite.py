@@ -0,0 +1,203 @@
+"""Benchmarks reproducibles del cálculo y la persistencia del cronograma.
+
+Para cada tamaño de dataset sintético mide:
+
+- ``calcular_cronograma``: tiempo por motor y pico de memoria (``tracemalloc``),
+  y con la atribución ``por_subetapa``.
+- ``preparar_filas``: tiempo de cuantizar los resultados para la tabla.
+- ``guardar_en_base``: consultas y tiempo al guardar un proyecto nuevo y al
+  volver a guardarlo sin cambios, sobre una base SQLite temporal.
+
+Los resultados se escriben en JSON junto con el commit y las versiones, y
+``--comparar`` contrasta la corrida con otro archivo para detectar regresiones::
+
+    python benchmarks/suite.py --salida base.json
+    python benchmarks/suite.py --comparar base.json --tolerancia 0.5
+"""
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict
+
+from entorno import RAIZ, configurar_django
+from generadores import generar_movimientos
+
+TAMANOS = {
+    "pequeno": {"subetapas": 4, "periodos": 48},
+    "mediano": {"subetapas": 40, "periodos": 120},
+    "grande": {"subetapas": 200, "periodos": 240},
+}
+
+
+def parametros_para(movimientos: list, periodos: int) -> dict:
+    """Parámetros de crédito proporcionales al dataset, para que el crédito llegue a usarse."""
+    costos = sum(mov["valor"] for mov in movimientos if mov["concepto"] == "costos")
+    return {
+        "cupo_credito": round(costos * 0.5, 2),
+        "porcentaje_maximo_mensual": 8.0,
+        "periodo_inicial_credito": max(periodos // 6, 1),
+        "periodo_final_credito": periodos * 2 // 3,
+        "tasa_interes_anual": 12.0,
+    }
+
+
+def cronometrar(funcion: Callable[[], object], repeticiones: int) -> Dict[str, float]:
+    funcion()  # Calentamiento: imports diferidos y caches de primera llamada.
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return {"min_s": min(tiempos), "mediana_s": statistics.median(tiempos)}
+
+
+def memoria_pico(funcion: Callable[[], object]) -> int:
+    tracemalloc.start()
+    try:
+        funcion()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def medir_tamano(nombre: str, subetapas: int, periodos: int, repeticiones: int) -> dict:
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    from PruebaTecnica.calculos import MOTOR_NUMPY, MOTORES, calcular_cronograma, np
+    from PruebaTecnica.persistencia import guardar_en_base
+    from PruebaTecnica.servicios import preparar_filas
+
+    movimientos = generar_movimientos(subetapas, periodos)
+    parametros = parametros_para(movimientos, periodos)
+    resultado = {"subetapas": subetapas, "periodos": periodos, "movimientos": len(movimientos)}
+
+    for motor in MOTORES:
+        if motor == MOTOR_NUMPY and np is None:
+            continue
+        calcular = lambda: calcular_cronograma(movimientos, motor=motor, **parametros)  # noqa: E731
+        resultado[f"calcular_cronograma[{motor}]"] = {
+            **cronometrar(calcular, repeticiones),
+            "memoria_pico_bytes": memoria_pico(calcular),
+        }
+
+    atribuir = lambda: calcular_cronograma(movimientos, por_subetapa=True, **parametros)  # noqa: E731
+    resultado["calcular_cronograma[por_subetapa]"] = {
+        **cronometrar(atribuir, repeticiones),
+        "memoria_pico_bytes": memoria_pico(atribuir),
+    }
+
+    resultados = calcular_cronograma(movimientos, **parametros)
+    resultado["preparar_filas"] = cronometrar(lambda: preparar_filas(resultados), repeticiones)
+
+    escrituras = []
+    for repeticion in range(repeticiones):
+        proyecto = f"bench-{nombre}-{repeticion}"
+        inicio = time.perf_counter()
+        with CaptureQueriesContext(connection) as nuevo:
+            guardar_en_base(movimientos, resultados, proyecto, parametros, "http://bench.local/datos.json")
+        medio = time.perf_counter()
+        with CaptureQueriesContext(connection) as repetido:
+            guardar_en_base(movimientos, resultados, proyecto, parametros, "http://bench.local/datos.json")
+        escrituras.append((medio - inicio, time.perf_counter() - medio, len(nuevo), len(repetido)))
+    resultado["guardar_en_base"] = {
+        "nuevo_mediana_s": statistics.median(e[0] for e in escrituras),
+        "nuevo_consultas": escrituras[0][2],
+        "sin_cambios_mediana_s": statistics.median(e[1] for e in escrituras),
+        "sin_cambios_consultas": escrituras[0][3],
+    }
+    return resultado
+
+
+def metadatos() -> dict:
+    import django
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    try:
+        import numpy
+        version_numpy = numpy.__version__
+    except ImportError:
+        version_numpy = None
+    return {
+        "commit": commit,
+        "fecha": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "django": django.get_version(),
+        "numpy": version_numpy,
+        "plataforma": platform.platform(),
+    }
+
+
+def comparar(actual: dict, base: dict, tolerancia: float) -> list:
+    """Métricas que empeoraron más que ``tolerancia`` (fracción) respecto de ``base``.
+
+    Los tiempos y la memoria se comparan con la tolerancia; el número de
+    consultas no debería crecer en absoluto para un mismo tamaño.
+    """
+    regresiones = []
+    for tamano, metricas in actual["resultados"].items():
+        for metrica, valores in metricas.items():
+            anteriores = base["resultados"].get(tamano, {}).get(metrica)
+            if not isinstance(valores, dict) or not isinstance(anteriores, dict):
+                continue
+            for campo, valor in valores.items():
+                anterior = anteriores.get(campo)
+                if not anterior:
+                    continue
+                if campo == "mediana_s":
+                    # Con pocas repeticiones la mediana es ruidosa; basta con el mínimo.
+                    continue
+                razon = valor / anterior
+                limite = 1 if campo.endswith("consultas") else 1 + tolerancia
+                marca = "REGRESIÓN" if razon > limite else ""
+                print(f"{tamano:8} {metrica:32} {campo:22} {anterior:>14.6g} -> {valor:<14.6g} x{razon:5.2f} {marca}")
+                if marca:
+                    regresiones.append((tamano, metrica, campo, razon))
+    return regresiones
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tamanos", nargs="+", choices=TAMANOS, default=list(TAMANOS))
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--salida", type=Path, help="Archivo donde escribir los resultados en JSON.")
+    parser.add_argument("--comparar", type=Path, help="Resultados previos contra los cuales comparar.")
+    parser.add_argument("--tolerancia", type=float, default=0.5, help="Aumento de tiempo tolerado (0.5 = 50%%).")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directorio:
+        configurar_django(Path(directorio))
+        informe = {
+            "meta": metadatos(),
+            "resultados": {
+                nombre: medir_tamano(nombre, repeticiones=args.repeticiones, **TAMANOS[nombre])
+                for nombre in args.tamanos
+            },
+        }
+
+    texto = json.dumps(informe, indent=2)
+    if args.salida:
+        args.salida.write_text(texto, encoding="utf-8")
+    else:
+        print(texto)
+    if args.comparar:
+        regresiones = comparar(informe, json.loads(args.comparar.read_text(encoding="utf-8")), args.tolerancia)
+        if regresiones:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()